@@ -0,0 +1,169 @@
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fnmatch import fnmatch
+
+from lexer import tokenize
+from codegen import CodeGenerator
+from ir import format_code
+from optimizer import DEFAULT_LEVEL, LEVELS, optimize
+from cache import CompilationCache
+
+
+def compile_source(source, cache=None, level=DEFAULT_LEVEL):
+    """Pasa un código fuente por todo el compilador y devuelve cada etapa.
+
+    El código intermedio se optimiza con el nivel level antes de traducirlo
+    y ejecutarlo; "optimization" informa cuántas instrucciones eliminó cada
+    pase. La salida que produce la ejecución (print, errores del tokenizador) se
+    captura en "output" para no mezclarla con los resultados, y "execution"
+    lista los mensajes de una ejecución detenida (vacía si terminó bien). Con una
+    CompilationCache, un código ya compilado reutiliza sus tokens, código
+    intermedio y código máquina, y solo se vuelve a ejecutar.
+    """
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        artefactos = cache.get(source, level) if cache is not None else None
+        code_gen = CodeGenerator()
+        if artefactos is None:
+            tokens = tokenize(source)
+            try:
+                tree = ast.parse(source)
+            except SyntaxError as e:
+                return {"tokens": tokens.grouped(), "error": f"Error de sintaxis: {e}", "output": salida.getvalue()}
+
+            code_gen.generate_code(tree)
+            code_gen.code, eliminadas = optimize(code_gen.code, level)
+            machine_code = code_gen.translate_to_machine_code()
+            if cache is not None:
+                cache.put(source, tokens, code_gen.code, machine_code, dict(code_gen.variables),
+                          eliminadas, level)
+        else:
+            tokens = artefactos["tokens"]
+            eliminadas = artefactos["optimization"]
+            code_gen.code = artefactos["code"]
+            code_gen.variables = artefactos["variables"]
+            code_gen.machine_code = machine_code = artefactos["machine_code"]
+        mensajes = code_gen.execute_code()
+
+    return {
+        "tokens": tokens.grouped(),
+        "code": format_code(code_gen.code),
+        "machine_code": machine_code,
+        "optimization": eliminadas,
+        "variables": code_gen.variables,
+        "execution": mensajes[:-1],
+        "output": salida.getvalue(),
+    }
+
+
+def compile_file(path, cache=None, level=DEFAULT_LEVEL):
+    with open(path, encoding="utf-8") as archivo:
+        resultado = compile_source(archivo.read(), cache, level)
+    resultado["path"] = path
+    return resultado
+
+
+def compile_files(paths, cache_dir=None, level=DEFAULT_LEVEL):
+    """Unidad de trabajo de cada proceso: compila un bloque de archivos.
+
+    Un archivo que falla se informa en su resultado sin detener el bloque.
+    Cada resultado vuelve ya convertido a valores de JSON (los que no lo son,
+    como las funciones del programa, con repr), porque tiene que pasar al
+    proceso principal.
+    """
+    cache = CompilationCache(cache_dir) if cache_dir else None
+    resultados = []
+    for path in paths:
+        try:
+            resultado = compile_file(path, cache, level)
+            resultados.append(json.loads(json.dumps(resultado, ensure_ascii=False, default=repr)))
+        except Exception as e:
+            resultados.append({"path": path, "error": f"{type(e).__name__}: {e}"})
+    return resultados
+
+
+def find_sources(paths, pattern="*.py"):
+    """Expande directorios a los archivos que coinciden con pattern, en orden"""
+    for path in paths:
+        if os.path.isdir(path):
+            for carpeta, subcarpetas, archivos in os.walk(path):
+                subcarpetas.sort()
+                for nombre in sorted(archivos):
+                    if fnmatch(nombre, pattern):
+                        yield os.path.join(carpeta, nombre)
+        else:
+            yield path
+
+
+def chunked(items, size):
+    bloque = []
+    for item in items:
+        bloque.append(item)
+        if len(bloque) == size:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def compile_batch(paths, workers=None, chunk_size=16, cache_dir=None, level=DEFAULT_LEVEL):
+    """Reparte los archivos en bloques entre procesos y genera cada resultado
+    apenas termina su bloque, sin esperar al resto del lote."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendientes = [executor.submit(compile_files, bloque, cache_dir, level) for bloque in chunked(paths, chunk_size)]
+        for terminado in as_completed(pendientes):
+            yield from terminado.result()
+
+
+def write_result(resultado, output_dir=None):
+    """Escribe resultado como una línea de JSON por stdout o, con output_dir,
+    en un .json propio. El nombre del archivo es la ruta aplanada más un
+    hash corto de la ruta absoluta, para que a/b.py y a_b.py no choquen."""
+    texto = json.dumps(resultado, ensure_ascii=False, default=repr)
+    if output_dir is None:
+        print(texto, flush=True)
+        return
+    path = resultado["path"]
+    resumen = hashlib.sha256(os.path.abspath(path).encode("utf-8", "surrogateescape")).hexdigest()[:12]
+    nombre = f'{path.replace(os.sep, "_").lstrip("._")}-{resumen}.json'
+    with open(os.path.join(output_dir, nombre), "w", encoding="utf-8") as archivo:
+        archivo.write(texto + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila archivos fuente en paralelo.")
+    parser.add_argument("paths", nargs="+", help="archivos o directorios a compilar")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="cantidad de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="archivos enviados a un proceso en cada tarea")
+    parser.add_argument("--pattern", default="*.py",
+                        help="archivos a tomar de los directorios")
+    parser.add_argument("-o", "--output-dir",
+                        help="escribir un .json por archivo en lugar de JSON Lines por stdout")
+    parser.add_argument("--cache-dir",
+                        help="directorio de la caché de compilación compartida entre corridas")
+    parser.add_argument("-O", "--optimize", type=int, choices=sorted(LEVELS), default=DEFAULT_LEVEL,
+                        help=f"nivel de optimización del código intermedio (por defecto, {DEFAULT_LEVEL})")
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    errores = 0
+    for resultado in compile_batch(find_sources(args.paths, args.pattern), args.workers,
+                                    args.chunk_size, args.cache_dir, args.optimize):
+        errores += "error" in resultado
+        write_result(resultado, args.output_dir)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,731 @@
+import re
+import ast
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections import defaultdict
+
+from batch import compile_batch, compile_source
+from bytecode import VirtualMachine, assemble, disassemble
+from cache import CompilationCache
+from cfg import ControlFlowGraph, jump_targets
+from codegen import CodeGenerator
+from ir import (CALL, COPY, ELSE, END_FOR, END_FUNC, END_IF, END_WHILE, FOR, FUNC, IF, LOOP,
+                VALUE_OPS, WHILE, Instruction, const, format_code, is_temp, name)
+from interpreter import Interpreter
+from machine import MIN_REGISTERS, MachineSimulator, allocate_registers
+from peephole import peephole
+from lexer import TOKENS, IncrementalLexer, tokenize, tokenize_file
+from optimizer import optimize, propagate_copies
+from ssa import from_ssa, to_ssa
+
+
+# Programa de ejemplo que se replica para obtener entradas grandes
+PROGRAMA_BASE = '''# suma de prueba
+def calcular(a, b):
+    resultado = a * b + 3.5 - (a % 7)
+    if resultado > 10:
+        print("G")
+    else:
+        print("c")
+    return resultado
+x = calcular(12, 4)
+'''
+
+
+def generar_fuente(repeticiones):
+    return PROGRAMA_BASE * repeticiones
+
+
+def tokenize_por_patron(code):
+    """Bucle original: compila y prueba cada patrón de TOKENS en cada posición"""
+    tokens = defaultdict(list)
+    position = 0
+
+    while position < len(code):
+        match = None
+        for token_type, token_regex in TOKENS:
+            regex = re.compile(token_regex)
+            match = regex.match(code, position)
+            if match:
+                tokens[token_type].append(match.group(0))
+                position = match.end(0)
+                break
+
+        if not match:
+            print(f"Error: Token desconocido en la posición {position}")
+            break
+
+    return tokens
+
+
+def medir(funcion, *args, repeticiones=3):
+    return min(timeit.repeat(lambda: funcion(*args), number=1, repeat=repeticiones))
+
+
+def benchmark_lexer(repeticiones=5000):
+    codigo = generar_fuente(repeticiones)
+    assert tokenize(codigo).grouped() == tokenize_por_patron(codigo)
+
+    anterior = medir(tokenize_por_patron, codigo)
+    actual = medir(tokenize, codigo)
+    print(f"Lexer ({len(codigo) / 1e6:.2f} MB)")
+    print(f"  bucle por patrón:  {anterior:.3f} s")
+    print(f"  expresión maestra: {actual:.3f} s")
+    print(f"  aceleración:       {anterior / actual:.1f}x")
+
+
+def memoria_retenida(funcion, *args):
+    """Bytes que quedan reservados por el resultado de funcion(*args)"""
+    tracemalloc.start()
+    resultado = funcion(*args)
+    retenida, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return retenida
+
+
+def benchmark_token_stream(repeticiones=20000):
+    codigo = generar_fuente(repeticiones)
+    tokens = tokenize(codigo)
+
+    agrupados = memoria_retenida(tokenize_por_patron, codigo)
+    columnas = memoria_retenida(tokenize, codigo)
+    print(f"Memoria de {len(tokens)} tokens")
+    print(f"  defaultdict de cadenas: {agrupados / 1e6:.1f} MB")
+    print(f"  TokenStream:            {columnas / 1e6:.1f} MB")
+    print(f"  reducción:              {agrupados / columnas:.1f}x")
+
+
+def benchmark_stream(repeticiones=(2000, 20000)):
+    print("Memoria pico del tokenizador por flujo")
+    for cantidad in repeticiones:
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as archivo:
+            archivo.write(generar_fuente(cantidad))
+        try:
+            tracemalloc.start()
+            total = sum(1 for _ in tokenize_file(archivo.name))
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.remove(archivo.name)
+        tamano = len(PROGRAMA_BASE) * cantidad
+        print(f"  {tamano / 1e6:6.2f} MB, {total} tokens: pico {pico / 1e3:.0f} KB")
+
+
+def benchmark_incremental(repeticiones=20000):
+    """Lo que hace la interfaz: cada tecla llega por follow_line_edits como
+    replace_lines de la línea editada más la cuenta de tokens en vivo, y
+    "Analizar Tokens" lista grouped(). Se compara con re-tokenizar todo y con
+    sincronizar el texto completo (update y stream)."""
+    codigo = generar_fuente(repeticiones)
+    lexer = IncrementalLexer(codigo)
+    medio = len(lexer.lines) // 2
+    original = lexer.lines[medio]
+    editada = original[:-1] + "x\n"
+    assert lexer.grouped() == tokenize(codigo).grouped()
+
+    def tecla():
+        lexer.replace_lines(medio, medio + 1, [editada])
+        lexer.counted()
+        lexer.replace_lines(medio, medio + 1, [original])
+        lexer.counted()
+
+    def salto_de_linea():
+        lexer.replace_lines(medio, medio + 1, [original, "\n"])
+        lexer.counted()
+        lexer.replace_lines(medio, medio + 2, [original])
+        lexer.counted()
+
+    def sincronizar_todo():
+        lexer.update(codigo)
+        lexer.stream()
+
+    completo = medir(lambda: tokenize(codigo).grouped())
+    sincronizado = medir(sincronizar_todo)
+    por_tecla = medir(tecla, repeticiones=50) / 2
+    por_salto = medir(salto_de_linea, repeticiones=50) / 2
+    listado = medir(lexer.grouped)
+    print(f"Tokens tras editar una línea de {len(lexer.lines)}")
+    print(f"  tokenize completo:            {completo * 1e3:.1f} ms")
+    print(f"  update + stream:              {sincronizado * 1e3:.1f} ms")
+    print(f"  tecla (replace_lines):        {por_tecla * 1e3:.3f} ms")
+    print(f"  salto de línea:               {por_salto * 1e3:.3f} ms")
+    print(f"  listado del botón (grouped):  {listado * 1e3:.1f} ms")
+
+
+def tiempo_de_importacion(modulos, repeticiones=5):
+    """Tiempo mínimo de un intérprete nuevo que solo importa modulos, o None si falta alguno"""
+    comando = [sys.executable, "-c", f"import {', '.join(modulos)}"]
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = timeit.default_timer()
+        if subprocess.run(comando, cwd=directorio, capture_output=True).returncode != 0:
+            return None
+        tiempos.append(timeit.default_timer() - inicio)
+    return min(tiempos)
+
+
+def benchmark_startup():
+    print("Tiempo de arranque (intérprete + importación)")
+    casos = [
+        ("intérprete vacío", ["sys"]),
+        ("núcleo (lexer, codegen)", ["lexer", "codegen"]),
+        ("compF sin abrir la interfaz", ["compF"]),
+        ("tkinter, matplotlib, networkx", ["tkinter", "matplotlib.pyplot", "networkx"]),
+    ]
+    for nombre, modulos in casos:
+        tiempo = tiempo_de_importacion(modulos)
+        resultado = "no disponible" if tiempo is None else f"{tiempo * 1e3:.0f} ms"
+        print(f"  {nombre + ':':32} {resultado}")
+
+
+# Programa sin funciones ni condicionales, que CodeGenerator compila y ejecuta
+PROGRAMA_LINEAL = '''a = 12
+b = a * 4 + 3.5 - (a % 7)
+c = b * b - a / 2
+d = c + b * a
+'''
+
+
+def benchmark_batch(archivos=400, repeticiones=20):
+    directorio = tempfile.mkdtemp()
+    try:
+        for numero in range(archivos):
+            with open(os.path.join(directorio, f"fuente_{numero}.py"), "w") as archivo:
+                archivo.write(PROGRAMA_LINEAL * repeticiones)
+        rutas = sorted(os.path.join(directorio, nombre) for nombre in os.listdir(directorio))
+
+        print(f"Compilación por lotes de {archivos} archivos")
+        base = None
+        procesos = 1
+        while procesos <= (os.cpu_count() or 1):
+            tiempo = medir(lambda: sum(1 for _ in compile_batch(rutas, procesos)), repeticiones=1)
+            base = base or tiempo
+            print(f"  {procesos:2} procesos: {archivos / tiempo:7.1f} archivos/s ({base / tiempo:.1f}x)")
+            procesos *= 2
+    finally:
+        shutil.rmtree(directorio)
+
+
+def benchmark_cache(fuentes=200, repeticiones=20):
+    codigos = [f"base = {numero}\n" + PROGRAMA_LINEAL * repeticiones for numero in range(fuentes)]
+    directorio = tempfile.mkdtemp()
+    try:
+        cache = CompilationCache(directorio)
+        sin_cache = medir(lambda: [compile_source(codigo) for codigo in codigos], repeticiones=1)
+        fria = medir(lambda: [compile_source(codigo, cache) for codigo in codigos], repeticiones=1)
+        caliente = medir(lambda: [compile_source(codigo, cache) for codigo in codigos])
+    finally:
+        shutil.rmtree(directorio)
+    print(f"Caché de compilación ({fuentes} fuentes)")
+    print(f"  sin caché:      {sin_cache:.3f} s")
+    print(f"  caché fría:     {fria:.3f} s")
+    print(f"  caché caliente: {caliente:.3f} s")
+
+
+def generar_codigo(codigo):
+    code_gen = CodeGenerator()
+    code_gen.generate_code(ast.parse(codigo))
+    return code_gen.code
+
+
+def evaluar_texto(lineas):
+    """Evaluación anterior: separa cada línea en "=" y la pasa a eval"""
+    variables = {}
+    for instruccion in lineas:
+        if "=" in instruccion:
+            destino, valor = instruccion.split("=", 1)
+            try:
+                variables[destino.strip()] = eval(valor.strip(), {}, variables)
+            except Exception as e:
+                variables[destino.strip()] = f"Error al evaluar: {e}"
+    return variables
+
+
+def evaluar_ir(code):
+    code_gen = CodeGenerator()
+    for instruccion in code:
+        if instruccion.op in VALUE_OPS:
+            code_gen.variables[instruccion.dst] = code_gen.eval_expression(instruccion)
+    return code_gen.variables
+
+
+def benchmark_ir(repeticiones=2000):
+    code = generar_codigo(PROGRAMA_LINEAL * repeticiones)
+    lineas = format_code(code)
+    assert evaluar_texto(lineas) == evaluar_ir(code)
+
+    texto = medir(evaluar_texto, lineas)
+    cuadruplas = medir(evaluar_ir, code)
+    print(f"Evaluación de {len(code)} instrucciones")
+    print(f"  texto + eval: {texto:.3f} s")
+    print(f"  cuádruplas:   {cuadruplas:.3f} s ({texto / cuadruplas:.1f}x)")
+
+
+class GeneradorRecursivo(CodeGenerator):
+    """Generador anterior: cadena de isinstance con una llamada recursiva por nodo"""
+
+    def generate_code(self, node):
+        if isinstance(node, ast.Module):
+            for stmt in node.body:
+                self.generate_code(stmt)
+        elif isinstance(node, ast.Assign):
+            target = name(node.targets[0].id)
+            value = self.generate_code(node.value)
+            self.code.append(Instruction(COPY, target, value))
+            self.variables[target] = str(value)
+        elif isinstance(node, ast.BinOp):
+            left = self.generate_code(node.left)
+            right = self.generate_code(node.right)
+            op = self.get_operator_symbol(node.op)
+            temp_var = self.new_temp()
+            self.code.append(Instruction(op, temp_var, left, right))
+            return temp_var
+        elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+            left = self.generate_code(node.left)
+            right = self.generate_code(node.comparators[0])
+            op = self.get_operator_symbol(node.ops[0])
+            temp_var = self.new_temp()
+            self.code.append(Instruction(op, temp_var, left, right))
+            return temp_var
+        elif isinstance(node, ast.Name):
+            return name(node.id)
+        elif isinstance(node, ast.Constant):
+            return const(node.value)
+        elif isinstance(node, ast.Expr):
+            return self.generate_code(node.value)
+        elif isinstance(node, ast.Call):
+            func_name = name(node.func.id)
+            args = tuple(self.generate_code(arg) for arg in node.args)
+            temp_var = self.new_temp()
+            self.code.append(Instruction(CALL, temp_var, func_name, args))
+            return temp_var
+        elif isinstance(node, ast.FunctionDef):
+            func_name = name(node.name)
+            self.code.append(Instruction(FUNC, func_name, tuple(name(arg.arg) for arg in node.args.args)))
+            for stmt in node.body:
+                self.generate_code(stmt)
+            self.code.append(Instruction(END_FUNC, func_name))
+        elif isinstance(node, ast.If):
+            self.code.append(Instruction(IF, src1=self.generate_code(node.test)))
+            for stmt in node.body:
+                self.generate_code(stmt)
+            if node.orelse:
+                self.code.append(Instruction(ELSE))
+                for stmt in node.orelse:
+                    self.generate_code(stmt)
+            self.code.append(Instruction(END_IF))
+        elif isinstance(node, ast.While):
+            self.code.append(Instruction(LOOP))
+            self.code.append(Instruction(WHILE, src1=self.generate_code(node.test)))
+            for stmt in node.body:
+                self.generate_code(stmt)
+            self.code.append(Instruction(END_WHILE))
+        elif isinstance(node, ast.For):
+            target = self.generate_code(node.target)
+            iter_ = self.generate_code(node.iter)
+            self.code.append(Instruction(FOR, target, iter_))
+            for stmt in node.body:
+                self.generate_code(stmt)
+            self.code.append(Instruction(END_FOR))
+
+
+def suma_profunda(terminos):
+    """Asignación x = a + a + ... + a construida directamente como AST, ya que
+    ast.parse no admite expresiones tan anidadas"""
+    expresion = ast.Name(id="a", ctx=ast.Load())
+    for _ in range(terminos - 1):
+        expresion = ast.BinOp(left=expresion, op=ast.Add(), right=ast.Name(id="a", ctx=ast.Load()))
+    return ast.Module(body=[ast.Assign(targets=[ast.Name(id="x", ctx=ast.Store())], value=expresion)],
+                      type_ignores=[])
+
+
+def benchmark_codegen(repeticiones=2000):
+    ancho = ast.parse(PROGRAMA_BASE * repeticiones)
+    casos = [("ancho", ancho), ("profundo (800)", suma_profunda(800)), ("profundo (5000)", suma_profunda(5000))]
+    print("Generación de código intermedio")
+    for nombre, arbol in casos:
+        nodos = sum(1 for _ in ast.walk(arbol))
+        generar = lambda clase: clase().generate_code(arbol)
+        iterativo = medir(generar, CodeGenerator)
+        try:
+            recursivo = medir(generar, GeneradorRecursivo)
+            generadores = [CodeGenerator(), GeneradorRecursivo()]
+            for generador in generadores:
+                generador.generate_code(arbol)
+            assert generadores[0].code == generadores[1].code
+            comparacion = f"recursivo {recursivo / nodos * 1e9:5.0f} ns/nodo ({recursivo / iterativo:.1f}x)"
+        except RecursionError:
+            comparacion = "recursivo: RecursionError"
+        print(f"  {nombre:16} iterativo {iterativo / nodos * 1e9:5.0f} ns/nodo, {comparacion}")
+
+
+def benchmark_fold(repeticiones=2000):
+    code = generar_codigo(PROGRAMA_LINEAL * repeticiones)
+    plegado, eliminadas = optimize(code, 1)
+    assert evaluar_ir(code)["d"] == evaluar_ir(plegado)["d"]
+
+    pase = medir(optimize, code, 1)
+    sin_plegar = medir(evaluar_ir, code)
+    con_plegado = medir(evaluar_ir, plegado)
+    print(f"Plegado de constantes ({len(code)} instrucciones)")
+    print(f"  instrucciones:  {len(code)} -> {len(plegado)} ({eliminadas['fold_constants']} eliminadas)")
+    print(f"  pase:           {pase:.3f} s")
+    print(f"  evaluación:     {sin_plegar:.3f} s -> {con_plegado:.3f} s ({sin_plegar / con_plegado:.1f}x)")
+
+
+# Subexpresiones repetidas sobre valores que no se conocen al compilar
+PROGRAMA_REPETIDO = '''x = int("7")
+y = int("3")
+d = x * y + x % y
+e = x * y - x % y
+f = (x * y) * (x % y)
+'''
+
+
+def benchmark_cse(repeticiones=2000):
+    code = generar_codigo(PROGRAMA_REPETIDO * repeticiones)
+    plegado, _ = optimize(code, 1)
+    numerado, eliminadas = optimize(code, 2)
+    assert evaluar_ir(plegado)["f"] == evaluar_ir(numerado)["f"]
+
+    pase = medir(optimize, code, 2)
+    sin_numerar = medir(evaluar_ir, plegado)
+    con_numeracion = medir(evaluar_ir, numerado)
+    print(f"Numeración de valores ({len(code)} instrucciones)")
+    print(f"  instrucciones:  {len(plegado)} -> {len(numerado)} ({eliminadas['number_values']} eliminadas)")
+    print(f"  pases:          {pase:.3f} s")
+    print(f"  evaluación:     {sin_numerar:.3f} s -> {con_numeracion:.3f} s ({sin_numerar / con_numeracion:.1f}x)")
+
+
+def temporales(code):
+    return len({instruccion.dst for instruccion in code if instruccion.op in VALUE_OPS and is_temp(instruccion.dst)})
+
+
+def benchmark_dce(repeticiones=2000):
+    code = generar_codigo((PROGRAMA_REPETIDO + PROGRAMA_LINEAL) * repeticiones)
+    numerado, _ = optimize(code, 2)
+    reciclado, eliminadas = optimize(code, 3)
+    assert evaluar_ir(numerado)["f"] == evaluar_ir(reciclado)["f"]
+
+    pase = medir(optimize, code, 3)
+    print(f"Código muerto y reciclado de temporales ({len(code)} instrucciones)")
+    print(f"  instrucciones:  {len(numerado)} -> {len(reciclado)} ({eliminadas['eliminate_dead_code']} eliminadas)")
+    print(f"  temporales:     {temporales(numerado)} -> {temporales(reciclado)}")
+    print(f"  variables:      {memoria_retenida(evaluar_ir, numerado) / 1024:.1f} KB -> "
+          f"{memoria_retenida(evaluar_ir, reciclado) / 1024:.1f} KB")
+    print(f"  pases:          {pase:.3f} s")
+
+
+def codigo_maquina(code):
+    code_gen = CodeGenerator()
+    code_gen.code = code
+    return code_gen.translate_to_machine_code()
+
+
+def benchmark_copies(repeticiones=1000):
+    programas = [("base", PROGRAMA_BASE), ("lineal", PROGRAMA_LINEAL), ("repetido", PROGRAMA_REPETIDO)]
+    totales = [0, 0, 0, 0]
+    print("Propagación de copias (nivel 2 -> nivel 2 + propagate_copies)")
+    for nombre, programa in programas:
+        code, _ = optimize(generar_codigo(programa * repeticiones), 2)
+        propagado = propagate_copies(code)
+        cantidades = (len(code), len(propagado), len(codigo_maquina(code)), len(codigo_maquina(propagado)))
+        totales = [total + cantidad for total, cantidad in zip(totales, cantidades)]
+        print(f"  {nombre:9} IR {cantidades[0]:6} -> {cantidades[1]:6}   máquina {cantidades[2]:6} -> {cantidades[3]:6}")
+    print(f"  {'total':9} IR {totales[0]:6} -> {totales[1]:6} ({1 - totales[1] / totales[0]:.0%} menos)"
+          f"   máquina {totales[2]:6} -> {totales[3]:6} ({1 - totales[3] / totales[2]:.0%} menos)")
+
+
+# Ciclos anidados con condicionales, como los núcleos numéricos
+PROGRAMA_CICLOS = '''total = 0
+n = 10
+i = 0
+while i < 60:
+    j = 0
+    escala = 2 * 3
+    while j < n * 2:
+        if j % 3 == 0:
+            total = total + i * escala * j
+        else:
+            total = total - j
+        j = j + 1
+    i = i + 1
+for k in range(10):
+    total = total + k * n
+'''
+
+
+def analizar_flujo(code):
+    grafo = ControlFlowGraph(code)
+    grafo.immediate_dominators()
+    return grafo, grafo.natural_loops()
+
+
+def benchmark_cfg(repeticiones=(500, 5000)):
+    print("Grafo de flujo de control, dominadores y ciclos")
+    for cantidad in repeticiones:
+        code = generar_codigo((PROGRAMA_BASE + PROGRAMA_CICLOS) * cantidad)
+        tiempo = medir(analizar_flujo, code)
+        grafo, ciclos = analizar_flujo(code)
+        print(f"  {len(code):7} instrucciones, {len(grafo.blocks):6} bloques, {len(ciclos):5} ciclos: "
+              f"{tiempo:.3f} s ({tiempo / len(code) * 1e6:.2f} us/instrucción)")
+
+
+def instrucciones_en_ciclos(code):
+    """Instrucciones de los cuerpos de los ciclos; las de un ciclo anidado se
+    cuentan una vez por cada ciclo que las contiene"""
+    grafo = ControlFlowGraph(code)
+    return sum(len(grafo.blocks[bloque]) for ciclo in grafo.natural_loops() for bloque in ciclo.body)
+
+
+def benchmark_licm(repeticiones=200):
+    code = generar_codigo(PROGRAMA_CICLOS * repeticiones)
+    sin_mover, _ = optimize(code, 3)
+    movido, _ = optimize(code, 4)
+    pase = medir(optimize, code, 4)
+    print(f"Código invariante de ciclos ({len(code)} instrucciones)")
+    print(f"  instrucciones en ciclos: {instrucciones_en_ciclos(sin_mover)} -> {instrucciones_en_ciclos(movido)}")
+    print(f"  pases (nivel 4):         {pase:.3f} s")
+
+
+# Potencias, productos y restos de enteros dentro de un ciclo
+PROGRAMA_POTENCIAS = '''i = 0
+s = 0
+while i < 100:
+    s = s + i ** 2 + i * 8 + i % 4 + i * 3
+    i = i + 1
+'''
+
+
+def benchmark_strength(repeticiones=2000):
+    code = generar_codigo(PROGRAMA_POTENCIAS * repeticiones)
+    antes, _ = optimize(code, 1)
+    despues, _ = optimize(code, 4)
+    assert evaluar_ir(antes)["s"] == evaluar_ir(despues)["s"]
+
+    operadores = lambda codigo: " ".join(f"{op}:{sum(i.op == op for i in codigo)}" for op in ("**", "*", "%", "<<", "&", "+"))
+    print(f"Reducción de fuerza ({len(code)} instrucciones)")
+    print(f"  nivel 1: {operadores(antes)}")
+    print(f"  nivel 4: {operadores(despues)}")
+    print(f"  optimizar: {medir(optimize, code, 4):.3f} s")
+
+
+def benchmark_ssa(repeticiones=(200, 800, 3200)):
+    print("Construcción y destrucción de la forma SSA")
+    for cantidad in repeticiones:
+        code, _ = optimize(generar_codigo((PROGRAMA_BASE + PROGRAMA_CICLOS) * cantidad), 4)
+        forma = to_ssa(code)
+        assert from_ssa(forma) == code
+        phis = sum(len(lista) for lista in forma.phis.values())
+        construir = medir(to_ssa, code)
+        destruir = medir(from_ssa, forma)
+        print(f"  {len(code):7} instrucciones, {phis:6} PHI: to_ssa {construir:.3f} s "
+              f"({construir / len(code) * 1e6:.2f} us/instrucción), from_ssa {destruir:.3f} s "
+              f"({destruir / len(code) * 1e6:.2f} us/instrucción)")
+
+
+# Ciclos anidados con una condición en el cuerpo: casi un millón de instrucciones ejecutadas
+PROGRAMA_ANIDADO = '''suma = 0
+i = 0
+while i < 300:
+    j = 0
+    while j < 300:
+        if (i + j) % 2 == 0:
+            suma = suma + i * j
+        else:
+            suma = suma - j
+        j = j + 1
+    i = i + 1
+'''
+
+
+def ejecutar_sin_decodificar(code):
+    """Primera versión con saltos: en cada paso compara el op como texto y
+    evalúa con eval_expression, buscando el destino de cada salto en el
+    diccionario de jump_targets"""
+    destinos = jump_targets(code)
+    code_gen = CodeGenerator()
+    variables = code_gen.variables
+    iteradores = {}
+    pc = 0
+    while pc < len(code):
+        instruccion = code[pc]
+        op = instruccion.op
+        if op in VALUE_OPS:
+            variables[instruccion.dst] = code_gen.eval_expression(instruccion)
+        elif op in (IF, WHILE):
+            if not code_gen.operand_value(instruccion.src1):
+                pc = destinos[pc]
+                continue
+        elif op in (ELSE, END_WHILE, END_FOR):
+            pc = destinos[pc]
+            continue
+        elif op == FOR:
+            if pc not in iteradores:
+                iteradores[pc] = iter(code_gen.operand_value(instruccion.src1))
+            try:
+                variables[instruccion.dst] = next(iteradores[pc])
+            except StopIteration:
+                del iteradores[pc]
+                pc = destinos[pc]
+                continue
+        pc += 1
+    return variables
+
+
+def benchmark_interp():
+    print("Ejecución con saltos reales")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("ciclos", PROGRAMA_CICLOS),
+                           ("potencias", PROGRAMA_POTENCIAS)):
+        code = generar_codigo(fuente)
+        esperado = {}
+        exec(fuente, {}, esperado)
+        for nivel in (1, 4):
+            optimizado, _ = optimize(code, nivel)
+            variables = Interpreter(optimizado).run({})
+            assert all(variables[clave] == valor for clave, valor in esperado.items())
+            assert ejecutar_sin_decodificar(optimizado) == variables
+            anterior = medir(ejecutar_sin_decodificar, optimizado)
+            nuevo = medir(lambda: Interpreter(optimizado).run({}))
+            print(f"  {nombre:10} nivel {nivel}: {anterior:.3f} s -> {nuevo:.3f} s ({anterior / nuevo:.1f}x)")
+
+
+def benchmark_compiled(repeticiones=2000):
+    print("Bloques compilados a funciones de Python")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("ciclos", PROGRAMA_CICLOS),
+                           ("potencias", PROGRAMA_POTENCIAS)):
+        code = generar_codigo(fuente)
+        for nivel in (1, 4):
+            optimizado, _ = optimize(code, nivel)
+            assert Interpreter(optimizado, compiled=True).run({}) == Interpreter(optimizado).run({})
+            decodificado = medir(lambda: Interpreter(optimizado).run({}))
+            compilado = medir(lambda: Interpreter(optimizado, compiled=True).run({}))
+            print(f"  {nombre:10} nivel {nivel}: {decodificado:.3f} s -> {compilado:.3f} s "
+                  f"({decodificado / compilado:.1f}x)")
+
+    # Costo de compilar: cada bloque se compila una vez por texto distinto
+    code = generar_codigo(PROGRAMA_LINEAL * repeticiones)
+    decodificar = medir(Interpreter, code)
+    compilar = medir(lambda: Interpreter(code, compiled=True))
+    print(f"  preparar {len(code)} instrucciones: decodificar {decodificar:.3f} s, "
+          f"compilar {compilar:.3f} s (con caché)")
+
+
+def benchmark_bytecode(repeticiones=2000):
+    print("Bytecode y máquina virtual")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("ciclos", PROGRAMA_CICLOS),
+                           ("potencias", PROGRAMA_POTENCIAS)):
+        code = generar_codigo(fuente)
+        for nivel in (1, 4):
+            optimizado, _ = optimize(code, nivel)
+            bytecode = assemble(optimizado)
+            variables = VirtualMachine(bytecode).run({})
+            assert variables == Interpreter(optimizado).run({})
+            assert ejecutar_sin_decodificar(optimizado) == variables
+            texto = medir(ejecutar_sin_decodificar, optimizado)
+            decodificado = medir(lambda: Interpreter(optimizado).run({}))
+            maquina = medir(lambda: VirtualMachine(bytecode).run({}))
+            print(f"  {nombre:10} nivel {nivel}: eval_expression {texto:.3f} s, decodificado "
+                  f"{decodificado:.3f} s, máquina virtual {maquina:.3f} s ({texto / maquina:.1f}x)")
+
+    code = generar_codigo(PROGRAMA_LINEAL * repeticiones)
+    bytecode = assemble(code)
+    ensamblar = medir(assemble, code)
+    listar = medir(disassemble, bytecode)
+    print(f"  {len(code)} instrucciones -> {len(bytecode.code)} enteros "
+          f"({bytecode.code.itemsize * len(bytecode.code) / 1024:.0f} KiB): "
+          f"ensamblar {ensamblar:.3f} s, listar {listar:.3f} s")
+
+
+def benchmark_slots(repeticiones=2000):
+    print("Marcos de ranuras enteras")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("lineal", PROGRAMA_LINEAL * repeticiones)):
+        code = generar_codigo(fuente)
+        interprete = Interpreter(code)
+        tabla = interprete.symbols
+        variables = interprete.run({})
+        marco = tabla.load(variables)
+        ejecutar = medir(interprete.execute, tabla.load({}))
+        mostrar = medir(lambda: tabla.store(marco, {}))
+        print(f"  {nombre:10} {len(tabla.scopes[0].names)} ranuras: marco {sys.getsizeof(marco) / 1024:.1f} KiB, "
+              f"diccionario {sys.getsizeof(variables) / 1024:.1f} KiB; ejecutar {ejecutar:.3f} s, "
+              f"volver a nombres {mostrar:.4f} s")
+
+
+def benchmark_registers(repeticiones=2000):
+    print("Asignación de registros (accesos a memoria al ejecutar)")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("ciclos", PROGRAMA_CICLOS),
+                           ("potencias", PROGRAMA_POTENCIAS)):
+        code, _ = optimize(generar_codigo(fuente), 1)
+        esperado = Interpreter(code).run({})
+        columnas = []
+        for registros in (MIN_REGISTERS, 4, 8, 16):
+            simulador = MachineSimulator(allocate_registers(code, registros))
+            variables = simulador.run({})
+            assert all(variables[nombre] == esperado[nombre] for nombre in variables)
+            columnas.append(f"{registros:2} registros {simulador.loads:7} cargas {simulador.stores:7} guardados")
+        print(f"  {nombre:10} " + "\n             ".join(columnas))
+
+    code = generar_codigo(PROGRAMA_LINEAL * repeticiones)
+    asignar = medir(allocate_registers, code)
+    print(f"  asignar {len(code)} instrucciones con 8 registros: {asignar:.3f} s")
+
+
+def benchmark_peephole(repeticiones=(2000, 20000, 60000)):
+    print("Optimización de mirilla sobre el código máquina sin registros")
+    for nombre, fuente in (("anidado", PROGRAMA_ANIDADO), ("ciclos", PROGRAMA_CICLOS)):
+        machine = allocate_registers(generar_codigo(fuente), MIN_REGISTERS)
+        optimizado, aciertos = peephole(machine)
+        antes, despues = MachineSimulator(machine), MachineSimulator(optimizado)
+        variables, resultado = antes.run({}), despues.run({})
+        # Los guardados que se borran son de temporales que nadie vuelve a leer
+        assert all(resultado[nombre] == valor for nombre, valor in variables.items() if not is_temp(nombre))
+        aplicadas = ", ".join(f"{regla} {veces}" for regla, veces in aciertos.items() if veces)
+        print(f"  {nombre:10} {len(machine.instructions)} -> {len(optimizado.instructions)} instrucciones "
+              f"({aplicadas}); al ejecutar {antes.loads} -> {despues.loads} cargas, "
+              f"{antes.stores} -> {despues.stores} guardados")
+    for veces in repeticiones:
+        machine = allocate_registers(generar_codigo(PROGRAMA_LINEAL * veces), MIN_REGISTERS)
+        tiempo = medir(peephole, machine, repeticiones=1)
+        print(f"  {len(machine.instructions):8} instrucciones: {tiempo:.2f} s "
+              f"({tiempo / len(machine.instructions) * 1e6:.2f} µs por instrucción)")
+
+
+BENCHMARKS = {
+    "lexer": benchmark_lexer,
+    "token_stream": benchmark_token_stream,
+    "stream": benchmark_stream,
+    "incremental": benchmark_incremental,
+    "startup": benchmark_startup,
+    "batch": benchmark_batch,
+    "cache": benchmark_cache,
+    "ir": benchmark_ir,
+    "codegen": benchmark_codegen,
+    "fold": benchmark_fold,
+    "cse": benchmark_cse,
+    "dce": benchmark_dce,
+    "copies": benchmark_copies,
+    "cfg": benchmark_cfg,
+    "licm": benchmark_licm,
+    "strength": benchmark_strength,
+    "ssa": benchmark_ssa,
+    "interp": benchmark_interp,
+    "compiled": benchmark_compiled,
+    "bytecode": benchmark_bytecode,
+    "slots": benchmark_slots,
+    "registers": benchmark_registers,
+    "peephole": benchmark_peephole,
+}
+
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in nombres:
+        BENCHMARKS[nombre]()
@@ -0,0 +1,296 @@
+from array import array
+from bisect import bisect_right
+
+from cfg import jump_targets
+from interpreter import EvaluationError, ExecutionStopped
+from ir import CALL, COPY, ELSE, END_FOR, END_FUNC, END_WHILE, FOR, FUNC, IF, OPERATORS, WHILE, Const
+from symbols import UNBOUND, SymbolTable
+
+# Bytecode del código máquina. Cada instrucción son cuatro enteros
+# (opcode, a, b, c) en un array('i'); CALL_FUNCTION agrega después la
+# ranura de cada argumento. Los operandos son ranuras de la tabla de
+# símbolos (symbols.py) en el marco de la función que se ejecuta: las
+# constantes ya vienen cargadas en la plantilla del marco, así que la
+# máquina virtual nunca distingue una constante de una variable. Los
+# saltos son posiciones en el array.
+
+# Opcodes: primero los operadores binarios, en el orden de ir.OPERATORS
+BINARY_FUNCTIONS = tuple(OPERATORS.values())
+(MOVE, CALL_FUNCTION, JUMP_IF_FALSE, JUMP, JUMP_BACK, GET_ITER, FOR_ITER, MAKE_FUNCTION, LOAD_GLOBAL,
+ RETURN) = range(len(OPERATORS), len(OPERATORS) + 10)
+
+OPNAMES = ("ADD", "SUB", "MUL", "DIV", "MOD", "POW", "EQ", "NE", "LT", "LE", "GT", "GE", "SHL", "AND",
+           "MOVE", "CALL_FUNCTION", "JUMP_IF_FALSE", "JUMP", "JUMP_BACK", "GET_ITER", "FOR_ITER",
+           "MAKE_FUNCTION", "LOAD_GLOBAL", "RETURN")
+
+_OPCODES = {op: indice for indice, op in enumerate(OPERATORS)}
+_OPCODES[COPY] = MOVE
+
+
+_END = object()  # Fin de un iterador en FOR_ITER
+
+
+class Bytecode:
+    """Programa ensamblado: code es el array de instrucciones y symbols su
+    SymbolTable, con los iteradores de los FOR en ranuras propias. offsets
+    tiene la posición en code de cada instrucción y positions la del código
+    intermedio ir de la que salió, para informar errores."""
+
+    __slots__ = ("code", "symbols", "offsets", "positions", "ir")
+
+    def __init__(self, code, symbols, offsets, positions, ir):
+        self.code = code
+        self.symbols = symbols
+        self.offsets = offsets
+        self.positions = positions
+        self.ir = ir
+
+    def position(self, pc):
+        """Posición en el código intermedio de la instrucción que empieza en pc"""
+        return self.positions[bisect_right(self.offsets, pc) - 1]
+
+
+def assemble(code):
+    """Ensambla el código intermedio code a Bytecode"""
+    destinos = jump_targets(code)
+    tabla = SymbolTable(code)
+    marcos, de_posicion = tabla.scopes, tabla.scope_of
+    iteradores = {posicion: marcos[de_posicion[posicion]].hidden_slot(f"<iter {instruction.dst}>")
+                  for posicion, instruction in enumerate(code) if instruction.op == FOR}
+    salida = array('i')
+    offsets = array('i')
+    posiciones = array('i')
+    inicios = []      # posición en salida de cada instrucción de code
+    vueltas = {}      # posición de un FOR -> posición de su FOR_ITER
+    saltos = []       # (índice en salida, posición de code a la que salta)
+
+    def emitir(posicion, *enteros):
+        offsets.append(len(salida))
+        posiciones.append(posicion)
+        salida.extend(enteros)
+
+    for posicion, instruction in enumerate(code):
+        inicios.append(len(salida))
+        marco = marcos[de_posicion[posicion]]
+        op = instruction.op
+
+        def ranura(operando):
+            if type(operando) is not str:
+                return marco.constant_slot(operando.value if isinstance(operando, Const) else operando)
+            local = marco.slot(operando)
+            if marco is not marcos[0] and local >= marco.assigned:
+                emitir(posicion, LOAD_GLOBAL, local, marcos[0].slot(operando), 0)
+            return local
+
+        if op in OPERATORS:
+            a, b = ranura(instruction.src1), ranura(instruction.src2)
+            emitir(posicion, _OPCODES[op], marco.slot(instruction.dst), a, b)
+        elif op == COPY:
+            emitir(posicion, MOVE, marco.slot(instruction.dst), ranura(instruction.src1), 0)
+        elif op == CALL:
+            funcion = ranura(instruction.src1)
+            argumentos = [ranura(argumento) for argumento in instruction.src2]
+            emitir(posicion, CALL_FUNCTION, marco.slot(instruction.dst), funcion, len(argumentos),
+                   *argumentos)
+        elif op in (IF, WHILE):
+            condicion = ranura(instruction.src1)
+            saltos.append((len(salida) + 2, destinos[posicion]))
+            emitir(posicion, JUMP_IF_FALSE, condicion, 0, 0)
+        elif op == ELSE:
+            saltos.append((len(salida) + 1, destinos[posicion]))
+            emitir(posicion, JUMP, 0, 0, 0)
+        elif op == END_WHILE:
+            saltos.append((len(salida) + 1, destinos[posicion]))
+            emitir(posicion, JUMP_BACK, 0, 0, 0)
+        elif op == FOR:
+            iterador = iteradores[posicion]
+            emitir(posicion, GET_ITER, iterador, ranura(instruction.src1), 0)
+            vueltas[posicion] = len(salida)
+            saltos.append((len(salida) + 3, destinos[posicion]))
+            emitir(posicion, FOR_ITER, marco.slot(instruction.dst), iterador, 0)
+        elif op == END_FOR:
+            emitir(posicion, JUMP_BACK, vueltas[destinos[posicion]], 0, 0)
+        elif op == FUNC:
+            indice = de_posicion[posicion + 1]  # El cuerpo empieza después de FUNC
+            saltos.append((len(salida) + 3, destinos[posicion]))
+            emitir(posicion, MAKE_FUNCTION, marco.slot(instruction.dst), indice, 0)
+            marcos[indice].start = len(salida)
+        elif op == END_FUNC:
+            emitir(posicion, RETURN, 0, 0, 0)
+    inicios.append(len(salida))
+    emitir(len(code), RETURN, 0, 0, 0)
+
+    for indice, destino in saltos:
+        salida[indice] = inicios[destino]
+    tabla.finish()
+    return Bytecode(salida, tabla, offsets, posiciones, code)
+
+
+def disassemble(bytecode):
+    """Listado del bytecode: una línea por instrucción, con su posición, el
+    nombre del opcode y los operandos con el nombre o la constante de cada
+    ranura"""
+    code = bytecode.code
+    marcos = bytecode.symbols.scopes
+    abiertos = [marcos[0]]
+    fines = []  # posición donde termina cada función abierta
+    lineas = []
+    pc = 0
+    while pc < len(code):
+        while fines and pc >= fines[-1]:
+            fines.pop()
+            abiertos.pop()
+        marco = abiertos[-1]
+        op, a, b, c = code[pc:pc + 4]
+        texto = marco.operand_text
+        if op < MOVE:
+            operandos = f"{texto(a)}, {texto(b)}, {texto(c)}"
+        elif op == MOVE:
+            operandos = f"{texto(a)}, {texto(b)}"
+        elif op == CALL_FUNCTION:
+            argumentos = ", ".join(map(texto, code[pc + 4:pc + 4 + c]))
+            operandos = f"{texto(a)}, {texto(b)}({argumentos})"
+        elif op == JUMP_IF_FALSE:
+            operandos = f"{texto(a)}, {b}"
+        elif op in (JUMP, JUMP_BACK):
+            operandos = f"{a}"
+        elif op == GET_ITER:
+            operandos = f"{texto(a)}, {texto(b)}"
+        elif op == FOR_ITER:
+            operandos = f"{texto(a)}, {texto(b)}, {c}"
+        elif op == MAKE_FUNCTION:
+            funcion = marcos[b]
+            operandos = f"{texto(a)}({', '.join(funcion.names[:funcion.params])}), {c}"
+        elif op == LOAD_GLOBAL:
+            operandos = f"{texto(a)}, {marcos[0].operand_text(b)}"
+        else:
+            operandos = ""
+        lineas.append(f"{pc:6}  {OPNAMES[op]:<14}{operandos}".rstrip())
+        if op == MAKE_FUNCTION:
+            abiertos.append(marcos[b])
+            fines.append(c)
+        pc += 4 + (c if op == CALL_FUNCTION else 0)
+    return lineas
+
+
+class BytecodeFunction:
+    """Función creada por MAKE_FUNCTION: al llamarla ejecuta su cuerpo en un
+    marco nuevo de su Scope (el índice index de la tabla de símbolos), con
+    los parámetros en las primeras ranuras, y devuelve None"""
+
+    __slots__ = ("scope", "index", "machine", "globals")
+
+    def __init__(self, scope, index, machine, globals):
+        self.scope = scope
+        self.index = index
+        self.machine = machine
+        self.globals = globals
+
+    def __call__(self, *args):
+        marco = self.scope
+        if len(args) != marco.params:
+            raise TypeError(f"{marco.name}() recibe {marco.params} argumentos ({len(args)} dados)")
+        variables = marco.frame()
+        variables[:marco.params] = args
+        self.machine.execute(variables, marco.start, self.globals, self.index)
+
+    def __repr__(self):
+        return f"<función {self.scope.name}>"
+
+
+class VirtualMachine:
+    """Ejecuta Bytecode. Las variables viven en marcos que son listas de
+    ranuras; run carga el diccionario de variables en el marco del nivel
+    superior antes de empezar y lo actualiza al terminar.
+
+    max_iterations limita las vueltas de los ciclos de cada llamada, como en
+    interpreter.Interpreter; una instrucción que falla lanza EvaluationError.
+    """
+
+    def __init__(self, bytecode, max_iterations=None):
+        self.bytecode = bytecode
+        self.instructions = bytecode.code.tolist()
+        self.max_iterations = max_iterations
+
+    def run(self, variables):
+        """Ejecuta el programa sobre variables y las devuelve actualizadas"""
+        tabla = self.bytecode.symbols
+        marco = tabla.load(variables)
+        try:
+            self.execute(marco, 0, marco, 0)
+        finally:
+            tabla.store(marco, variables)
+        return variables
+
+    def execute(self, variables, pc, globals, scope):
+        """Ejecuta desde pc sobre el marco variables hasta el RETURN de la
+        función (o del programa); globals es el marco del nivel superior y
+        scope el índice del marco de la función"""
+        codigo = self.instructions
+        binarias = BINARY_FUNCTIONS
+        limite = float("inf") if self.max_iterations is None else self.max_iterations
+        vueltas = 0
+        try:
+            while True:
+                op = codigo[pc]
+                if op < MOVE:
+                    variables[codigo[pc + 1]] = binarias[op](variables[codigo[pc + 2]], variables[codigo[pc + 3]])
+                    pc += 4
+                elif op == MOVE:
+                    valor = variables[codigo[pc + 2]]
+                    if valor is UNBOUND:
+                        raise NameError
+                    variables[codigo[pc + 1]] = valor
+                    pc += 4
+                elif op == JUMP_IF_FALSE:
+                    pc = pc + 4 if variables[codigo[pc + 1]] else codigo[pc + 2]
+                elif op == JUMP_BACK:
+                    vueltas += 1
+                    if vueltas > limite:
+                        raise ExecutionStopped(f"los ciclos dieron más de {self.max_iterations} vueltas")
+                    pc = codigo[pc + 1]
+                elif op == JUMP:
+                    pc = codigo[pc + 1]
+                elif op == FOR_ITER:
+                    valor = next(variables[codigo[pc + 2]], _END)
+                    if valor is _END:
+                        pc = codigo[pc + 3]
+                    else:
+                        variables[codigo[pc + 1]] = valor
+                        pc += 4
+                elif op == CALL_FUNCTION:
+                    fin = pc + 4 + codigo[pc + 3]
+                    argumentos = [variables[ranura] for ranura in codigo[pc + 4:fin]]
+                    for valor in argumentos:
+                        if valor is UNBOUND:
+                            raise NameError
+                    variables[codigo[pc + 1]] = variables[codigo[pc + 2]](*argumentos)
+                    pc = fin
+                elif op == LOAD_GLOBAL:
+                    valor = globals[codigo[pc + 2]]
+                    if valor is UNBOUND:
+                        raise NameError
+                    variables[codigo[pc + 1]] = valor
+                    pc += 4
+                elif op == GET_ITER:
+                    variables[codigo[pc + 1]] = iter(variables[codigo[pc + 2]])
+                    pc += 4
+                elif op == MAKE_FUNCTION:
+                    indice = codigo[pc + 2]
+                    variables[codigo[pc + 1]] = BytecodeFunction(self.bytecode.symbols.scopes[indice], indice,
+                                                                 self, globals)
+                    pc = codigo[pc + 3]
+                else:
+                    return
+        except ExecutionStopped:
+            raise
+        except Exception as e:
+            raise self._error(pc, variables, globals, scope, e) from e
+
+    def _error(self, pc, variables, globals, scope, error):
+        """EvaluationError de la instrucción en pc; si uno de sus operandos
+        no tiene valor, el error es el NameError de Python"""
+        posicion = self.bytecode.position(pc)
+        instruction = self.bytecode.ir[posicion]
+        error = self.bytecode.symbols.unbound_name(instruction, scope, variables, globals) or error
+        return EvaluationError(posicion, instruction, error)
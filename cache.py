@@ -0,0 +1,226 @@
+import ast
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+
+from lexer import TokenStream, tokenize
+from codegen import CodeGenerator
+from optimizer import DEFAULT_LEVEL, optimize
+
+# Cambiar cuando tokenize, CodeGenerator o translate_to_machine_code produzcan
+# una salida distinta, para no reutilizar artefactos de una versión anterior
+COMPILER_VERSION = "9"
+
+
+class CompilationCache:
+    """Caché en disco de artefactos de compilación, direccionada por contenido.
+
+    Cada entrada se guarda en un archivo propio cuyo nombre es el hash del
+    código fuente, del nivel de optimización y de COMPILER_VERSION. Las escrituras van a un temporal que
+    luego se renombra, así que varios procesos pueden leer y escribir a la vez
+    sin ver entradas a medias. Cada acierto actualiza la fecha de modificación
+    del archivo y, cuando el directorio supera max_bytes, se borran las
+    entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # Estimación del tamaño total; se recalcula al desalojar
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, level=DEFAULT_LEVEL):
+        contenido = f"{COMPILER_VERSION}\0{level}\0{source}".encode("utf-8", "surrogatepass")
+        return hashlib.sha256(contenido).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def get(self, source, level=DEFAULT_LEVEL):
+        """Artefactos guardados para source, o None si no están en la caché"""
+        path = self._path(self.key(source, level))
+        try:
+            with open(path, "rb") as archivo:
+                artefactos = pickle.load(archivo)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        tokens = TokenStream(source)
+        tokens.types, tokens.starts, tokens.ends, tokens.lines, tokens.columns = artefactos.pop("token_columns")
+        artefactos["tokens"] = tokens
+        return artefactos
+
+    def put(self, source, tokens, code, machine_code, variables, optimization=None,
+            level=DEFAULT_LEVEL):
+        """Guarda el TokenStream, el código intermedio ya optimizado, el código
+        máquina, las variables que dejó generate_code y las instrucciones que
+        eliminó cada pase de optimización para source"""
+        artefactos = {
+            "token_columns": (tokens.types, tokens.starts, tokens.ends, tokens.lines, tokens.columns),
+            "code": code,
+            "machine_code": machine_code,
+            "variables": variables,
+            "optimization": optimization or {},
+        }
+        path = self._path(self.key(source, level))
+        carpeta = os.path.dirname(path)
+        os.makedirs(carpeta, exist_ok=True)
+
+        descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                pickle.dump(artefactos, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, path)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+        if self._size is None:
+            self._size = self._disk_usage()[0]
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _disk_usage(self):
+        entradas = []
+        total = 0
+        for carpeta, _, archivos in os.walk(self.directory):
+            for nombre in archivos:
+                if not nombre.endswith(".pickle"):
+                    continue
+                path = os.path.join(carpeta, nombre)
+                try:
+                    estado = os.stat(path)
+                except FileNotFoundError:  # Otro proceso la desalojó
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, path))
+                total += estado.st_size
+        return total, entradas
+
+    def evict(self, target=0.9):
+        """Borra las entradas menos usadas hasta bajar a target * max_bytes"""
+        total, entradas = self._disk_usage()
+        entradas.sort()
+        limite = self.max_bytes * target
+        for _, tamano, path in entradas:
+            if total <= limite:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        self._size = total
+
+
+def estimate_bytes(value):
+    """Tamaño aproximado en memoria de un artefacto de compilación"""
+    if isinstance(value, TokenStream):
+        columnas = (value.types, value.starts, value.ends, value.lines, value.columns)
+        return sum(columna.itemsize * len(columna) for columna in columnas)
+    if isinstance(value, ast.AST):
+        return sum(sys.getsizeof(nodo) + sys.getsizeof(nodo.__dict__) for nodo in ast.walk(value))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class SessionCache:
+    """Artefactos en memoria de los códigos analizados durante una sesión.
+
+    Para cada código fuente guarda las etapas ya calculadas (tokens, AST,
+    variables iniciales y, por nivel de optimización, código intermedio y
+    código máquina) para que cada acción reutilice lo que otra ya hizo y
+    calcule solo lo que falta; cambiar optimization_level no descarta lo
+    calculado con otro nivel. Se descartan los códigos usados hace más
+    tiempo cuando hay más de max_entries o sus artefactos ocupan más de
+    max_bytes.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=32 * 1024 * 1024, optimization_level=DEFAULT_LEVEL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # código fuente -> {etapa: artefacto}
+        self._sizes = {}               # código fuente -> bytes estimados
+        self._bytes = 0
+        self.optimization_level = optimization_level
+
+    def get(self, source, stage):
+        etapas = self._entries.get(source)
+        if etapas is None or stage not in etapas:
+            return None
+        self._entries.move_to_end(source)
+        return etapas[stage]
+
+    def put(self, source, stage, value):
+        if source not in self._entries:
+            self._entries[source] = {}
+            self._sizes[source] = sys.getsizeof(source)
+            self._bytes += self._sizes[source]
+        self._entries.move_to_end(source)
+        etapas = self._entries[source]
+        tamano = estimate_bytes(value)
+        if stage in etapas:
+            tamano -= estimate_bytes(etapas[stage])  # La etapa reemplazada deja de ocupar
+        etapas[stage] = value
+        self._sizes[source] += tamano
+        self._bytes += tamano
+
+        # source quedó al final, así que nunca se descarta el código que se está guardando
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            descartado, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(descartado)
+        return value
+
+    def tokens(self, source):
+        tokens = self.get(source, "tokens")
+        return tokens if tokens is not None else self.put(source, "tokens", tokenize(source))
+
+    def tree(self, source):
+        """AST de source; un SyntaxError se propaga y no se guarda"""
+        tree = self.get(source, "tree")
+        return tree if tree is not None else self.put(source, "tree", ast.parse(source))
+
+    def code_generator(self, source):
+        """CodeGenerator nuevo con el código intermedio de source ya generado y
+        optimizado con optimization_level, listo para ejecutar sin modificar
+        lo guardado"""
+        nivel = self.optimization_level
+        code = self.get(source, ("code", nivel))
+        variables = self.get(source, "variables")
+        if code is None or variables is None:
+            code_gen = CodeGenerator()
+            code_gen.generate_code(self.tree(source))
+            code, eliminadas = optimize(code_gen.code, nivel)
+            self.put(source, ("optimization", nivel), eliminadas)
+            code = self.put(source, ("code", nivel), code)
+            variables = self.put(source, "variables", dict(code_gen.variables))
+
+        code_gen = CodeGenerator()
+        code_gen.code = list(code)
+        code_gen.variables = dict(variables)
+        return code_gen
+
+    def optimization(self, source):
+        """Instrucciones que eliminó cada pase de optimización en source"""
+        etapa = ("optimization", self.optimization_level)
+        eliminadas = self.get(source, etapa)
+        if eliminadas is None:
+            code_gen = CodeGenerator()
+            code_gen.generate_code(self.tree(source))
+            _, eliminadas = optimize(code_gen.code, self.optimization_level)
+            self.put(source, etapa, eliminadas)
+        return eliminadas
+
+    def machine_code(self, source):
+        etapa = ("machine_code", self.optimization_level)
+        machine_code = self.get(source, etapa)
+        if machine_code is None:
+            machine_code = self.put(source, etapa, self.code_generator(source).translate_to_machine_code())
+        return machine_code
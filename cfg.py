@@ -0,0 +1,294 @@
+from ir import ELSE, END_FOR, END_FUNC, END_IF, END_WHILE, FOR, FUNC, IF, LOOP, WHILE
+
+# Grafo de flujo de control del código intermedio. Los marcadores de
+# estructura se emparejan una sola vez y cada uno salta a una posición fija:
+#   IF t      si t es falso, al bloque ELSE (o a END_IF si no lo hay)
+#   ELSE      al terminar la rama verdadera, a END_IF
+#   LOOP      inicio de un While: allí se calcula la condición
+#   WHILE t   si t es falso, a la instrucción siguiente a END_WHILE
+#   END_WHILE vuelve a LOOP
+#   FOR x     sin más elementos, a la instrucción siguiente a END_FOR
+#   END_FOR   vuelve a FOR
+#   FUNC f    salta el cuerpo, a la instrucción siguiente a END_FUNC
+#   END_FUNC  fin del cuerpo de la función: vuelve a quien la llamó
+
+# Marcadores que terminan un bloque básico
+_TERMINATORS = frozenset([IF, ELSE, WHILE, END_WHILE, FOR, END_FOR, FUNC, END_FUNC])
+# Marcadores que, además de seguir de largo, pueden saltar
+_BRANCHES = frozenset([IF, WHILE, FOR])
+
+_OPENERS = {IF: END_IF, LOOP: END_WHILE, FOR: END_FOR, FUNC: END_FUNC}
+
+
+def jump_targets(code):
+    """Posición a la que salta cada marcador de control de flujo, {posición: destino}.
+
+    Un marcador sin pareja lanza ValueError.
+    """
+    destinos = {}
+    abiertos = []     # posiciones de IF, LOOP, FOR y FUNC sin cerrar; ELSE se apila sobre su IF
+    condiciones = {}  # posición de LOOP -> posición de su WHILE
+    for posicion, instruction in enumerate(code):
+        op = instruction.op
+        if op in _OPENERS:
+            abiertos.append(posicion)
+        elif op == ELSE:
+            if not abiertos or code[abiertos[-1]].op != IF:
+                raise ValueError(f"ELSE sin IF en la posición {posicion}")
+            destinos[abiertos[-1]] = posicion + 1
+            abiertos.append(posicion)
+        elif op == WHILE:
+            if not abiertos or code[abiertos[-1]].op != LOOP or abiertos[-1] in condiciones:
+                raise ValueError(f"WHILE sin LOOP en la posición {posicion}")
+            condiciones[abiertos[-1]] = posicion
+        elif op in (END_IF, END_WHILE, END_FOR, END_FUNC):
+            if not abiertos:
+                raise ValueError(f"{op} sin abrir en la posición {posicion}")
+            inicio = abiertos.pop()
+            if code[inicio].op == ELSE:
+                destinos[inicio] = posicion
+                inicio = abiertos.pop()
+            if _OPENERS[code[inicio].op] != op:
+                raise ValueError(f"{op} en la posición {posicion} cierra {code[inicio].op}")
+            if op == END_IF:
+                destinos.setdefault(inicio, posicion)
+            elif op == END_WHILE:
+                if inicio not in condiciones:
+                    raise ValueError(f"LOOP sin WHILE en la posición {inicio}")
+                destinos[posicion] = inicio
+                destinos[condiciones.pop(inicio)] = posicion + 1
+            elif op == END_FOR:
+                destinos[posicion] = inicio
+                destinos[inicio] = posicion + 1
+            else:
+                destinos[inicio] = posicion + 1
+    if abiertos:
+        raise ValueError(f"{code[abiertos[-1]].op} sin cerrar en la posición {abiertos[-1]}")
+    return destinos
+
+
+class BasicBlock:
+    """Instrucciones code[start:end], que se ejecutan siempre de corrido"""
+
+    __slots__ = ("index", "start", "end", "preds", "succs")
+
+    def __init__(self, index, start, end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.preds = []
+        self.succs = []
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"BasicBlock({self.index}, {self.start}, {self.end}, succs={self.succs})"
+
+
+class Loop:
+    """Ciclo natural: header domina a todos los bloques de body, y cada bloque
+    de latches vuelve a header"""
+
+    __slots__ = ("header", "body", "latches")
+
+    def __init__(self, header, body, latches):
+        self.header = header
+        self.body = body
+        self.latches = latches
+
+    def __repr__(self):
+        return f"Loop(header={self.header}, body={sorted(self.body)}, latches={self.latches})"
+
+
+class ControlFlowGraph:
+    """Bloques básicos del código intermedio y los arcos entre ellos.
+
+    blocks[0] es la entrada del programa y el primer bloque del cuerpo de
+    cada FUNC es la entrada de esa función; entries los lista a todos. Los
+    cuerpos de las funciones no tienen arcos desde el resto del programa: se
+    llega a ellos solo con una llamada.
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self.targets = jump_targets(code)
+        lideres = {0, len(code)}
+        lideres.update(self.targets.values())
+        for posicion, instruction in enumerate(code):
+            if instruction.op in _TERMINATORS:
+                lideres.add(posicion + 1)
+        lideres = sorted(lideres)
+        self.blocks = [BasicBlock(indice, inicio, fin)
+                       for indice, (inicio, fin) in enumerate(zip(lideres, lideres[1:]))]
+        self.block_at = {bloque.start: bloque.index for bloque in self.blocks}
+        self.entries = [0] if self.blocks else []
+
+        for bloque in self.blocks:
+            ultima = bloque.end - 1
+            op = code[ultima].op
+            if op == FUNC:
+                self.entries.append(self.block_at[bloque.end])
+                destinos = [self.targets[ultima]]
+            elif op == END_FUNC:
+                destinos = []
+            elif op in _BRANCHES:
+                destinos = [bloque.end, self.targets[ultima]]
+            elif op in _TERMINATORS:
+                destinos = [self.targets[ultima]]
+            else:
+                destinos = [bloque.end]
+            for destino in destinos:
+                if destino < len(code):
+                    self._add_edge(bloque.index, self.block_at[destino])
+        self._idom = None
+        self._intervals = None
+
+    def _add_edge(self, origen, destino):
+        if destino not in self.blocks[origen].succs:
+            self.blocks[origen].succs.append(destino)
+            self.blocks[destino].preds.append(origen)
+
+    def block_of(self, position):
+        """Índice del bloque que contiene la instrucción code[position]"""
+        inferior, superior = 0, len(self.blocks)
+        while superior - inferior > 1:
+            medio = (inferior + superior) // 2
+            if self.blocks[medio].start <= position:
+                inferior = medio
+            else:
+                superior = medio
+        return inferior
+
+    def instructions(self, block):
+        bloque = self.blocks[block]
+        return self.code[bloque.start:bloque.end]
+
+    def exit_block(self):
+        """Bloque desde el que se termina el programa: el último, o el WHILE,
+        FOR o FUNC cuyo salto lleva al final del código; None si no hay código"""
+        n = len(self.code)
+        if not n:
+            return None
+        for posicion, destino in self.targets.items():
+            if destino == n and self.code[posicion].op in (WHILE, FOR, FUNC):
+                return self.block_of(posicion)
+        return self.block_of(n - 1)
+
+    def reverse_postorder(self):
+        """Bloques alcanzables desde alguna entrada, en orden posterior inverso"""
+        visitados = [False] * len(self.blocks)
+        orden = []
+        for entrada in self.entries:
+            if visitados[entrada]:
+                continue
+            visitados[entrada] = True
+            pila = [(entrada, iter(self.blocks[entrada].succs))]
+            while pila:
+                bloque, sucesores = pila[-1]
+                for sucesor in sucesores:
+                    if not visitados[sucesor]:
+                        visitados[sucesor] = True
+                        pila.append((sucesor, iter(self.blocks[sucesor].succs)))
+                        break
+                else:
+                    pila.pop()
+                    orden.append(bloque)
+        orden.reverse()
+        return orden
+
+    def immediate_dominators(self):
+        """Dominador inmediato de cada bloque alcanzable, {bloque: idom}.
+
+        Algoritmo iterativo de Cooper, Harvey y Kennedy sobre el orden
+        posterior inverso. Cada entrada es su propio dominador inmediato.
+        """
+        if self._idom is not None:
+            return self._idom
+        orden = self.reverse_postorder()
+        numero = {bloque: posicion for posicion, bloque in enumerate(orden)}
+        idom = {entrada: entrada for entrada in self.entries}
+        entradas = set(self.entries)
+        cambio = True
+        while cambio:
+            cambio = False
+            for bloque in orden:
+                if bloque in entradas:
+                    continue
+                nuevo = None
+                for pred in self.blocks[bloque].preds:
+                    if pred not in idom:
+                        continue
+                    if nuevo is None:
+                        nuevo = pred
+                        continue
+                    a, b = pred, nuevo
+                    while a != b:
+                        while numero[a] > numero[b]:
+                            a = idom[a]
+                        while numero[b] > numero[a]:
+                            b = idom[b]
+                    nuevo = a
+                if idom.get(bloque) != nuevo:
+                    idom[bloque] = nuevo
+                    cambio = True
+        self._idom = idom
+        return idom
+
+    def dominates(self, a, b):
+        """Si todo camino desde la entrada hasta el bloque b pasa por el bloque a.
+
+        Usa la numeración del árbol de dominadores en preorden: a domina a b
+        si el intervalo de b queda dentro del de a.
+        """
+        if self._intervals is None:
+            self._intervals = self._dominator_intervals()
+        if a not in self._intervals or b not in self._intervals:
+            return False
+        entrada_a, salida_a = self._intervals[a]
+        entrada_b, _ = self._intervals[b]
+        return entrada_a <= entrada_b < salida_a
+
+    def _dominator_intervals(self):
+        """{bloque: (entrada, salida)} del recorrido en preorden del árbol de dominadores"""
+        hijos = {}
+        for bloque, padre in self.immediate_dominators().items():
+            if bloque != padre:
+                hijos.setdefault(padre, []).append(bloque)
+        intervalos = {}
+        contador = 0
+        for entrada in self.entries:
+            pila = [(entrada, False)]
+            while pila:
+                bloque, cerrar = pila.pop()
+                if cerrar:
+                    intervalos[bloque] = (intervalos[bloque], contador)
+                    continue
+                intervalos[bloque] = contador
+                contador += 1
+                pila.append((bloque, True))
+                pila.extend((hijo, False) for hijo in hijos.get(bloque, ()))
+        return intervalos
+
+    def natural_loops(self):
+        """Ciclos naturales, uno por cabecera, de los más externos a los más internos.
+
+        Un arco b -> h es de retorno si h domina a b; el ciclo de h reúne los
+        bloques que llegan a algún b sin pasar por h.
+        """
+        ciclos = {}
+        for bloque in self.reverse_postorder():
+            for sucesor in self.blocks[bloque].succs:
+                if not self.dominates(sucesor, bloque):
+                    continue
+                ciclo = ciclos.get(sucesor)
+                if ciclo is None:
+                    ciclo = ciclos[sucesor] = Loop(sucesor, {sucesor}, [])
+                ciclo.latches.append(bloque)
+                pendientes = [bloque]
+                while pendientes:
+                    actual = pendientes.pop()
+                    if actual not in ciclo.body:
+                        ciclo.body.add(actual)
+                        pendientes.extend(self.blocks[actual].preds)
+        return sorted(ciclos.values(), key=lambda ciclo: -len(ciclo.body))
@@ -0,0 +1,330 @@
+import ast
+import builtins
+from sys import intern
+
+from ir import (CALL, COPY, ELSE, END_FOR, END_FUNC, END_IF, END_WHILE, FOR, FUNC, IF, LOOP,
+                OPERATORS, WHILE, Const, Instruction, const, name)
+from bytecode import VirtualMachine, assemble
+from interpreter import ExecutionStopped, Interpreter
+from machine import DEFAULT_REGISTERS, MIN_REGISTERS, MachineSimulator, allocate_registers, format_machine_code
+from peephole import DEFAULT_RULES, peephole
+
+# Vueltas de ciclo que puede dar execute_code antes de detenerse, para que un
+# ciclo infinito no bloquee a quien lo llama
+MAX_ITERATIONS = 10_000_000
+
+# Nodos que no generan código: su operando se obtiene directamente del nodo
+_LEAVES = frozenset([ast.Name, ast.Constant])
+
+_OPERATOR_SYMBOLS = {
+    ast.Add: '+',
+    ast.Sub: '-',
+    ast.Mult: '*',
+    ast.Div: '/',
+    ast.Mod: '%',
+    ast.Pow: '**',
+    ast.Eq: '==',
+    ast.NotEq: '!=',
+    ast.Lt: '<',
+    ast.LtE: '<=',
+    ast.Gt: '>',
+    ast.GtE: '>='
+}
+
+# Nodos que, como sentencias, no dejan ningún operando
+_STATEMENTS = frozenset([ast.Module, ast.Assign, ast.FunctionDef, ast.If, ast.While, ast.For])
+
+
+class CodeGenerator:
+    def __init__(self):
+        self.code = []
+        self.temp_counter = 0
+        self.machine_code = []
+        self.bytecode = None
+        self.machine = None
+        self.peephole_hits = {}
+        self.variables = {}
+
+    def generate_code(self, node):
+        """Genera el código intermedio de node y devuelve su operando (None para
+        las sentencias).
+
+        No usa recursión de Python: una pila explícita de tareas (función, nodo)
+        recorre el árbol y una pila de valores lleva los operandos ya generados.
+        Cada tipo de nodo tiene su manejador en _handlers; al expandirse apila
+        primero su continuación y luego sus hijos. Las expresiones dejan un valor
+        en la pila y las sentencias ninguno. Los nombres y constantes no generan
+        código, así que se resuelven directamente al emitir la instrucción que
+        los usa, sin pasar por las pilas.
+        """
+        self._tasks = tasks = []
+        self._values = values = []
+        self._push_node(node)
+        pop = tasks.pop
+        while tasks:
+            handler, item = pop()
+            handler(self, item)
+        return values.pop() if values else None
+
+    def _push_node(self, node):
+        self._tasks.append((self._handlers.get(type(node), CodeGenerator._unsupported), node))
+
+    def _push_child(self, node):
+        """Apila un hijo que no sea hoja; las hojas las resuelve _operand"""
+        if type(node) not in _LEAVES:
+            self._push_node(node)
+
+    def _operand(self, node):
+        node_type = type(node)
+        if node_type is ast.Name:
+            return intern(node.id)
+        if node_type is ast.Constant:
+            return const(node.value)
+        return self._values.pop()
+
+    def _push_statements(self, statements):
+        for stmt in reversed(statements):
+            if type(stmt) not in _STATEMENTS:
+                self._tasks.append((CodeGenerator._discard, None))
+            self._push_node(stmt)
+
+    def _discard(self, _):
+        self._values.pop()
+
+    def _unsupported(self, node):
+        self._values.append(None)
+
+    def _module(self, node):
+        self._push_statements(node.body)
+
+    def _assign(self, node):  # Asignaciones
+        if type(node.value) in _LEAVES:
+            return self._emit_assign(node)
+        self._tasks.append((CodeGenerator._emit_assign, node))
+        self._push_node(node.value)
+
+    def _emit_assign(self, node):
+        target = name(node.targets[0].id)
+        value = self._operand(node.value)
+        self.code.append(Instruction(COPY, target, value))
+        self.variables[target] = str(value)  # Guardar el valor de la variable
+
+    def _binop(self, node):  # Operaciones binarias
+        # Es el nodo más frecuente, así que _push_child y _operand van en línea.
+        # El hijo izquierdo es lo próximo que saldría de la pila, de modo que
+        # una cadena a + b + c + ... se recorre en este mismo bucle.
+        tasks = self._tasks
+        while True:
+            right, left = node.right, node.left
+            right_leaf = type(right) in _LEAVES
+            left_leaf = type(left) in _LEAVES
+            if right_leaf and left_leaf:
+                return self._emit_binop(node)
+            tasks.append((CodeGenerator._emit_binop, node))
+            if not right_leaf:
+                tasks.append((self._handlers.get(type(right), CodeGenerator._unsupported), right))
+            if left_leaf:
+                return
+            if type(left) is not ast.BinOp:
+                return tasks.append((self._handlers.get(type(left), CodeGenerator._unsupported), left))
+            node = left
+
+    def _emit_binop(self, node):
+        right, left = node.right, node.left
+        right_type, left_type = type(right), type(left)
+        right = (intern(right.id) if right_type is ast.Name else const(right.value)
+                 if right_type is ast.Constant else self._values.pop())
+        left = (intern(left.id) if left_type is ast.Name else const(left.value)
+                if left_type is ast.Constant else self._values.pop())
+        op = _OPERATOR_SYMBOLS.get(type(node.op), '')
+        self.temp_counter += 1
+        temp_var = intern(f"t{self.temp_counter}")
+        self.code.append(Instruction(op, temp_var, left, right))
+        self._values.append(temp_var)
+
+    def _compare(self, node):  # Comparaciones
+        if len(node.ops) != 1:
+            self._values.append(None)
+            return
+        if type(node.left) in _LEAVES and type(node.comparators[0]) in _LEAVES:
+            return self._emit_compare(node)
+        self._tasks.append((CodeGenerator._emit_compare, node))
+        self._push_child(node.comparators[0])
+        self._push_child(node.left)
+
+    def _emit_compare(self, node):
+        right = self._operand(node.comparators[0])
+        left = self._operand(node.left)
+        op = self.get_operator_symbol(node.ops[0])
+        temp_var = self.new_temp()
+        self.code.append(Instruction(op, temp_var, left, right))
+        self._values.append(temp_var)
+
+    def _leaf(self, node):  # Variables y constantes fuera de otra expresión
+        self._values.append(self._operand(node))
+
+    def _expr(self, node):  # Expresiones
+        self._push_node(node.value)
+
+    def _call(self, node):  # Llamadas a funciones
+        self._tasks.append((CodeGenerator._emit_call, node))
+        for arg in reversed(node.args):
+            self._push_child(arg)
+
+    def _emit_call(self, node):
+        # Los argumentos que no son hojas salen de la pila en orden inverso
+        args = [self._operand(arg) for arg in reversed(node.args)]
+        args.reverse()
+        temp_var = self.new_temp()
+        self.code.append(Instruction(CALL, temp_var, name(node.func.id), tuple(args)))
+        self._values.append(temp_var)
+
+    def _function_def(self, node):  # Definición de funciones
+        func_name = name(node.name)
+        args = tuple(name(arg.arg) for arg in node.args.args)
+        self.code.append(Instruction(FUNC, func_name, args))
+        self._tasks.append((CodeGenerator._emit_marker, Instruction(END_FUNC, func_name)))
+        self._push_statements(node.body)
+
+    def _emit_marker(self, instruction):
+        self.code.append(instruction)
+
+    def _if(self, node):  # Estructuras condicionales
+        self._tasks.append((CodeGenerator._emit_marker, Instruction(END_IF)))
+        if node.orelse:
+            self._push_statements(node.orelse)
+            self._tasks.append((CodeGenerator._emit_marker, Instruction(ELSE)))
+        self._push_statements(node.body)
+        self._tasks.append((CodeGenerator._emit_test, (IF, node)))
+        self._push_child(node.test)
+
+    def _emit_test(self, item):
+        op, node = item
+        self.code.append(Instruction(op, src1=self._operand(node.test)))
+
+    def _while(self, node):  # Ciclos While
+        self._tasks.append((CodeGenerator._emit_marker, Instruction(END_WHILE)))
+        self._push_statements(node.body)
+        self._tasks.append((CodeGenerator._emit_test, (WHILE, node)))
+        self._push_child(node.test)
+        self._tasks.append((CodeGenerator._emit_marker, Instruction(LOOP)))
+
+    def _for(self, node):  # Ciclos For
+        self._tasks.append((CodeGenerator._emit_marker, Instruction(END_FOR)))
+        self._push_statements(node.body)
+        self._tasks.append((CodeGenerator._emit_for, node))
+        self._push_child(node.iter)
+        self._push_child(node.target)
+
+    def _emit_for(self, node):
+        iter_ = self._operand(node.iter)
+        target = self._operand(node.target)
+        self.code.append(Instruction(FOR, target, iter_))
+
+    _handlers = {
+        ast.Module: _module,
+        ast.Assign: _assign,
+        ast.BinOp: _binop,
+        ast.Compare: _compare,
+        ast.Name: _leaf,
+        ast.Constant: _leaf,
+        ast.Expr: _expr,
+        ast.Call: _call,
+        ast.FunctionDef: _function_def,
+        ast.If: _if,
+        ast.While: _while,
+        ast.For: _for,
+    }
+
+    def get_operator_symbol(self, operator):
+        return _OPERATOR_SYMBOLS.get(type(operator), '')
+
+    def new_temp(self):
+        self.temp_counter += 1
+        return intern(f"t{self.temp_counter}")
+
+    def translate_to_machine_code(self, registers=DEFAULT_REGISTERS, rules=DEFAULT_RULES):
+        """Traduce el código intermedio a código máquina con registers
+        registros (self.machine, ver machine.allocate_registers), le aplica
+        las reglas de mirilla rules (peephole.RULES; las aplicaciones de cada
+        una quedan en self.peephole_hits) y devuelve su listado"""
+        self.machine, self.peephole_hits = peephole(allocate_registers(self.code, registers), rules)
+        self.machine_code = format_machine_code(self.machine)
+        return self.machine_code
+
+    def execute_code(self, max_iterations=MAX_ITERATIONS, compiled=True):
+        """Ejecuta el código con las variables definidas, siguiendo condicionales,
+        ciclos y llamadas a funciones. Devuelve los mensajes de la ejecución;
+        el último es siempre el estado final de las variables. Una instrucción
+        que falla detiene la ejecución y su error es el mensaje anterior.
+        compiled elige el modo del intérprete (ver Interpreter)."""
+        final_output = []
+        try:
+            Interpreter(self.code, max_iterations, compiled).run(self.variables)
+        except ExecutionStopped as e:
+            final_output.append(f"Ejecución detenida: {e}")
+        final_output.append(f"Resultado final de la ejecución: {self.variables}")
+        return final_output
+
+    def execute_bytecode(self, max_iterations=MAX_ITERATIONS):
+        """Como execute_code, pero ejecuta el bytecode en la máquina virtual;
+        lo ensambla si todavía no lo hizo (self.bytecode)"""
+        if self.bytecode is None or self.bytecode.ir is not self.code:
+            self.bytecode = assemble(self.code)
+        final_output = []
+        try:
+            VirtualMachine(self.bytecode, max_iterations).run(self.variables)
+        except ExecutionStopped as e:
+            final_output.append(f"Ejecución detenida: {e}")
+        final_output.append(f"Resultado final de la ejecución: {self.variables}")
+        return final_output
+
+    def simulate_machine_code(self, registers=DEFAULT_REGISTERS, max_iterations=MAX_ITERATIONS):
+        """Como execute_code, pero ejecuta el código máquina con registers
+        registros en el simulador. Antes del estado final informa las cargas
+        y guardados a memoria que hizo, y cuántos tiene el código frente a la
+        traducción sin registros; esa se cuenta sin ejecutarla, así que el
+        programa corre una sola vez."""
+        if self.machine is None or self.machine.ir is not self.code or self.machine.registers != registers:
+            self.translate_to_machine_code(registers)
+        cargas, guardados = self.machine.memory_accesses()
+        cargas_base, guardados_base = allocate_registers(self.code, MIN_REGISTERS).memory_accesses()
+        simulador = MachineSimulator(self.machine, max_iterations)
+        final_output = []
+        try:
+            simulador.run(self.variables)
+        except ExecutionStopped as e:
+            final_output.append(f"Ejecución detenida: {e}")
+        final_output.append(f"Cargas desde memoria: {simulador.loads} (el código tiene {cargas}, "
+                            f"{cargas_base - cargas} menos que sin registros)")
+        final_output.append(f"Guardados en memoria: {simulador.stores} (el código tiene {guardados}, "
+                            f"{guardados_base - guardados} menos que sin registros)")
+        final_output.append(f"Resultado final de la ejecución: {self.variables}")
+        return final_output
+
+    def eval_expression(self, instruction):
+        """Evaluar la instrucción del código intermedio sobre las variables actuales"""
+        try:
+            op = instruction.op
+            if op == COPY:
+                return self.operand_value(instruction.src1)
+            if op == CALL:
+                function = self.operand_value(instruction.src1)
+                return function(*[self.operand_value(arg) for arg in instruction.src2])
+            if op not in OPERATORS:
+                raise TypeError(f"operador no soportado: '{op}'")
+            return OPERATORS[op](self.operand_value(instruction.src1), self.operand_value(instruction.src2))
+        except Exception as e:
+            return f"Error al evaluar: {e}"
+
+    def operand_value(self, operand):
+        """Valor de un operando: constante, variable o función incorporada"""
+        if isinstance(operand, Const):
+            return operand.value
+        if operand is None:
+            return None
+        if operand in self.variables:
+            return self.variables[operand]
+        if hasattr(builtins, operand):
+            return getattr(builtins, operand)
+        raise NameError(f"name '{operand}' is not defined")
@@ -19,23 +19,25 @@ TOKENS = [
     ("DELIMITADORES", r'[(){}[\],.;:]'),
 ]
 
+# Expresión maestra: todas las categorías de TOKENS en una sola alternancia de
+# grupos nombrados, compilada una única vez. La alternancia respeta el orden de
+# TOKENS, así que en cada posición gana la misma categoría que antes. El último
+# grupo captura cualquier carácter que ninguna categoría reconoce.
+TOKEN_DESCONOCIDO = "DESCONOCIDO"
+TOKEN_REGEX = re.compile("|".join(
+    [f"(?P<{token_type}>{token_regex})" for token_type, token_regex in TOKENS]
+    + [f"(?P<{TOKEN_DESCONOCIDO}>(?s:.))"]
+))
+
 def tokenize(code):
     tokens = defaultdict(list)
-    position = 0
-
-    while position < len(code):
-        match = None
-        for token_type, token_regex in TOKENS:
-            regex = re.compile(token_regex)
-            match = regex.match(code, position)
-            if match:
-                tokens[token_type].append(match.group(0))
-                position = match.end(0)
-                break
-
-        if not match:
-            print(f"Error: Token desconocido en la posición {position}")
+
+    for match in TOKEN_REGEX.finditer(code):
+        token_type = match.lastgroup
+        if token_type == TOKEN_DESCONOCIDO:
+            print(f"Error: Token desconocido en la posición {match.start()}")
             break
+        tokens[token_type].append(match.group())
 
     return tokens
 
@@ -1,208 +1,35 @@
-import re
 import ast
-import matplotlib.pyplot as plt
-import networkx as nx
 from collections import defaultdict
-import tkinter as tk
-from tkinter import messagebox, scrolledtext
-
-# Definición de los tokens
-TOKENS = [
-    ("CLAVES", r'\b(if|else|while|for|return|break|continue|def|class|print|int|float|input)\b'),
-    ("IDENTIFICADORES", r'\b[a-zA-Z_]\w*\b'),
-    ("NUMEROS", r'\b\d+(\.\d+)?\b'),
-    ("OPERADORES", r'[+\-*/%=<>!&|^~]'),
-    ("STRING", r'"[^"\\](\\.[^"\\])*"'),
-    ("SALTOS_DE_LINEA", r'\n'),
-    ("ESPACIOS", r'[ \t]+'),
-    ("COMENTARIOS", r'#.*'),
-    ("DELIMITADORES", r'[(){}[\],.;:]'),
-]
-
-def tokenize(code):
-    tokens = defaultdict(list)
-    position = 0
-
-    while position < len(code):
-        match = None
-        for token_type, token_regex in TOKENS:
-            regex = re.compile(token_regex)
-            match = regex.match(code, position)
-            if match:
-                tokens[token_type].append(match.group(0))
-                position = match.end(0)
-                break
-
-        if not match:
-            print(f"Error: Token desconocido en la posición {position}")
-            break
-
-    return tokens
-
-class CodeGenerator:
-    def __init__(self):
-        self.code = []
-        self.temp_counter = 0
-        self.machine_code = []
-        self.variables = {}
-
-    def generate_code(self, node):
-        if isinstance(node, ast.Module):
-            for stmt in node.body:
-                self.generate_code(stmt)
-
-        elif isinstance(node, ast.Assign):  # Asignaciones
-            target = node.targets[0].id
-            value = self.generate_code(node.value)
-            self.code.append(f"{target} = {value}")
-            self.variables[target] = value  # Guardar el valor de la variable
-
-        elif isinstance(node, ast.BinOp):  # Operaciones binarias
-            left = self.generate_code(node.left)
-            right = self.generate_code(node.right)
-            op = self.get_operator_symbol(node.op)
-            temp_var = self.new_temp()
-            self.code.append(f"{temp_var} = {left} {op} {right}")
-            return temp_var
-
-        elif isinstance(node, ast.Name):  # Variables
-            return node.id
-
-        elif isinstance(node, ast.Constant):  # Constantes
-            return str(node.value)
-
-        elif isinstance(node, ast.Expr):  # Expresiones
-            return self.generate_code(node.value)
-
-        elif isinstance(node, ast.Call):  # Llamadas a funciones
-            func_name = node.func.id
-            args = [self.generate_code(arg) for arg in node.args]
-            temp_var = self.new_temp()
-            self.code.append(f"{temp_var} = {func_name}({', '.join(args)})")
-            return temp_var
-
-        elif isinstance(node, ast.FunctionDef):  # Definición de funciones
-            func_name = node.name
-            args = [arg.arg for arg in node.args.args]
-            self.code.append(f"FUNC {func_name}({', '.join(args)})")
-            for stmt in node.body:
-                self.generate_code(stmt)
-            self.code.append(f"END_FUNC {func_name}")
-
-        elif isinstance(node, ast.If):  # Estructuras condicionales
-            test = self.generate_code(node.test)
-            self.code.append(f"IF {test} THEN")
-            for stmt in node.body:
-                self.generate_code(stmt)
-            if node.orelse:
-                self.code.append("ELSE")
-                for stmt in node.orelse:
-                    self.generate_code(stmt)
-            self.code.append("END_IF")
-
-        elif isinstance(node, ast.While):  # Ciclos While
-            test = self.generate_code(node.test)
-            self.code.append(f"WHILE {test} DO")
-            for stmt in node.body:
-                self.generate_code(stmt)
-            self.code.append("END_WHILE")
-
-        elif isinstance(node, ast.For):  # Ciclos For
-            target = self.generate_code(node.target)
-            iter_ = self.generate_code(node.iter)
-            self.code.append(f"FOR {target} IN {iter_} DO")
-            for stmt in node.body:
-                self.generate_code(stmt)
-            self.code.append("END_FOR")
-
-    def get_operator_symbol(self, operator):
-        operator_mapping = {
-            ast.Add: '+',
-            ast.Sub: '-',
-            ast.Mult: '*',
-            ast.Div: '/',
-            ast.Mod: '%',
-            ast.Pow: '**'
-        }
-        return operator_mapping.get(type(operator), '')
-
-    def new_temp(self):
-        self.temp_counter += 1
-        return f"t{self.temp_counter}"
-
-    def translate_to_machine_code(self):
-        """Convierte el código intermedio a código máquina simulado"""
-        for instruction in self.code:
-            if "=" in instruction:
-                target, expression = instruction.split("=", 1)
-                target = target.strip()
-                expression = expression.strip()
-                self.machine_code.append(f"LOAD {expression}")
-                self.machine_code.append(f"STORE {target}")
-            elif instruction.startswith("FUNC"):
-                self.machine_code.append(instruction.replace("FUNC", "DEF"))
-            elif instruction.startswith("END_FUNC"):
-                self.machine_code.append(instruction.replace("END_FUNC", "RET"))
-            elif instruction.startswith("IF"):
-                self.machine_code.append(instruction.replace("IF", "CMP"))
-            elif instruction.startswith("WHILE"):
-                self.machine_code.append(instruction.replace("WHILE", "LOOP_START"))
-            elif instruction.startswith("END_WHILE"):
-                self.machine_code.append("LOOP_END")
-            elif instruction.startswith("FOR"):
-                self.machine_code.append(instruction.replace("FOR", "ITER_START"))
-            elif instruction.startswith("END_FOR"):
-                self.machine_code.append("ITER_END")
-            else:
-                self.machine_code.append(f"EXEC {instruction}")
-
-        return self.machine_code
-
-    def execute_code(self):
-        """Simula la ejecución del código con las variables definidas"""
-        final_output = []
-        for instruction in self.code:
-            if "=" in instruction:
-                target, value = instruction.split("=", 1)
-                target = target.strip()
-                value = value.strip()
-                self.variables[target] = self.eval_expression(value)
-            elif instruction.startswith("IF"):
-                # Aquí puedes agregar lógica para simular ejecución de condicionales
-                pass
-            elif instruction.startswith("FOR") or instruction.startswith("WHILE"):
-                # Agregar lógica de ejecución de ciclos
-                pass
-            final_output.append(f"Variables: {self.variables}")
-
-        # Mostrar solo el resultado final después de la ejecución
-        final_output.append(f"Resultado final de la ejecución: {self.variables}")
-        return final_output
-
-    def eval_expression(self, expression):
-        """Evaluar la expresión en el código intermedio"""
-        # Esta función debería manejar las operaciones y devolver el resultado
-        try:
-            return eval(expression, {}, self.variables)
-        except Exception as e:
-            return f"Error al evaluar: {e}"
-
 
+# El núcleo del compilador no depende de la interfaz; tkinter, matplotlib y
+# networkx se importan solo cuando se abre la ventana o se dibuja el árbol
+from lexer import (TOKENS, IncrementalLexer, Token, TokenStream, split_lines,
+                   tokenize, tokenize_file)
+from codegen import CodeGenerator
+from ir import format_code
+from cache import SessionCache
+from optimizer import LEVELS
 
 
 class SyntaxTreeVisualizer:
-    def __init__(self, clear_texts_callback):
+    def __init__(self, clear_texts_callback, session=None):
         self.clear_texts_callback = clear_texts_callback
+        self.session = session
 
     def analyze_syntax(self, code):
+        from tkinter import messagebox
+
         try:
-            tree = ast.parse(code)
+            tree = self.session.tree(code) if self.session else ast.parse(code)
             messagebox.showinfo("Análisis Sintáctico", "El análisis sintáctico fue exitoso.")
             self.visualize_ast(tree, code)
         except SyntaxError as e:
             messagebox.showerror("Error de Sintaxis", f"Error de sintaxis: {e}")
 
     def visualize_ast(self, tree, code):
+        import matplotlib.pyplot as plt
+        import networkx as nx
+
         G = nx.DiGraph()
         node_counter = defaultdict(int)
 
@@ -277,13 +104,59 @@ class SyntaxTreeVisualizer:
 
         return pos
 
+def follow_line_edits(widget, callback):
+    """Avisa qué líneas cambia cada edición de un widget Text.
+
+    Reemplaza el comando Tcl del widget por uno que pasa todo al original y,
+    en insert, delete y replace, llama a callback(first, last, lines): las
+    líneas [first, last) de antes (desde 0) pasaron a ser lines, con el texto
+    de "1.0" a "end-1c" dividido como split_lines. Solo se lee del widget la
+    zona editada, así que una tecla no cuesta nada proporcional al texto.
+    """
+    original = widget._w + "_original"
+    widget.tk.call("rename", widget._w, original)
+
+    def linea(indice):
+        return int(str(widget.tk.call(original, "index", indice)).split(".")[0]) - 1
+
+    def comando(*args):
+        if not args or args[0] not in ("insert", "delete", "replace"):
+            return widget.tk.call((original,) + args)
+        if args[0] == "insert":
+            tramos = [(args[1], args[1])]
+        elif args[0] == "replace":
+            tramos = [(args[1], args[2])]
+        else:
+            indices = list(args[1:])
+            if len(indices) % 2:  # delete con un solo índice borra un carácter
+                indices.append(f"{indices[-1]} +1c")
+            tramos = list(zip(indices[::2], indices[1::2]))
+        # Un índice después del final ("end") cae en la línea siguiente a la última
+        total = linea("end-1c")
+        first = min(min(linea(inicio) for inicio, _ in tramos), total)
+        last = min(max(linea(fin) for _, fin in tramos), total)
+        resultado = widget.tk.call((original,) + args)
+        nuevo_total = linea("end-1c")
+        ultima = last + nuevo_total - total
+        if ultima < nuevo_total:
+            lines = split_lines(widget.tk.call(original, "get", f"{first + 1}.0", f"{ultima + 2}.0"))[:-1]
+        else:
+            lines = split_lines(widget.tk.call(original, "get", f"{first + 1}.0", "end-1c"))
+        callback(first, last + 1, lines)
+        return resultado
+
+    widget.tk.createcommand(widget._w, comando)
+
+
 def main():
+    import tkinter as tk
+    from tkinter import messagebox, scrolledtext
+
     def analyze_tokens():
         codigo_fuente = text_area.get("1.0", tk.END).strip()
         if codigo_fuente:
-            tokens = tokenize(codigo_fuente)
             result = "\nTokens identificados agrupados por categoría:\n"
-            for token_type, token_values in tokens.items():
+            for token_type, token_values in lexer.grouped().items():
                 result += f"{token_type}: {', '.join(token_values)}\n"
             text_output.delete("1.0", tk.END)
             text_output.insert(tk.END, result)
@@ -293,7 +166,7 @@ def main():
     def analyze_syntax():
         codigo_fuente = text_area.get("1.0", tk.END).strip()
         if codigo_fuente:
-            visualizer = SyntaxTreeVisualizer(clear_texts)
+            visualizer = SyntaxTreeVisualizer(clear_texts, session)
             visualizer.analyze_syntax(codigo_fuente)
         else:
             messagebox.showwarning("Advertencia", "Ingrese el código fuente antes de analizar.")
@@ -302,17 +175,17 @@ def main():
         codigo_fuente = text_area.get("1.0", tk.END).strip()
         if codigo_fuente:
             try:
-                tree = ast.parse(codigo_fuente)
-                code_gen = CodeGenerator()
-                code_gen.generate_code(tree)
+                code_gen = session.code_generator(codigo_fuente)
 
                 # Código intermedio
-                final_code = "\n".join(code_gen.code)
+                final_code = "\n".join(format_code(code_gen.code))
                 text_output.delete("1.0", tk.END)
                 text_output.insert(tk.END, "Código intermedio generado:\n" + final_code)
+                eliminadas = sum(session.optimization(codigo_fuente).values())
+                text_output.insert(tk.END, f"\n\nInstrucciones eliminadas por la optimización: {eliminadas}")
 
                 # Traducción a código de máquina
-                machine_code = code_gen.translate_to_machine_code()
+                machine_code = session.machine_code(codigo_fuente)
                 machine_code_str = "\n".join(machine_code)
                 text_output.insert(tk.END, "\n\nCódigo de máquina generado:\n" + machine_code_str)
 
@@ -323,6 +196,8 @@ def main():
                 # Solo obtenemos el último valor del diccionario de variables
                 final_vars = execution_result[-1]  # Asumimos que 'execution_result' tiene el estado final de las variables
                 text_output.insert(tk.END, "\n\nResultado final de la ejecución:\n" + str(final_vars))
+                for mensaje in execution_result[:-1]:  # La ejecución se detuvo por un error
+                    text_output.insert(tk.END, "\n" + mensaje)
 
             except SyntaxError as e:
                 messagebox.showerror("Error de Sintaxis", f"Error de sintaxis: {e}")
@@ -335,6 +210,12 @@ def main():
         text_area.delete("1.0", tk.END)
         text_output.delete("1.0", tk.END)
 
+    # Tokens por línea del texto ingresado: cada edición re-escanea solo las
+    # líneas que tocó (follow_line_edits) y actualiza la cuenta en vivo
+    lexer = IncrementalLexer()
+    # AST, código intermedio y código máquina compartidos entre botones
+    session = SessionCache()
+
     window = tk.Tk()
     window.title("Analizador Sintáctico")
     window.geometry("800x600")
@@ -347,6 +228,15 @@ def main():
     label_input.pack()
     text_area = scrolledtext.ScrolledText(window, wrap=tk.WORD, width=70, height=5, bg="lightgrey", fg="black")
     text_area.pack(pady=10)
+    token_counts = tk.Label(window, text="", bg="#ADD8E6", font=("Times New Roman", 10), fg="black")
+    token_counts.pack()
+
+    def edited_lines(first, last, lines):
+        lexer.replace_lines(first, last, lines)
+        token_counts.configure(text=", ".join(f"{token_type}: {count}"
+                                              for token_type, count in lexer.counted().items()))
+
+    follow_line_edits(text_area, edited_lines)
 
     analyze_tokens_button = tk.Button(window, text="Analizar Tokens", command=analyze_tokens, bg="darkblue", fg="white", width=20)
     analyze_tokens_button.pack()
@@ -357,6 +247,14 @@ def main():
     generate_code_button = tk.Button(window, text="Generar Código Final", command=generate_final_code, bg="darkblue", fg="white", width=20)
     generate_code_button.pack()
 
+    # Nivel de optimización del código intermedio que usa "Generar Código Final"
+    optimization_level = tk.IntVar(value=session.optimization_level)
+    optimization_menu = tk.OptionMenu(window, optimization_level, *sorted(LEVELS),
+                                      command=lambda nivel: setattr(session, "optimization_level", nivel))
+    optimization_menu.configure(bg="#ADD8E6", fg="black")
+    tk.Label(window, text="Nivel de optimización:", bg="#ADD8E6", font=("Times New Roman", 12), fg="black").pack()
+    optimization_menu.pack()
+
     clear_button = tk.Button(window, text="Limpiar", command=clear_texts, bg="darkred", fg="white", width=20)
     clear_button.pack(pady=10)
 
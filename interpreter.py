@@ -0,0 +1,368 @@
+import functools
+import types
+from bisect import bisect_left
+
+from cfg import jump_targets
+from ir import (CALL, COPY, ELSE, END_FOR, END_FUNC, END_WHILE, FOR, FUNC, IF, OPERATORS, WHILE, Const,
+                format_instruction)
+from symbols import UNBOUND, SymbolTable
+
+# Intérprete del código intermedio con control de flujo real. decode
+# resuelve una sola vez los saltos (cfg.jump_targets) y convierte cada
+# instrucción en una tupla (tipo, dst, función, a, b, destino) cuyos
+# operandos son ranuras de la tabla de símbolos (symbols.py) y cuyos
+# destinos ya son posiciones del programa decodificado, de modo que el
+# ciclo de ejecución solo compara enteros e indexa el marco, una lista.
+# Dentro de una función, un nombre global se copia antes a su ranura local
+# (_LOAD_GLOBAL). Con compiled=True, cada tramo de operaciones seguidas al
+# que no entra ningún salto se compila una sola vez a una función de
+# Python (compile_block) y el ciclo la llama como una sola instrucción,
+# que también decide el salto si el tramo termina en un IF o WHILE. Una
+# operación que falla detiene la ejecución con EvaluationError.
+
+# Tipos de instrucción decodificada, en el orden en que los prueba el ciclo
+(_BLOCK, _BLOCK_BRANCH, _BINARY, _COPY, _BRANCH, _CALL, _LOOP_BACK, _FOR, _JUMP, _LOAD_GLOBAL, _FUNC,
+ _RETURN) = range(12)
+
+# Tipos que compile_block puede reunir en un bloque
+_OPERATION_TYPES = frozenset([_BINARY, _COPY, _CALL])
+
+# Instrucciones que quedan en el programa decodificado
+_DECODED_OPS = frozenset([*OPERATORS, COPY, IF, WHILE, CALL, END_WHILE, END_FOR, FOR, ELSE, FUNC,
+                          END_FUNC])
+
+# Globales de las funciones compiladas: el valor de una ranura sin asignar
+# y la función que falla al encontrarlo
+_BLOCK_GLOBALS = {"_u": UNBOUND, "_f": UNBOUND.fail}
+
+_END = object()  # Fin de un iterador en _FOR
+
+
+class ExecutionStopped(Exception):
+    """La ejecución no puede seguir: una instrucción falló o un ciclo superó
+    el máximo de vueltas"""
+
+
+class EvaluationError(ExecutionStopped):
+    """Una instrucción falló al ejecutarse. position es su posición en el
+    código intermedio, instruction la instrucción y error la excepción que
+    lanzó; un error dentro de una función llamada conserva la posición
+    donde ocurrió."""
+
+    def __init__(self, position, instruction, error):
+        super().__init__(position, instruction, error)
+        self.position = position
+        self.instruction = instruction
+        self.error = error
+
+    def __str__(self):
+        return (f"error al evaluar {format_instruction(self.instruction)} en la posición "
+                f"{self.position}: {type(self.error).__name__}: {self.error}")
+
+
+class Function:
+    """Función definida con FUNC. Al llamarla ejecuta su cuerpo en un marco
+    nuevo de su Scope, con los parámetros en las primeras ranuras; los
+    nombres que no asigna los lee del marco global. El código intermedio no
+    tiene return, así que devuelve None."""
+
+    __slots__ = ("scope", "interpreter", "globals")
+
+    def __init__(self, scope, interpreter, globals):
+        self.scope = scope
+        self.interpreter = interpreter
+        self.globals = globals
+
+    def __call__(self, *args):
+        marco = self.scope
+        if len(args) != marco.params:
+            raise TypeError(f"{marco.name}() recibe {marco.params} argumentos ({len(args)} dados)")
+        variables = marco.frame()
+        variables[:marco.params] = args
+        self.interpreter.execute(variables, marco.start, self.globals)
+
+    def __repr__(self):
+        return f"<función {self.scope.name}>"
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_function(texto):
+    """Objeto código de la única función que define texto; un mismo texto
+    se compila una sola vez"""
+    modulo = compile(texto, "<bloque>", "exec")
+    return next(constante for constante in modulo.co_consts if isinstance(constante, types.CodeType))
+
+
+def compile_block(instructions, lookup):
+    """(código, constantes) de una función de Python que ejecuta en orden las
+    operaciones instructions y se crea con
+    types.FunctionType(código, _BLOCK_GLOBALS, None, constantes). Si la
+    última instrucción es un IF o WHILE, la función devuelve el valor de su
+    condición.
+
+    La función recibe el marco de la función del código intermedio y el
+    marco global; lookup(nombre) da (es_global, ranura) de cada nombre. Una
+    copia o un argumento que puede no tener valor todavía se comprueba,
+    porque copiarlo no fallaría. La instrucción i del bloque queda en la
+    línea i + 2 del texto, lo que permite ubicar un error.
+    """
+    constantes = []
+    asignados = set()
+    comprobaciones = []
+
+    def texto(operand):
+        if type(operand) is str:
+            es_global, ranura = lookup(operand)
+            return f"_g[{ranura}]" if es_global else f"_v[{ranura}]"
+        constantes.append(operand.value if isinstance(operand, Const) else operand)
+        return f"_k{len(constantes) - 1}"
+
+    def comprobado(operand):
+        resultado = texto(operand)
+        if type(operand) is str and operand not in asignados:
+            comprobaciones.append(f"{resultado} is _u and _f(); ")
+        return resultado
+
+    lineas = []
+    for instruction in instructions:
+        op = instruction.op
+        comprobaciones.clear()
+        if op in (IF, WHILE):
+            lineas.append(f"    return {texto(instruction.src1)}")
+            continue
+        if op == CALL:
+            expresion = f"{texto(instruction.src1)}({', '.join(map(comprobado, instruction.src2))})"
+        elif op == COPY:
+            expresion = comprobado(instruction.src1)
+        else:
+            expresion = f"{texto(instruction.src1)} {op} {texto(instruction.src2)}"
+        lineas.append(f"    {''.join(comprobaciones)}{texto(instruction.dst)} = {expresion}")
+        asignados.add(instruction.dst)
+
+    parametros = "".join(f", _k{i}=None" for i in range(len(constantes)))
+    texto_funcion = "\n".join([f"def _bloque(_v, _g{parametros}):", *lineas, ""])
+    return _compile_function(texto_funcion), tuple(constantes)
+
+
+def decode(code, compiled=False):
+    """(programa, posiciones, tabla): las instrucciones de code listas para
+    Interpreter.execute, la posición en code de cada una y la SymbolTable
+    de sus ranuras.
+
+    Los marcadores que no hacen nada (LOOP, END_IF) no se copian: un salto
+    a uno de ellos va directamente a la instrucción que le sigue. El
+    programa termina con un _RETURN. Con compiled=True, cada tramo de
+    operaciones seguidas se reemplaza por una instrucción que ejecuta su
+    función compilada (compile_block).
+    """
+    destinos = jump_targets(code)
+    tabla = SymbolTable(code)
+    marcos, de_posicion = tabla.scopes, tabla.scope_of
+
+    # Cada instrucción da sus _LOAD_GLOBAL y su tupla; los destinos todavía
+    # son posiciones de code
+    unidades = []
+    for posicion, instruction in enumerate(code):
+        op = instruction.op
+        if op not in _DECODED_OPS:
+            continue
+        indice = de_posicion[posicion]
+        marco = marcos[indice]
+        entradas = []
+
+        def ranura(operando):
+            if type(operando) is not str:
+                return marco.constant_slot(operando.value if isinstance(operando, Const) else operando)
+            es_global, global_ = tabla.lookup(indice, operando)
+            local = marco.slot(operando)
+            if es_global:
+                entradas.append((_LOAD_GLOBAL, local, None, global_, None, None))
+            return local
+
+        destino = destinos.get(posicion)
+        if op in OPERATORS:
+            entrada = (_BINARY, marco.slot(instruction.dst), OPERATORS[op], ranura(instruction.src1),
+                       ranura(instruction.src2), None)
+        elif op == COPY:
+            entrada = (_COPY, marco.slot(instruction.dst), None, ranura(instruction.src1), None, None)
+        elif op in (IF, WHILE):
+            entrada = (_BRANCH, None, None, ranura(instruction.src1), None, destino)
+        elif op == CALL:
+            entrada = (_CALL, marco.slot(instruction.dst), None, ranura(instruction.src1),
+                       tuple(ranura(argumento) for argumento in instruction.src2), None)
+        elif op in (END_WHILE, END_FOR):
+            entrada = (_LOOP_BACK, None, None, None, None, destino)
+        elif op == FOR:
+            entrada = (_FOR, marco.slot(instruction.dst), None, ranura(instruction.src1), None, destino)
+        elif op == ELSE:
+            entrada = (_JUMP, None, None, None, None, destino)
+        elif op == FUNC:
+            entrada = (_FUNC, marco.slot(instruction.dst), None, de_posicion[posicion + 1], None, destino)
+        else:
+            entrada = (_RETURN, None, None, None, None, None)
+        entradas.append(entrada)
+        unidades.append((posicion, entradas))
+
+    # Un salto a la posición p llega a la primera instrucción decodificada desde p
+    decodificadas = [posicion for posicion, _ in unidades]
+
+    def llegada(posicion):
+        indice = bisect_left(decodificadas, posicion)
+        return decodificadas[indice] if indice < len(decodificadas) else len(code)
+
+    objetivos = {llegada(destino) for destino in destinos.values()}
+    objetivos.update(llegada(posicion + 1) for posicion, instruction in enumerate(code) if instruction.op == FUNC)
+
+    programa = []
+    posiciones = []
+    inicio = {}  # posición de code -> índice en programa
+    n = len(unidades)
+    i = 0
+    while i < n:
+        posicion, entradas = unidades[i]
+        inicio[posicion] = len(programa)
+        if compiled and entradas[-1][0] in _OPERATION_TYPES:
+            j = i + 1
+            while j < n and unidades[j][1][-1][0] in _OPERATION_TYPES and unidades[j][0] not in objetivos:
+                j += 1
+            tramo = [unidad[0] for unidad in unidades[i:j]]
+            tipo, destino = _BLOCK, None
+            if j < n and unidades[j][1][-1][0] == _BRANCH and unidades[j][0] not in objetivos:
+                tipo, destino = _BLOCK_BRANCH, unidades[j][1][-1][5]
+                tramo.append(unidades[j][0])
+                j += 1
+            codigo, constantes = compile_block([code[p] for p in tramo],
+                                               functools.partial(tabla.lookup, de_posicion[posicion]))
+            funcion = types.FunctionType(codigo, _BLOCK_GLOBALS, None, constantes)
+            programa.append((tipo, None, funcion, tuple(tramo), None, destino))
+            posiciones.append(posicion)
+            i = j
+        else:
+            programa.extend(entradas)
+            posiciones.extend([posicion] * len(entradas))
+            i += 1
+    inicio[len(code)] = len(programa)
+    programa.append((_RETURN, None, None, None, None, None))
+    posiciones.append(len(code))
+
+    programa = [entrada if entrada[5] is None else (*entrada[:5], inicio[llegada(entrada[5])])
+                for entrada in programa]
+    for posicion, instruction in enumerate(code):
+        if instruction.op == FUNC:
+            marcos[de_posicion[posicion + 1]].start = inicio[llegada(posicion + 1)]
+    tabla.finish()
+    return programa, posiciones, tabla
+
+
+class Interpreter:
+    """Ejecuta código intermedio siguiendo condicionales, ciclos y llamadas.
+
+    Las variables viven en marcos que son listas de ranuras (symbols.py);
+    run carga el diccionario de variables en el marco global y lo actualiza
+    al terminar. max_iterations limita las vueltas que puede dar cada ciclo
+    de una misma llamada en total (None es sin límite); al superarlo
+    execute lanza ExecutionStopped. Una instrucción que falla lanza
+    EvaluationError. Con compiled=True las operaciones se ejecutan como
+    funciones de Python compiladas una sola vez por bloque.
+    """
+
+    def __init__(self, code, max_iterations=None, compiled=False):
+        self.code = code
+        self.compiled = compiled
+        self.program, self.positions, self.symbols = decode(code, compiled)
+        self.max_iterations = max_iterations
+
+    def run(self, variables):
+        """Ejecuta el programa completo sobre variables y las devuelve"""
+        marco = self.symbols.load(variables)
+        try:
+            self.execute(marco)
+        finally:
+            self.symbols.store(marco, variables)
+        return variables
+
+    def execute(self, variables, start=0, globals=None):
+        """Ejecuta sobre el marco variables desde start hasta el final del
+        programa o hasta el END_FUNC de la función que empieza en start;
+        globals es el marco global"""
+        programa = self.program
+        if globals is None:
+            globals = variables
+        limite = float("inf") if self.max_iterations is None else self.max_iterations
+        vueltas = 0
+        iteradores = {}
+        pc = start
+        try:
+            while True:
+                tipo, dst, f, a, b, destino = programa[pc]
+                pc += 1
+                if tipo == _BLOCK:
+                    f(variables, globals)
+                elif tipo == _BLOCK_BRANCH:
+                    if not f(variables, globals):
+                        pc = destino
+                elif tipo == _BINARY:
+                    variables[dst] = f(variables[a], variables[b])
+                elif tipo == _COPY:
+                    valor = variables[a]
+                    if valor is UNBOUND:
+                        raise NameError
+                    variables[dst] = valor
+                elif tipo == _BRANCH:
+                    if not variables[a]:
+                        pc = destino
+                elif tipo == _CALL:
+                    argumentos = [variables[ranura] for ranura in b]
+                    for valor in argumentos:
+                        if valor is UNBOUND:
+                            raise NameError
+                    variables[dst] = variables[a](*argumentos)
+                elif tipo == _LOOP_BACK:
+                    vueltas += 1
+                    if vueltas > limite:
+                        raise ExecutionStopped(f"los ciclos dieron más de {self.max_iterations} vueltas")
+                    pc = destino
+                elif tipo == _FOR:
+                    iterador = iteradores.get(destino)
+                    if iterador is None:
+                        iterador = iteradores[destino] = iter(variables[a])
+                    valor = next(iterador, _END)
+                    if valor is _END:
+                        del iteradores[destino]
+                        pc = destino
+                    else:
+                        variables[dst] = valor
+                elif tipo == _JUMP:
+                    pc = destino
+                elif tipo == _LOAD_GLOBAL:
+                    valor = globals[a]
+                    if valor is UNBOUND:
+                        raise NameError
+                    variables[dst] = valor
+                elif tipo == _FUNC:
+                    variables[dst] = Function(self.symbols.scopes[a], self, globals)
+                    pc = destino
+                else:
+                    return
+        except ExecutionStopped:
+            raise
+        except Exception as e:
+            raise self._error(pc - 1, variables, globals, e) from e
+
+    def _error(self, indice, variables, globals, error):
+        """EvaluationError de la instrucción indice del programa decodificado;
+        si uno de sus operandos no tiene valor, el error es el NameError de
+        Python"""
+        tipo, _, f, tramo, _, _ = self.program[indice]
+        if tipo in (_BLOCK, _BLOCK_BRANCH):
+            traza = error.__traceback__
+            while traza.tb_frame.f_code is not f.__code__:
+                traza = traza.tb_next
+            posicion = tramo[traza.tb_lineno - 2]
+        else:
+            posicion = self.positions[indice]
+        instruction = self.code[posicion]
+        tabla = self.symbols
+        error = tabla.unbound_name(instruction, tabla.scope_of[posicion], variables, globals) or error
+        return EvaluationError(posicion, instruction, error)
+
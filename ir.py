@@ -0,0 +1,150 @@
+import operator
+import re
+import sys
+
+# Código intermedio en cuádruplas (op, dst, src1, src2). Los operandos son
+# nombres (cadenas internadas, sean variables o temporales tN) o constantes
+# Const; el texto de tres direcciones lo produce solo format_instruction.
+
+COPY = "="
+CALL = "CALL"
+FUNC = "FUNC"
+END_FUNC = "END_FUNC"
+IF = "IF"
+ELSE = "ELSE"
+END_IF = "END_IF"
+LOOP = "LOOP"  # Inicio de un ciclo While: allí vuelve END_WHILE a evaluar la condición
+WHILE = "WHILE"
+END_WHILE = "END_WHILE"
+FOR = "FOR"
+END_FOR = "END_FOR"
+PHI = "PHI"  # Solo en la forma SSA (ssa.py): dst = PHI(src1), un operando por predecesor
+
+# Operadores binarios: dst = src1 op src2
+OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '**': operator.pow,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    # No los genera generate_code; los introduce la reducción de fuerza
+    '<<': operator.lshift,
+    '&': operator.and_,
+}
+
+# Instrucciones que calculan un valor y lo guardan en dst
+VALUE_OPS = frozenset([COPY, CALL, *OPERATORS])
+
+
+class Const:
+    """Operando constante; se distingue así de un nombre con el mismo texto"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Const) and _identity(self.value) == _identity(other.value)
+
+    def __hash__(self):
+        return hash(_identity(self.value))
+
+    def __repr__(self):
+        return f"Const({self.value!r})"
+
+    def __str__(self):
+        return repr(self.value)
+
+
+def _identity(value):
+    """Clave que distingue constantes iguales para == pero no intercambiables,
+    como 1, 1.0 y True, o 0.0 y -0.0"""
+    if type(value) in (float, complex):
+        return type(value), repr(value)
+    return type(value), value
+
+
+_CONSTANTES = {}
+
+def const(value):
+    """Const internada: el mismo valor devuelve siempre el mismo objeto"""
+    clave = _identity(value)
+    constante = _CONSTANTES.get(clave)
+    if constante is None:
+        constante = _CONSTANTES[clave] = Const(value)
+    return constante
+
+
+def name(text):
+    return sys.intern(text)
+
+
+# Nombres que produce CodeGenerator.new_temp
+_TEMPORAL = re.compile(r"t\d+")
+
+def is_temp(operand):
+    return type(operand) is str and _TEMPORAL.fullmatch(operand) is not None
+
+
+class Instruction:
+    __slots__ = ("op", "dst", "src1", "src2")
+
+    def __init__(self, op, dst=None, src1=None, src2=None):
+        self.op = op
+        self.dst = dst
+        self.src1 = src1
+        self.src2 = src2
+
+    def __eq__(self, other):
+        return (isinstance(other, Instruction) and self.op == other.op and self.dst == other.dst
+                and self.src1 == other.src1 and self.src2 == other.src2)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Instruction({self.op!r}, {self.dst!r}, {self.src1!r}, {self.src2!r})"
+
+    def __str__(self):
+        return format_instruction(self)
+
+
+def format_expression(instruction):
+    """Lado derecho de una instrucción que calcula un valor"""
+    op = instruction.op
+    if op == COPY:
+        return f"{instruction.src1}"
+    if op == CALL:
+        return f"{instruction.src1}({', '.join(map(str, instruction.src2))})"
+    return f"{instruction.src1} {op} {instruction.src2}"
+
+
+def format_instruction(instruction):
+    """Texto de tres direcciones de una instrucción"""
+    op = instruction.op
+    if op in VALUE_OPS:
+        return f"{instruction.dst} = {format_expression(instruction)}"
+    if op == FUNC:
+        return f"FUNC {instruction.dst}({', '.join(instruction.src1)})"
+    if op == END_FUNC:
+        return f"END_FUNC {instruction.dst}"
+    if op == IF:
+        return f"IF {instruction.src1} THEN"
+    if op == WHILE:
+        return f"WHILE {instruction.src1} DO"
+    if op == FOR:
+        return f"FOR {instruction.dst} IN {instruction.src1} DO"
+    if op == PHI:
+        return f"{instruction.dst} = PHI({', '.join(map(str, instruction.src1))})"
+    return op
+
+
+def format_code(code):
+    return [format_instruction(instruction) for instruction in code]
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from batch import compile_source
+from cache import CompilationCache
+from optimizer import DEFAULT_LEVEL, LEVELS
+
+
+def compile_records(lines, cache_dir=None, level=DEFAULT_LEVEL):
+    """Unidad de trabajo de cada proceso: un bloque de líneas JSONL {id, source}.
+
+    El JSON se decodifica aquí, en el proceso de trabajo. Una línea inválida o
+    un registro que falla produce un resultado con "error" en su lugar, que
+    conserva el "id" del registro si la línea era un objeto JSON (None si no).
+    """
+    cache = CompilationCache(cache_dir) if cache_dir else None
+    resultados = []
+    for numero, linea in lines:
+        registro = None
+        try:
+            registro = json.loads(linea)
+            resultado = {"id": registro.get("id"), **compile_source(registro["source"], cache, level)}
+        except Exception as e:
+            identificador = registro.get("id") if isinstance(registro, dict) else None
+            resultado = {"id": identificador, "line": numero, "error": f"{type(e).__name__}: {e}"}
+        resultados.append(json.dumps(resultado, ensure_ascii=False, default=repr))
+    return resultados
+
+
+def read_chunks(archivo, chunk_size):
+    """Lee el archivo de a bloques de líneas no vacías, numeradas desde 1"""
+    lineas = ((numero, linea) for numero, linea in enumerate(archivo, 1) if linea.strip())
+    while True:
+        bloque = list(islice(lineas, chunk_size))
+        if not bloque:
+            return
+        yield bloque
+
+
+def run_jsonl(entrada, salida, workers=None, chunk_size=64, max_pending=None, ordered=False,
+              cache_dir=None, level=DEFAULT_LEVEL):
+    """Compila cada registro de entrada y escribe un resultado JSONL por registro.
+
+    Nunca hay más de max_pending bloques leídos y todavía sin escribir, así que
+    la memoria no depende del tamaño del archivo: la lectura espera a que se
+    escriban resultados. Con ordered=True los resultados salen en el orden de
+    entrada; si no, en el orden en que terminan.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    bloques = read_chunks(entrada, chunk_size)
+    pendientes = {}  # futuro -> número de bloque
+    terminados = {}  # número de bloque -> resultados que esperan su turno
+    siguiente = 0    # próximo bloque a escribir en modo ordenado
+    enviados = 0
+    total = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pendientes) + len(terminados) < max_pending:
+                bloque = next(bloques, None)
+                if bloque is None:
+                    break
+                pendientes[executor.submit(compile_records, bloque, cache_dir, level)] = enviados
+                enviados += 1
+            if not pendientes:
+                break
+
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                numero = pendientes.pop(futuro)
+                if ordered:
+                    terminados[numero] = futuro.result()
+                else:
+                    total += _write_lines(salida, futuro.result())
+            while siguiente in terminados:
+                total += _write_lines(salida, terminados.pop(siguiente))
+                siguiente += 1
+    return total
+
+
+def _write_lines(salida, lineas):
+    for linea in lineas:
+        salida.write(linea + "\n")
+    salida.flush()
+    return len(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila los registros {id, source} de un archivo JSONL.")
+    parser.add_argument("input", help="archivo JSONL de entrada ('-' para stdin)")
+    parser.add_argument("-o", "--output", default="-", help="archivo JSONL de salida ('-' para stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="cantidad de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="registros enviados a un proceso en cada tarea")
+    parser.add_argument("--max-pending", type=int,
+                        help="bloques leídos sin escribir como máximo (por defecto, 2 por proceso)")
+    parser.add_argument("--ordered", action="store_true",
+                        help="escribir los resultados en el orden de entrada")
+    parser.add_argument("--cache-dir",
+                        help="directorio de la caché de compilación compartida entre corridas")
+    parser.add_argument("-O", "--optimize", type=int, choices=sorted(LEVELS), default=DEFAULT_LEVEL,
+                        help=f"nivel de optimización del código intermedio (por defecto, {DEFAULT_LEVEL})")
+    args = parser.parse_args(argv)
+
+    entrada = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    salida = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        run_jsonl(entrada, salida, args.workers, args.chunk_size, args.max_pending, args.ordered,
+                  args.cache_dir, args.optimize)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+import os
+import re
+from array import array
+from collections import defaultdict, namedtuple
+
+# Definición de los tokens
+TOKENS = [
+    ("CLAVES", r'\b(if|else|while|for|return|break|continue|def|class|print|int|float|input)\b'),
+    ("IDENTIFICADORES", r'\b[a-zA-Z_]\w*\b'),
+    ("NUMEROS", r'\b\d+(\.\d+)?\b'),
+    ("OPERADORES", r'[+\-*/%=<>!&|^~]'),
+    ("STRING", r'"[^"\\](\\.[^"\\])*"'),
+    ("SALTOS_DE_LINEA", r'\n'),
+    ("ESPACIOS", r'[ \t]+'),
+    ("COMENTARIOS", r'#.*'),
+    ("DELIMITADORES", r'[(){}[\],.;:]'),
+]
+
+# Expresión maestra: todas las categorías de TOKENS en una sola alternancia de
+# grupos nombrados, compilada una única vez. La alternancia respeta el orden de
+# TOKENS, así que en cada posición gana la misma categoría que antes. El último
+# grupo captura cualquier carácter que ninguna categoría reconoce.
+TOKEN_DESCONOCIDO = "DESCONOCIDO"
+TOKEN_REGEX = re.compile("|".join(
+    [f"(?P<{token_type}>{token_regex})" for token_type, token_regex in TOKENS]
+    + [f"(?P<{TOKEN_DESCONOCIDO}>(?s:.))"]
+))
+
+# Código numérico de cada categoría (su posición en TOKENS) y tabla que traduce
+# el índice del grupo que hizo match a ese código
+TOKEN_TYPES = [token_type for token_type, _ in TOKENS]
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+CODIGO_DESCONOCIDO = len(TOKEN_TYPES)
+CODIGO_SALTO_DE_LINEA = TOKEN_CODES["SALTOS_DE_LINEA"]
+CODIGO_STRING = TOKEN_CODES["STRING"]
+_CODIGO_POR_GRUPO = [None] * (TOKEN_REGEX.groups + 1)
+for _nombre, _grupo in TOKEN_REGEX.groupindex.items():
+    _CODIGO_POR_GRUPO[_grupo] = TOKEN_CODES.get(_nombre, CODIGO_DESCONOCIDO)
+
+Token = namedtuple("Token", ["type", "text", "start", "end", "line", "column"])
+
+
+class TokenStream:
+    """Tokens en orden de aparición, guardados en columnas array paralelas.
+
+    Cada token ocupa un código de categoría, sus offsets de inicio y fin, y la
+    línea (desde 1) y columna (desde 0) donde empieza. El texto no se copia:
+    se obtiene rebanando el código fuente cuando se pide.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.columns = array('I')
+
+    def append(self, code, start, end, line, column):
+        self.types.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        start, end = self.starts[index], self.ends[index]
+        return Token(TOKEN_TYPES[self.types[index]], self.source[start:end],
+                     start, end, self.lines[index], self.columns[index])
+
+    def __iter__(self):
+        source = self.source
+        for code, start, end, line, column in zip(self.types, self.starts, self.ends, self.lines, self.columns):
+            yield Token(TOKEN_TYPES[code], source[start:end], start, end, line, column)
+
+    def text(self, index):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def grouped(self):
+        """Vista de los tokens agrupados por categoría, como la devolvía tokenize"""
+        tokens = defaultdict(list)
+        source = self.source
+        for code, start, end in zip(self.types, self.starts, self.ends):
+            tokens[TOKEN_TYPES[code]].append(source[start:end])
+        return tokens
+
+
+def tokenize(code):
+    tokens = TokenStream(code)
+    line, line_start = 1, 0
+
+    for match in TOKEN_REGEX.finditer(code):
+        token_code = _CODIGO_POR_GRUPO[match.lastindex]
+        start, end = match.span()
+        if token_code == CODIGO_DESCONOCIDO:
+            print(f"Error: Token desconocido en la posición {start}")
+            break
+        tokens.append(token_code, start, end, line, start - line_start)
+
+        # Solo los saltos de línea y algunas cadenas pueden contener "\n"
+        if token_code == CODIGO_SALTO_DE_LINEA:
+            line += 1
+            line_start = end
+        elif token_code == CODIGO_STRING and "\n" in match.group():
+            line += match.group().count("\n")
+            line_start = code.rindex("\n", start, end) + 1
+
+    return tokens
+
+# Tamaño de cada lectura del tokenizador por flujo y cuántos caracteres deben
+# quedar después de un token para aceptarlo sin releer (NUMEROS mira hasta dos
+# caracteres más allá de su final antes de decidir dónde termina)
+TAMANO_BLOQUE = 1 << 16
+MARGEN_LECTURA = 2
+
+def tokenize_file(source, chunk_size=TAMANO_BLOQUE, encoding="utf-8"):
+    """Genera los tokens de un archivo leyéndolo por bloques.
+
+    source puede ser una ruta o un objeto archivo de texto abierto. Solo se
+    mantiene en memoria el bloque actual más el token que lo cruza, así que el
+    consumo no depende del tamaño del archivo. Un token que queda partido al
+    final de un bloque se vuelve a intentar cuando llega el siguiente.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding=encoding) as archivo:
+            yield from tokenize_file(archivo, chunk_size)
+        return
+
+    buffer = ""
+    buffer_offset = 0  # Posición absoluta de buffer[0]
+    position = 0
+    lookahead = chunk_size
+    eof = False
+    line, line_start = 1, 0
+    match_token = TOKEN_REGEX.match
+
+    while True:
+        while not eof and len(buffer) - position < lookahead:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                eof = True
+                break
+            # Se conserva un carácter anterior para que \b vea su contexto
+            keep = max(position - 1, 0)
+            buffer = buffer[keep:] + chunk
+            buffer_offset += keep
+            position -= keep
+
+        if position >= len(buffer):
+            break
+
+        match = match_token(buffer, position)
+        end = match.end()
+        token_code = _CODIGO_POR_GRUPO[match.lastindex]
+        if not eof and token_code == CODIGO_DESCONOCIDO and _PREFIJO_STRING.fullmatch(buffer, position):
+            # Una cadena que sigue abierta al final del bloque: falta leer su cierre
+            lookahead = len(buffer) - position + chunk_size
+            continue
+        if not eof and len(buffer) - end < MARGEN_LECTURA:
+            # El token toca el final del bloque y podría continuar en el siguiente
+            lookahead = end - position + max(chunk_size, MARGEN_LECTURA)
+            continue
+        lookahead = chunk_size
+
+        start = buffer_offset + position
+        if token_code == CODIGO_DESCONOCIDO:
+            print(f"Error: Token desconocido en la posición {start}")
+            return
+        text = match.group()
+        yield Token(TOKEN_TYPES[token_code], text, start, buffer_offset + end, line, start - line_start)
+
+        if token_code == CODIGO_SALTO_DE_LINEA:
+            line += 1
+            line_start = buffer_offset + end
+        elif token_code == CODIGO_STRING and "\n" in text:
+            line += text.count("\n")
+            line_start = start + text.rindex("\n") + 1
+        position = end
+
+# Estado de entrada de una línea para el tokenizador incremental: cuántos de sus
+# caracteres ya consumió un token que empezó antes, o ESTADO_DETENIDO si un token
+# desconocido anterior detuvo el análisis (como lo hace tokenize)
+ESTADO_DETENIDO = -1
+_SIN_TOKENS = array('I')
+
+# Texto que todavía puede completarse como STRING; es el único token que puede
+# continuar en la línea siguiente
+_PREFIJO_STRING = re.compile(r'"(?:[^"\\](?:\\.[^"\\])*(?:\\.?)?)?')
+
+def split_lines(text):
+    """Divide el texto solo en "\n", conservándolo; siempre queda una última línea"""
+    partes = text.split("\n")
+    return [parte + "\n" for parte in partes[:-1]] + [partes[-1]]
+
+
+class IncrementalLexer:
+    """Tokenizador que guarda los tokens y el estado de entrada de cada línea.
+
+    Tras una edición solo se vuelven a analizar las líneas modificadas y las
+    siguientes cuyo estado de entrada cambió, por ejemplo por una cadena que
+    quedó abierta. El resultado es el mismo que tokenize sobre el texto completo.
+    counts lleva cuántos tokens hay de cada categoría (por código) y se
+    actualiza junto con las líneas re-analizadas, así que quien ya sabe qué
+    líneas cambiaron (replace_lines) no paga nada proporcional al texto.
+    """
+
+    def __init__(self, text=""):
+        self.lines = [""]
+        self.line_tokens = [_SIN_TOKENS]  # (código, inicio, fin) relativos a la línea
+        self.states = [0, 0]  # states[i] es el estado al entrar a la línea i
+        self.spans = {}  # línea -> última línea que consultó, si miró más allá de sí misma
+        self.counts = [0] * len(TOKEN_TYPES)
+        self.update(text)
+
+    def update(self, text):
+        """Sincroniza con el texto completo, re-analizando solo las líneas que cambiaron"""
+        new_lines = split_lines(text)
+        old_lines = self.lines
+        limite = min(len(old_lines), len(new_lines))
+
+        prefix = 0
+        while prefix < limite and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < limite - prefix
+               and old_lines[len(old_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]):
+            suffix += 1
+
+        return self.replace_lines(prefix, len(old_lines) - suffix,
+                                  new_lines[prefix:len(new_lines) - suffix])
+
+    def replace_lines(self, first, last, new_lines):
+        """Reemplaza las líneas [first, last) y devuelve cuántas se re-analizaron"""
+        count = len(new_lines)
+        # Una línea anterior cuyo token siguió hasta la zona editada también cambia
+        start = min([line for line, reach in self.spans.items() if line < first <= reach], default=first)
+        shift = count - (last - first)
+        self.spans = {line + (shift if line >= last else 0): reach + (shift if line >= last else 0)
+                      for line, reach in self.spans.items() if line < start or line >= last}
+
+        for line_tokens in self.line_tokens[first:last]:
+            self._count(line_tokens, -1)
+        self.lines[first:last] = new_lines
+        self.line_tokens[first:last] = [_SIN_TOKENS] * count
+        self.states[first + 1:last + 1] = [None] * count
+
+        index = start
+        while index < len(self.lines):
+            self._count(self.line_tokens[index], -1)
+            self.line_tokens[index], exit_state = self._lex_line(index, self.states[index])
+            self._count(self.line_tokens[index], 1)
+            index += 1
+            if index > first + count and self.states[index] == exit_state:
+                break
+            self.states[index] = exit_state
+        return index - start
+
+    def _lex_line(self, index, entry):
+        self.spans.pop(index, None)
+        line = self.lines[index]
+        if entry == ESTADO_DETENIDO:
+            return _SIN_TOKENS, ESTADO_DETENIDO
+        if entry and entry >= len(line):
+            return _SIN_TOKENS, entry - len(line)
+
+        tokens = array('I')
+        window = line
+        following = index + 1
+        position = entry
+        while position < len(line):
+            match = TOKEN_REGEX.match(window, position)
+            token_code = _CODIGO_POR_GRUPO[match.lastindex]
+            if token_code == CODIGO_DESCONOCIDO:
+                if following < len(self.lines) and _PREFIJO_STRING.fullmatch(window, position):
+                    window += self.lines[following]
+                    following += 1
+                    continue
+                self._record_span(index, following)
+                print(f"Error: Token desconocido en la línea {index + 1}, columna {position}")
+                return tokens, ESTADO_DETENIDO
+            end = match.end()
+            tokens.extend((token_code, position, end))
+            position = end
+        self._record_span(index, following)
+        return tokens, position - len(line)
+
+    def _record_span(self, index, following):
+        if following > index + 1:
+            self.spans[index] = following - 1
+
+    def _count(self, line_tokens, signo):
+        counts = self.counts
+        for code in line_tokens[::3]:
+            counts[code] += signo
+
+    def counted(self):
+        """{categoría: cantidad de tokens}, en el orden de TOKENS y sin las vacías"""
+        return {TOKEN_TYPES[code]: count for code, count in enumerate(self.counts) if count}
+
+    def grouped(self):
+        """Lo mismo que stream().grouped(), sin armar el texto completo"""
+        tokens = defaultdict(list)
+        lines = self.lines
+        for index, (line, line_tokens) in enumerate(zip(lines, self.line_tokens)):
+            for k in range(0, len(line_tokens), 3):
+                start, end = line_tokens[k + 1], line_tokens[k + 2]
+                text = line[start:end]
+                resto, following = end - len(line), index + 1
+                while resto > 0:  # Una cadena que sigue en las líneas siguientes
+                    text += lines[following][:resto]
+                    resto -= len(lines[following])
+                    following += 1
+                tokens[TOKEN_TYPES[line_tokens[k]]].append(text)
+        return tokens
+
+    def stream(self):
+        """TokenStream del texto completo armado a partir de los tokens por línea"""
+        tokens = TokenStream("".join(self.lines))
+        offset = 0
+        for number, (line, line_tokens) in enumerate(zip(self.lines, self.line_tokens), 1):
+            for k in range(0, len(line_tokens), 3):
+                start = line_tokens[k + 1]
+                tokens.append(line_tokens[k], offset + start, offset + line_tokens[k + 2], number, start)
+            offset += len(line)
+        return tokens
@@ -0,0 +1,579 @@
+from cfg import ControlFlowGraph, jump_targets
+from bytecode import OPNAMES
+from interpreter import EvaluationError, ExecutionStopped
+from ir import (CALL, COPY, ELSE, END_FOR, END_FUNC, END_WHILE, FOR, FUNC, IF, OPERATORS, VALUE_OPS, WHILE,
+                Const, const, is_temp)
+from symbols import UNBOUND, SymbolTable, operands
+
+# Código máquina simulado de una máquina de registros. Las variables viven
+# en memoria (las ranuras de symbols.py) y solo LOAD, LOAD_GLOBAL y STORE
+# acceden a ella; las operaciones leen y escriben registros. Las constantes
+# son registros de solo lectura que cada marco de registros ya trae
+# cargados, numerados después de los registros de la máquina.
+#
+# allocate_registers asigna los registros con el recorrido lineal de
+# Poletto y Sarkar sobre los intervalos de vida de cada nombre; el nombre
+# que no recibe registro se carga antes de cada lectura y se guarda después
+# de cada escritura en los registros r0 y r1, reservados para eso. Con
+# registers=MIN_REGISTERS todo nombre va a memoria: es la traducción de una
+# carga por operando y un guardado por resultado. Cada función asigna sus registros
+# por separado y cada llamada tiene los suyos (ventanas de registros), así
+# que una llamada no obliga a guardar nada.
+#
+# Los nombres que una función lee del nivel superior quedan siempre en
+# memoria. Las variables del nivel superior que no son temporales se
+# guardan al terminar el programa, porque su valor final es el resultado;
+# los temporales que quedaron en registros no llegan a la memoria, ni las
+# variables en registros si un error detiene la ejecución.
+
+DEFAULT_REGISTERS = 8
+MIN_REGISTERS = 2  # r0 y r1: cargas y guardados de los nombres sin registro
+
+_MNEMONICS = dict(zip(OPERATORS, OPNAMES))
+_BINARY_FUNCTIONS = {_MNEMONICS[op]: funcion for op, funcion in OPERATORS.items()}
+
+
+class MachineInstruction:
+    """Instrucción de código máquina; position es la del código intermedio
+    de la que salió.
+
+        LOAD r, x         r = memoria[x]
+        LOAD_GLOBAL r, x  r = memoria del nivel superior[x], dentro de una función
+        STORE x, r        memoria[x] = r
+        MOV r, a          r = a
+        ADD r, a, b       r = a + b, y así cada operador de ir.OPERATORS
+        ARG a             agrega a a los argumentos de la próxima llamada
+        CALL r, f, n      r = f(n argumentos)
+        JUMP_IF_FALSE a, L
+        JUMP L
+        ITER r, a         r = iter(a)
+        NEXT r, i, L      r = next(i); sin más elementos salta a L
+        FUNC r, f, L      r = función cuyo cuerpo sigue hasta su RET; salta a L
+        LABEL L
+        RET
+
+    dst, src1 y src2 son los operandos en ese orden: registros, ranuras de
+    memoria, etiquetas, el índice del Scope de FUNC o la cantidad de
+    argumentos de CALL.
+    """
+
+    __slots__ = ("op", "dst", "src1", "src2", "position")
+
+    def __init__(self, op, dst=None, src1=None, src2=None, position=None):
+        self.op = op
+        self.dst = dst
+        self.src1 = src1
+        self.src2 = src2
+        self.position = position
+
+    def __eq__(self, other):
+        return (isinstance(other, MachineInstruction) and self.op == other.op and self.dst == other.dst
+                and self.src1 == other.src1 and self.src2 == other.src2)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"MachineInstruction({self.op!r}, {self.dst!r}, {self.src1!r}, {self.src2!r}, "
+                f"{self.position!r})")
+
+
+class MachineCode:
+    """Código máquina de registros: instructions, la SymbolTable de su
+    memoria, la cantidad de registros, las constantes (el registro
+    registers + i tiene constants[i]) y el código intermedio ir"""
+
+    __slots__ = ("instructions", "symbols", "registers", "constants", "ir")
+
+    def __init__(self, instructions, symbols, registers, constants, ir):
+        self.instructions = instructions
+        self.symbols = symbols
+        self.registers = registers
+        self.constants = constants
+        self.ir = ir
+
+    def memory_accesses(self):
+        """(cargas, guardados) que aparecen en el código"""
+        cargas = guardados = 0
+        for instruction in self.instructions:
+            if instruction.op in ("LOAD", "LOAD_GLOBAL"):
+                cargas += 1
+            elif instruction.op == "STORE":
+                guardados += 1
+        return cargas, guardados
+
+
+def _scope_index(tabla, posicion):
+    return tabla.scope_of[posicion] if posicion < len(tabla.scope_of) else 0
+
+
+def live_intervals(code, tabla, iteradores):
+    """(intervalos, entradas, finales): los intervalos de vida
+    {(marco, ranura): [inicio, fin]} de los nombres que pueden ir en un
+    registro y los nombres vivos al entrar a cada marco, {marco: nombres}.
+
+    La instrucción i lee en el punto 2i y escribe en 2i + 1, así que un
+    operando que muere en i puede compartir registro con el resultado. Las
+    vidas salen del análisis hacia atrás sobre el grafo de flujo de
+    control; el intervalo es el menor que cubre todos los puntos donde el
+    nombre está vivo. iteradores da la ranura oculta del iterador de cada
+    FOR y la posición de su END_FOR: el iterador vive entre los dos.
+    Devuelve también las variables del nivel superior cuyo valor final se
+    guarda en memoria.
+    """
+    marcos, de_posicion = tabla.scopes, tabla.scope_of
+    memoria = set()  # ranuras del nivel superior que las funciones leen
+    for posicion, instruction in enumerate(code):
+        indice = de_posicion[posicion]
+        if indice:
+            for operando in operands(instruction):
+                if type(operando) is str and tabla.lookup(indice, operando)[0]:
+                    memoria.add(marcos[0].slot(operando))
+
+    def clave(indice, nombre):
+        marco = marcos[indice]
+        ranura = marco.slot(nombre)
+        if indice:
+            return (indice, ranura) if ranura < marco.assigned else None
+        return None if ranura in memoria else (0, ranura)
+
+    # Por instrucción: claves que lee, la que escribe y si la escritura es
+    # segura (la variable de un FOR no se asigna al salir del ciclo)
+    accesos = []
+    for posicion, instruction in enumerate(code):
+        indice = de_posicion[posicion]
+        usos = [clave(indice, operando) for operando in operands(instruction) if type(operando) is str]
+        escrita = None
+        if instruction.op in VALUE_OPS or instruction.op in (FOR, FUNC):
+            escrita = clave(indice, instruction.dst)
+        accesos.append(([uso for uso in usos if uso is not None], escrita, instruction.op != FOR))
+
+    grafo = ControlFlowGraph(code)
+    bloques = grafo.blocks
+    generados, matados = [], []
+    for bloque in bloques:
+        leidos, escritos = set(), set()
+        for posicion in range(bloque.start, bloque.end):
+            usos, escrita, mata = accesos[posicion]
+            leidos.update(uso for uso in usos if uso not in escritos)
+            if escrita is not None and mata:
+                escritos.add(escrita)
+        generados.append(leidos)
+        matados.append(escritos)
+
+    superior = marcos[0]
+    finales = {(0, ranura) for ranura, nombre in enumerate(superior.names[:superior.assigned])
+               if not is_temp(nombre) and ranura not in memoria}
+    entrada = [set() for _ in bloques]
+    salida = [set() for _ in bloques]
+    fin = grafo.exit_block()
+    if fin is not None:
+        salida[fin] = set(finales)
+    pendientes = list(range(len(bloques)))
+    en_espera = set(pendientes)
+    while pendientes:
+        indice = pendientes.pop()
+        en_espera.discard(indice)
+        vivos = generados[indice] | (salida[indice] - matados[indice])
+        if vivos == entrada[indice]:
+            continue
+        entrada[indice] = vivos
+        for pred in bloques[indice].preds:
+            if not vivos <= salida[pred]:
+                salida[pred] |= vivos
+                if pred not in en_espera:
+                    en_espera.add(pred)
+                    pendientes.append(pred)
+
+    intervalos = {}
+
+    def extender(nombre, punto):
+        intervalo = intervalos.get(nombre)
+        if intervalo is None:
+            intervalos[nombre] = [punto, punto]
+        elif punto < intervalo[0]:
+            intervalo[0] = punto
+        elif punto > intervalo[1]:
+            intervalo[1] = punto
+
+    for bloque in bloques:
+        for nombre in entrada[bloque.index]:
+            extender(nombre, 2 * bloque.start)
+        for nombre in salida[bloque.index]:
+            extender(nombre, 2 * bloque.end - 1)
+        for posicion in range(bloque.start, bloque.end):
+            usos, escrita, _ = accesos[posicion]
+            for uso in usos:
+                extender(uso, 2 * posicion)
+            if escrita is not None:
+                extender(escrita, 2 * posicion + 1)
+    for nombre in finales:
+        if nombre in intervalos:
+            extender(nombre, 2 * len(code))
+    for posicion, (fin_ciclo, oculta) in iteradores.items():
+        intervalos[(de_posicion[posicion], oculta)] = [2 * posicion, 2 * fin_ciclo + 1]
+
+    entradas = {}
+    for bloque in grafo.entries:
+        inicio = bloques[bloque].start
+        entradas[_scope_index(tabla, inicio)] = entrada[bloque]
+    return intervalos, entradas, finales
+
+
+def linear_scan(intervalos, registros):
+    """{nombre: registro o None} con registros registros disponibles, a
+    partir del número MIN_REGISTERS. Recorre los intervalos por su inicio;
+    si no queda un registro libre, queda sin registro (en memoria) el
+    intervalo activo que termina más tarde, o el nuevo si es él"""
+    asignados = {}
+    libres = list(range(MIN_REGISTERS + registros - 1, MIN_REGISTERS - 1, -1))
+    activos = []  # (fin, nombre), ordenados por fin
+    for nombre, (inicio, fin) in sorted(intervalos.items(), key=lambda item: item[1][0]):
+        while activos and activos[0][0] < inicio:
+            libres.append(asignados[activos.pop(0)[1]])
+        if libres:
+            asignados[nombre] = libres.pop()
+        elif activos and activos[-1][0] > fin:
+            _, expulsado = activos.pop()
+            asignados[nombre] = asignados[expulsado]
+            asignados[expulsado] = None
+        else:
+            asignados[nombre] = None
+            continue
+        # Inserción ordenada; activos tiene a lo sumo registros elementos
+        lugar = len(activos)
+        while lugar and activos[lugar - 1][0] > fin:
+            lugar -= 1
+        activos.insert(lugar, (fin, nombre))
+    return asignados
+
+
+def allocate_registers(code, registers=DEFAULT_REGISTERS):
+    """Traduce el código intermedio code a MachineCode con registers
+    registros, de los cuales los dos primeros quedan para cargar y guardar
+    los nombres sin registro"""
+    if registers < MIN_REGISTERS:
+        raise ValueError(f"se necesitan al menos {MIN_REGISTERS} registros")
+    tabla = SymbolTable(code)
+    marcos, de_posicion = tabla.scopes, tabla.scope_of
+    destinos = jump_targets(code)
+    # Ranura oculta del iterador de cada FOR y posición de su END_FOR
+    iteradores = {}
+    for posicion, instruction in enumerate(code):
+        if instruction.op == FOR:
+            marco = marcos[de_posicion[posicion]]
+            iteradores[posicion] = (destinos[posicion] - 1, marco.hidden_slot(f"<iter {instruction.dst}>"))
+    intervalos, entradas, finales = live_intervals(code, tabla, iteradores)
+    # Cada marco asigna sus registros por separado
+    por_marco = [{} for _ in marcos]
+    for nombre, intervalo in intervalos.items():
+        por_marco[nombre[0]][nombre] = intervalo
+    asignados = {}
+    for intervalos_marco in por_marco:
+        asignados.update(linear_scan(intervalos_marco, registers - MIN_REGISTERS))
+    tabla.finish()
+
+    constantes = {}
+    salida = []
+    etiquetas = set(destinos.values())  # Las etiquetas son posiciones de code...
+    funciones = []  # ...o len(code) + 1 + p al final del cuerpo del FUNC de la posición p
+
+    def constante(valor):
+        clave = const(valor)
+        registro = constantes.get(clave)
+        if registro is None:
+            registro = constantes[clave] = registers + len(constantes)
+        return registro
+
+    def emitir(posicion, op, dst=None, src1=None, src2=None):
+        salida.append(MachineInstruction(op, dst, src1, src2, posicion))
+
+    def cargas_de_entrada(posicion, indice):
+        for nombre in sorted(entradas.get(indice, ())):
+            registro = asignados.get(nombre)
+            if registro is not None:
+                emitir(posicion, "LOAD", registro, nombre[1])
+
+    for posicion, instruction in enumerate(code):
+        op = instruction.op
+        indice = de_posicion[posicion]
+        marco = marcos[indice]
+        if posicion == 0:
+            cargas_de_entrada(posicion, 0)
+        elif code[posicion - 1].op == FUNC:
+            cargas_de_entrada(posicion, indice)
+        temporales = iter(range(MIN_REGISTERS))
+
+        def leer(operando):
+            """Registro con el valor de operando, cargándolo si hace falta"""
+            if type(operando) is not str:
+                return constante(operando.value if isinstance(operando, Const) else operando)
+            es_global, ranura = tabla.lookup(indice, operando)
+            if es_global:
+                registro = next(temporales)
+                emitir(posicion, "LOAD_GLOBAL", registro, ranura)
+                return registro
+            registro = asignados.get((indice, ranura))
+            if registro is None:
+                registro = next(temporales)
+                emitir(posicion, "LOAD", registro, ranura)
+            return registro
+
+        def escribir(emision, nombre, *fuentes):
+            """Emite la instrucción con su resultado en el registro de nombre,
+            o en r0 seguida del guardado"""
+            ranura = marco.slot(nombre) if type(nombre) is str else nombre
+            registro = asignados.get((indice, ranura))
+            emitir(posicion, emision, 0 if registro is None else registro, *fuentes)
+            if registro is None:
+                emitir(posicion, "STORE", ranura, 0)
+
+        if op == FOR:
+            fin_ciclo, oculta = iteradores[posicion]
+            escribir("ITER", oculta, leer(instruction.src1))
+            temporales = iter(range(MIN_REGISTERS))
+        if posicion in etiquetas:
+            emitir(posicion, "LABEL", posicion)
+
+        if op in OPERATORS:
+            escribir(_MNEMONICS[op], instruction.dst, leer(instruction.src1), leer(instruction.src2))
+        elif op == COPY:
+            escribir("MOV", instruction.dst, leer(instruction.src1))
+        elif op == CALL:
+            for argumento in instruction.src2:
+                temporales = iter(range(MIN_REGISTERS))
+                emitir(posicion, "ARG", None, leer(argumento))
+            temporales = iter(range(MIN_REGISTERS))
+            escribir("CALL", instruction.dst, leer(instruction.src1), len(instruction.src2))
+        elif op in (IF, WHILE):
+            emitir(posicion, "JUMP_IF_FALSE", destinos[posicion], leer(instruction.src1))
+        elif op in (ELSE, END_WHILE, END_FOR):
+            emitir(posicion, "JUMP", destinos[posicion])
+        elif op == FOR:
+            iterador = asignados.get((indice, oculta))
+            if iterador is None:
+                iterador = 1
+                emitir(posicion, "LOAD", iterador, oculta)
+            escribir("NEXT", instruction.dst, iterador, destinos[posicion])
+        elif op == FUNC:
+            # El cuerpo sigue a FUNC; el resultado se guarda después de saltarlo
+            fin = len(code) + 1 + posicion
+            ranura = marco.slot(instruction.dst)
+            registro = asignados.get((indice, ranura))
+            emitir(posicion, "FUNC", 0 if registro is None else registro, de_posicion[posicion + 1], fin)
+            funciones.append((posicion, fin, ranura if registro is None else None))
+        elif op == END_FUNC:
+            emitir(posicion, "RET")
+            if funciones:
+                inicio, fin, ranura = funciones.pop()
+                emitir(inicio, "LABEL", fin)
+                if ranura is not None:
+                    emitir(inicio, "STORE", ranura, 0)
+
+    n = len(code)
+    if n in etiquetas:
+        emitir(n, "LABEL", n)
+    for nombre in sorted(finales):
+        registro = asignados.get(nombre)
+        if registro is not None:
+            emitir(n, "STORE", nombre[1], registro)
+    emitir(n, "RET")
+    return MachineCode(salida, tabla, registers, [clave.value for clave in constantes], code)
+
+
+def format_machine_code(machine):
+    """Listado del código máquina, una línea por instrucción"""
+    tabla = machine.symbols
+    registros = machine.registers
+
+    def registro(numero):
+        if numero >= registros:
+            return repr(machine.constants[numero - registros])
+        return f"r{numero}"
+
+    lineas = []
+    for instruction in machine.instructions:
+        op = instruction.op
+        marco = tabla.scopes[_scope_index(tabla, instruction.position)]
+        if op == "LABEL":
+            lineas.append(f"L{instruction.dst}:")
+            continue
+        if op == "LOAD":
+            operandos = f"{registro(instruction.dst)}, {marco.names[instruction.src1]}"
+        elif op == "LOAD_GLOBAL":
+            operandos = f"{registro(instruction.dst)}, {tabla.scopes[0].names[instruction.src1]}"
+        elif op == "STORE":
+            operandos = f"{marco.names[instruction.dst]}, {registro(instruction.src1)}"
+        elif op == "ARG":
+            operandos = registro(instruction.src1)
+        elif op == "CALL":
+            operandos = f"{registro(instruction.dst)}, {registro(instruction.src1)}, {instruction.src2}"
+        elif op == "JUMP_IF_FALSE":
+            operandos = f"{registro(instruction.src1)}, L{instruction.dst}"
+        elif op == "JUMP":
+            operandos = f"L{instruction.dst}"
+        elif op == "NEXT":
+            operandos = f"{registro(instruction.dst)}, {registro(instruction.src1)}, L{instruction.src2}"
+        elif op == "FUNC":
+            funcion = tabla.scopes[instruction.src1]
+            operandos = (f"{registro(instruction.dst)}, {funcion.name}({', '.join(funcion.names[:funcion.params])}), "
+                         f"L{instruction.src2}")
+        elif op == "RET":
+            operandos = ""
+        else:
+            fuentes = [instruction.src1] if instruction.src2 is None else [instruction.src1, instruction.src2]
+            operandos = ", ".join(map(registro, [instruction.dst, *fuentes]))
+        lineas.append(f"    {op:<14}{operandos}".rstrip())
+    return lineas
+
+
+# Tipos de instrucción del simulador
+(_LOAD, _LOAD_GLOBAL, _STORE, _MOV, _BINARY, _ARG, _CALL, _JUMP_IF_FALSE, _JUMP, _ITER, _NEXT, _FUNC,
+ _RET) = range(13)
+
+_KINDS = {"LOAD": _LOAD, "LOAD_GLOBAL": _LOAD_GLOBAL, "STORE": _STORE, "MOV": _MOV, "ARG": _ARG,
+          "CALL": _CALL, "JUMP_IF_FALSE": _JUMP_IF_FALSE, "JUMP": _JUMP, "ITER": _ITER, "NEXT": _NEXT,
+          "FUNC": _FUNC, "RET": _RET}
+_KINDS.update(dict.fromkeys(_BINARY_FUNCTIONS, _BINARY))
+
+_END = object()  # Fin de un iterador en NEXT
+
+
+class MachineFunction:
+    """Función creada por FUNC: al llamarla ejecuta su cuerpo, que empieza en
+    start, con un marco de memoria nuevo de su Scope y registros nuevos"""
+
+    __slots__ = ("scope", "start", "simulator", "globals")
+
+    def __init__(self, scope, start, simulator, globals):
+        self.scope = scope
+        self.start = start
+        self.simulator = simulator
+        self.globals = globals
+
+    def __call__(self, *args):
+        marco = self.scope
+        if len(args) != marco.params:
+            raise TypeError(f"{marco.name}() recibe {marco.params} argumentos ({len(args)} dados)")
+        memoria = marco.frame()
+        memoria[:marco.params] = args
+        self.simulator.execute(memoria, self.start, self.globals)
+
+    def __repr__(self):
+        return f"<función {self.scope.name}>"
+
+
+class MachineSimulator:
+    """Ejecuta MachineCode y cuenta lo que hace: loads son las lecturas de
+    memoria (LOAD y LOAD_GLOBAL) y stores las escrituras, acumuladas entre
+    ejecuciones.
+
+    max_iterations limita las vueltas de los ciclos de cada llamada, como en
+    interpreter.Interpreter; una instrucción que falla lanza EvaluationError.
+    """
+
+    def __init__(self, machine, max_iterations=None):
+        self.machine = machine
+        self.max_iterations = max_iterations
+        self.loads = self.stores = 0
+        self.registers = [UNBOUND] * machine.registers + machine.constants
+        instrucciones = []
+        etiquetas = {}
+        for instruction in machine.instructions:
+            if instruction.op == "LABEL":
+                etiquetas[instruction.dst] = len(instrucciones)
+            else:
+                instrucciones.append(instruction)
+        self.positions = [instruction.position for instruction in instrucciones]
+        self.program = []
+        for instruction in instrucciones:
+            tipo = _KINDS[instruction.op]
+            dst, a, b = instruction.dst, instruction.src1, instruction.src2
+            if tipo in (_JUMP_IF_FALSE, _JUMP):
+                dst = etiquetas[dst]
+            elif tipo in (_NEXT, _FUNC):
+                b = etiquetas[b]
+            self.program.append((tipo, dst, a, b, _BINARY_FUNCTIONS.get(instruction.op)))
+
+    def run(self, variables):
+        """Ejecuta el programa sobre variables y las devuelve actualizadas"""
+        tabla = self.machine.symbols
+        memoria = tabla.load(variables)
+        try:
+            self.execute(memoria, 0, memoria)
+        finally:
+            tabla.store(memoria, variables)
+        return variables
+
+    def execute(self, memoria, pc, globals):
+        """Ejecuta desde pc con el marco de memoria memoria hasta el RET de la
+        función (o del programa); globals es la memoria del nivel superior"""
+        programa = self.program
+        registros = self.registers[:]
+        argumentos = []
+        limite = float("inf") if self.max_iterations is None else self.max_iterations
+        vueltas = cargas = guardados = 0
+        try:
+            while True:
+                tipo, dst, a, b, f = programa[pc]
+                pc += 1
+                if tipo == _BINARY:
+                    registros[dst] = f(registros[a], registros[b])
+                elif tipo == _LOAD:
+                    registros[dst] = memoria[a]
+                    cargas += 1
+                elif tipo == _STORE:
+                    memoria[dst] = registros[a]
+                    guardados += 1
+                elif tipo == _MOV:
+                    valor = registros[a]
+                    if valor is UNBOUND:
+                        raise NameError(f"name '{self._name(pc - 1)}' is not defined")
+                    registros[dst] = valor
+                elif tipo == _JUMP_IF_FALSE:
+                    if not registros[a]:
+                        pc = dst
+                elif tipo == _JUMP:
+                    if dst < pc:
+                        vueltas += 1
+                        if vueltas > limite:
+                            raise ExecutionStopped(f"los ciclos dieron más de {self.max_iterations} vueltas")
+                    pc = dst
+                elif tipo == _ARG:
+                    valor = registros[a]
+                    if valor is UNBOUND:
+                        raise NameError(f"name '{self._name(pc - 1, len(argumentos))}' is not defined")
+                    argumentos.append(valor)
+                elif tipo == _CALL:
+                    llamados = argumentos[len(argumentos) - b:]
+                    del argumentos[len(argumentos) - b:]
+                    registros[dst] = registros[a](*llamados)
+                elif tipo == _LOAD_GLOBAL:
+                    registros[dst] = globals[a]
+                    cargas += 1
+                elif tipo == _NEXT:
+                    valor = next(registros[a], _END)
+                    if valor is _END:
+                        pc = b
+                    else:
+                        registros[dst] = valor
+                elif tipo == _ITER:
+                    registros[dst] = iter(registros[a])
+                elif tipo == _FUNC:
+                    registros[dst] = MachineFunction(self.machine.symbols.scopes[a], pc, self, globals)
+                    pc = b
+                else:
+                    return
+        except ExecutionStopped:
+            raise
+        except Exception as e:
+            posicion = self.positions[pc - 1]
+            raise EvaluationError(posicion, self.machine.ir[posicion], e) from e
+        finally:
+            self.loads += cargas
+            self.stores += guardados
+
+    def _name(self, pc, indice=0):
+        """Nombre del operando indice (el argumento indice, en una llamada) de
+        la instrucción de código intermedio de la que salió pc"""
+        instruction = self.machine.ir[self.positions[pc]]
+        return operands(instruction)[indice + (instruction.op == CALL)]
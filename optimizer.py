@@ -0,0 +1,757 @@
+import heapq
+from collections import Counter
+
+from cfg import ControlFlowGraph
+from ir import (CALL, COPY, FOR, FUNC, IF, OPERATORS, VALUE_OPS, WHILE, Const, Instruction, const,
+                is_temp, name)
+
+# Optimizaciones sobre el código intermedio, entre generate_code y
+# translate_to_machine_code. Cada pase recibe la lista de instrucciones y
+# devuelve una lista nueva sin modificar la original.
+
+# Marcadores cuyo src1 es un operando que se puede reemplazar por una constante
+_TESTS = frozenset([IF, WHILE, FOR])
+
+# Los resultados más grandes que esto se dejan para la ejecución
+_MAX_FOLDED_SIZE = 4096
+_NOT_FOLDABLE = object()
+
+
+def _fold(op, left, right):
+    """Valor de left op right calculado al compilar, o _NOT_FOLDABLE si la
+    operación fallaría (el error se deja para la ejecución) o el resultado
+    sería demasiado grande para guardarlo en el código"""
+    if op in ('**', '<<') and isinstance(right, (int, float)) and abs(right) > 64:
+        return _NOT_FOLDABLE
+    if op == '*':
+        for secuencia, veces in ((left, right), (right, left)):
+            if (isinstance(secuencia, (str, bytes, tuple)) and isinstance(veces, int)
+                    and len(secuencia) * veces > _MAX_FOLDED_SIZE):
+                return _NOT_FOLDABLE
+    try:
+        resultado = OPERATORS[op](left, right)
+    except Exception:
+        return _NOT_FOLDABLE
+    if isinstance(resultado, int) and resultado.bit_length() > _MAX_FOLDED_SIZE:
+        return _NOT_FOLDABLE
+    if isinstance(resultado, (str, bytes, tuple)) and len(resultado) > _MAX_FOLDED_SIZE:
+        return _NOT_FOLDABLE
+    return resultado
+
+
+def fold_constants(code):
+    """Plegado y propagación de constantes.
+
+    Las operaciones cuyos operandos son constantes se reemplazan por una copia
+    de su resultado, y las variables con un valor constante conocido se
+    reemplazan por ese valor en las instrucciones siguientes. Lo conocido solo
+    vale dentro de un tramo recto: cualquier marcador de control de flujo
+    (IF, ELSE, WHILE, FUNC, ...) lo descarta. Al final se eliminan las copias
+    de constantes a temporales que ya nadie usa.
+    """
+    conocidas = {}  # nombre -> Const
+    plegado = []
+    for instruction in code:
+        op = instruction.op
+        if op == COPY:
+            src1 = conocidas.get(instruction.src1, instruction.src1)
+            nueva = Instruction(COPY, instruction.dst, src1)
+        elif op in OPERATORS:
+            src1 = conocidas.get(instruction.src1, instruction.src1)
+            src2 = conocidas.get(instruction.src2, instruction.src2)
+            valor = _NOT_FOLDABLE
+            if type(src1) is Const and type(src2) is Const:
+                valor = _fold(op, src1.value, src2.value)
+            if valor is _NOT_FOLDABLE:
+                nueva = Instruction(op, instruction.dst, src1, src2)
+            else:
+                nueva = Instruction(COPY, instruction.dst, const(valor))
+        elif op == CALL:
+            args = tuple(conocidas.get(arg, arg) for arg in instruction.src2)
+            nueva = Instruction(CALL, instruction.dst, instruction.src1, args)
+        else:
+            if op in _TESTS:
+                instruction = Instruction(op, instruction.dst,
+                                          conocidas.get(instruction.src1, instruction.src1))
+            plegado.append(instruction)
+            conocidas.clear()
+            continue
+
+        plegado.append(nueva)
+        if nueva.op == COPY and type(nueva.src1) is Const:
+            conocidas[nueva.dst] = nueva.src1
+        else:
+            conocidas.pop(nueva.dst, None)
+
+    usados = Counter(_uses(plegado))
+    return [instruction for instruction in plegado
+            if not (instruction.op == COPY and type(instruction.src1) is Const
+                    and is_temp(instruction.dst) and not usados[instruction.dst])]
+
+
+def _reads(instruction):
+    """Operandos que lee una instrucción"""
+    op = instruction.op
+    if op == CALL:
+        return (instruction.src1, *instruction.src2)
+    if op in OPERATORS:
+        return (instruction.src1, instruction.src2)
+    if op == COPY or op in _TESTS:
+        return (instruction.src1,)
+    return ()
+
+
+def _uses(code):
+    """Nombres leídos por cada instrucción, con repeticiones"""
+    for instruction in code:
+        yield from _reads(instruction)
+
+
+def number_values(code):
+    """Numeración de valores local: elimina las subexpresiones comunes.
+
+    Dentro de cada tramo recto, una operación que repite otra ya calculada
+    (mismo operador y mismos operandos) no se vuelve a calcular: si su destino
+    es un temporal, los usos siguientes pasan a leer el temporal anterior; si
+    no, se reemplaza por una copia de él. Asignar un nombre invalida las
+    expresiones que lo leen o que estaban guardadas en él. Las llamadas nunca
+    se reutilizan, ya que pueden tener efectos.
+    """
+    expresiones = {}      # (op, src1, src2) -> nombre que guarda su valor
+    dependientes = {}     # nombre -> claves de expresiones que lo leen o lo guardan
+    alias = {}            # temporal eliminado -> temporal que ya tenía su valor
+    numerado = []
+    for instruction in code:
+        op = instruction.op
+        if op in OPERATORS:
+            clave = (op, alias.get(instruction.src1, instruction.src1),
+                     alias.get(instruction.src2, instruction.src2))
+            dst = instruction.dst
+            anterior = expresiones.get(clave)
+            if anterior is not None and anterior != dst:
+                if is_temp(dst) and is_temp(anterior):
+                    alias[dst] = anterior
+                    continue
+                nueva = Instruction(COPY, dst, anterior)
+            else:
+                nueva = Instruction(op, dst, clave[1], clave[2])
+        elif op == COPY:
+            nueva = Instruction(COPY, instruction.dst, alias.get(instruction.src1, instruction.src1))
+        elif op == CALL:
+            nueva = Instruction(CALL, instruction.dst, instruction.src1,
+                                tuple(alias.get(arg, arg) for arg in instruction.src2))
+        else:
+            if op in _TESTS:
+                instruction = Instruction(op, instruction.dst, alias.get(instruction.src1, instruction.src1))
+            numerado.append(instruction)
+            expresiones.clear()
+            dependientes.clear()
+            continue
+
+        numerado.append(nueva)
+        for vieja in dependientes.pop(nueva.dst, ()):
+            expresiones.pop(vieja, None)
+        if nueva.op in OPERATORS and nueva.dst not in clave[1:]:
+            expresiones[clave] = nueva.dst
+            for operando in (clave[1], clave[2], nueva.dst):
+                dependientes.setdefault(operando, []).append(clave)
+    return numerado
+
+
+def _regions(code):
+    """Número de tramo recto de cada instrucción; los marcadores de control de
+    flujo cierran el tramo en el que están"""
+    tramo = 0
+    for instruction in code:
+        yield tramo
+        if instruction.op not in VALUE_OPS:
+            tramo += 1
+
+
+def _local_temps(code):
+    """Temporales asignados una sola vez y usados solo en el tramo recto en el
+    que se asignan. Así los genera generate_code; los demás se tratan como
+    variables del programa."""
+    tramos = {}
+    definiciones = Counter()
+    compartidos = set()
+    for tramo, instruction in zip(_regions(code), code):
+        nombres = list(_reads(instruction))
+        if instruction.op in VALUE_OPS or instruction.op == FOR:
+            nombres.append(instruction.dst)
+            if instruction.op in VALUE_OPS:
+                definiciones[instruction.dst] += 1
+        for nombre in nombres:
+            if is_temp(nombre) and tramos.setdefault(nombre, tramo) != tramo:
+                compartidos.add(nombre)
+    return {temporal for temporal in tramos
+            if temporal not in compartidos and definiciones[temporal] == 1}
+
+
+def eliminate_dead_code(code):
+    """Elimina las asignaciones cuyo resultado nunca se lee.
+
+    Recorre cada tramo recto hacia atrás llevando los nombres que se leen más
+    adelante en el tramo. Un temporal local muere al terminar su tramo, así
+    que se elimina si no se lee después; una variable del programa puede
+    leerse en cualquier otro lado, así que solo se elimina si el mismo tramo
+    la vuelve a asignar antes de leerla. Las llamadas se conservan siempre
+    por sus efectos y, como la función llamada puede leer cualquier variable,
+    anulan las reasignaciones pendientes. Tampoco se elimina una asignación
+    que podría fallar (_cannot_fail): el error es parte del resultado. Por lo
+    mismo, una llamada u operación que podría fallar también anula las
+    reasignaciones pendientes, porque si falla las variables se quedan con
+    el valor que tenían.
+    """
+    grafo = ControlFlowGraph(code)
+    asignados = _definitely_assigned(code, grafo)
+    tipos = _numeric_kinds(code, grafo, asignados)
+    locales = _local_temps(code)
+    vivos = set()          # nombres leídos más adelante en el tramo
+    sobrescritos = set()   # variables reasignadas más adelante sin leerse antes
+    conservado = []
+    for posicion in range(len(code) - 1, -1, -1):
+        instruction = code[posicion]
+        op = instruction.op
+        # Si puede fallar, no asigna nada seguro: las asignaciones anteriores siguen valiendo
+        seguro = op in VALUE_OPS and op != CALL and _cannot_fail(instruction, tipos, asignados.get(posicion))
+        if op not in VALUE_OPS:
+            vivos.clear()
+            sobrescritos.clear()
+        elif not seguro:
+            sobrescritos.clear()
+        else:
+            dst = instruction.dst
+            if dst in sobrescritos or (dst in locales and dst not in vivos):
+                continue
+        if op in VALUE_OPS:
+            vivos.discard(instruction.dst)
+            if seguro:
+                sobrescritos.add(instruction.dst)
+        for nombre in _reads(instruction):
+            vivos.add(nombre)
+            sobrescritos.discard(nombre)
+        conservado.append(instruction)
+    conservado.reverse()
+    return conservado
+
+
+def propagate_copies(code):
+    """Propagación de copias: elimina las cadenas tN = expr; x = tN.
+
+    Cuando una copia x = tN lee un temporal local asignado antes en el mismo
+    tramo, la instrucción que asignó tN pasa a guardar directamente en x y la
+    copia desaparece; los usos siguientes de tN leen x. Solo se hace si entre
+    ambas instrucciones nada lee ni asigna x ni llama a una función (que
+    podría leer x), si tN no se lee entre ellas y si x no se vuelve a asignar
+    antes del último uso de tN. Una copia tN = y, a su vez, desaparece si y no
+    cambia antes del último uso de tN, que pasa a leer y.
+    """
+    locales = _local_temps(code)
+    ultimo_uso = {}
+    for posicion, instruction in enumerate(code):
+        for nombre in _reads(instruction):
+            ultimo_uso[nombre] = posicion
+    definiciones = {}   # temporal local -> posición de su asignación en propagado
+    acceso = {}         # nombre -> última posición de propagado que lo lee o asigna
+    llamada = -1        # última posición de propagado con una llamada
+    alias = {}          # temporal eliminado -> variable que guarda su valor
+    propagado = []
+    for posicion, instruction in enumerate(code):
+        op = instruction.op
+        if op in VALUE_OPS or op in _TESTS:
+            if op == CALL:
+                instruction = Instruction(CALL, instruction.dst, instruction.src1,
+                                          tuple(alias.get(arg, arg) for arg in instruction.src2))
+            else:
+                instruction = Instruction(op, instruction.dst, alias.get(instruction.src1, instruction.src1),
+                                          alias.get(instruction.src2, instruction.src2))
+
+        temporal, dst = instruction.src1, instruction.dst
+        if op == COPY and temporal in definiciones:
+            definicion = definiciones.pop(temporal)
+            if (acceso.get(dst, -1) <= definicion and llamada <= definicion
+                    and acceso[temporal] == definicion
+                    and not _assigned_before(code, dst, posicion + 1, ultimo_uso[temporal])):
+                anterior = propagado[definicion]
+                propagado[definicion] = Instruction(anterior.op, dst, anterior.src1, anterior.src2)
+                acceso[dst] = definicion
+                if ultimo_uso[temporal] > posicion:
+                    alias[temporal] = dst
+                continue
+        if (op == COPY and dst in locales and type(temporal) is str
+                and not _assigned_before(code, temporal, posicion + 1, ultimo_uso.get(dst, posicion))):
+            alias[dst] = temporal  # tN = y: los usos de tN leen y directamente
+            continue
+
+        posicion_nueva = len(propagado)
+        propagado.append(instruction)
+        if op not in VALUE_OPS:
+            definiciones.clear()
+            continue
+        if op == CALL:
+            llamada = posicion_nueva
+        for nombre in _reads(instruction):
+            acceso[nombre] = posicion_nueva
+        acceso[dst] = posicion_nueva
+        if dst in locales:
+            definiciones[dst] = posicion_nueva
+    return propagado
+
+
+def _assigned_before(code, nombre, inicio, fin):
+    """Si alguna instrucción de code[inicio:fin] asigna nombre"""
+    for instruction in code[inicio:fin]:
+        if instruction.dst == nombre and (instruction.op in VALUE_OPS or instruction.op == FOR):
+            return True
+    return False
+
+
+def hoist_loop_invariants(code):
+    """Saca de los ciclos las operaciones invariantes.
+
+    Usa los ciclos naturales del grafo de flujo, de los más internos a los
+    más externos. Una operación del cuerpo (o de la condición de un While)
+    es invariante si guarda en un temporal local y sus operandos son
+    constantes, nombres que nada asigna dentro del ciclo u otros temporales
+    ya sacados. Se mueve a un preencabezado justo antes de LOOP o FOR, así
+    que se calcula una vez por entrada al ciclo y no en cada vuelta; lo que
+    sale de un ciclo interno puede volver a salir del externo. Las llamadas
+    no se mueven, y tampoco una operación que podría fallar (_cannot_fail):
+    en el preencabezado fallaría aunque el ciclo no diera ninguna vuelta.
+    """
+    grafo = ControlFlowGraph(code)
+    ciclos = sorted(grafo.natural_loops(), key=lambda ciclo: len(ciclo.body))
+    if not ciclos:
+        return list(code)
+    asignados_antes = _definitely_assigned(code, grafo)
+    tipos = _numeric_kinds(code, grafo, asignados_antes)
+    locales = _local_temps(code)
+    claves = [(posicion, 0, 0) for posicion in range(len(code))]  # orden final
+    bloques = [grafo.block_of(posicion) for posicion in range(len(code))]  # bloque donde está hoy cada una
+    secuencia = 0
+    for ciclo in ciclos:
+        cabecera = grafo.blocks[ciclo.header].start
+        inicio = min(grafo.blocks[bloque].start for bloque in ciclo.body)
+        fin = max(grafo.blocks[bloque].end for bloque in ciclo.body)
+        # Todo lo asignado en el tramo del ciclo, incluidas las funciones definidas en él
+        asignados = {instruction.dst for instruction in code[inicio:fin]
+                     if instruction.op in VALUE_OPS or instruction.op == FOR}
+        # El preencabezado pertenece al bloque que cae en la cabecera; si la
+        # cabecera es la entrada de una función, no se saca nada más de allí
+        previo = None if ciclo.header in grafo.entries else grafo.block_of(cabecera - 1)
+
+        candidatas = sorted((posicion for posicion in range(inicio, fin) if bloques[posicion] in ciclo.body),
+                            key=claves.__getitem__)
+        for posicion in candidatas:
+            instruction = code[posicion]
+            if (instruction.op in OPERATORS and instruction.dst in locales
+                    and instruction.src1 not in asignados and instruction.src2 not in asignados
+                    and _cannot_fail(instruction, tipos, asignados_antes.get(posicion))):
+                asignados.discard(instruction.dst)
+                claves[posicion] = (cabecera, -1, secuencia)
+                bloques[posicion] = previo
+                secuencia += 1
+    return [code[posicion] for posicion in sorted(range(len(code)), key=claves.__getitem__)]
+
+
+# Tipos que el análisis puede asegurar para un nombre: cada vez que el
+# nombre tiene un valor, ese valor es de ese tipo
+_INT = "int"
+_FLOAT = "float"
+_NUMBER = "number"  # int o float
+_UNKNOWN = "unknown"
+
+
+def _meet(a, b):
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    if _UNKNOWN in (a, b):
+        return _UNKNOWN
+    return _NUMBER
+
+
+def _int_const(operand):
+    """Valor de una constante entera (no bool), o None"""
+    if type(operand) is Const and type(operand.value) is int:
+        return operand.value
+    return None
+
+
+def _definitely_assigned(code, grafo):
+    """Para cada instrucción, si cada uno de sus operandos src1 y src2 ya fue
+    asignado en todos los caminos que llegan a ella, {posición: (bool, bool)}.
+
+    Análisis hacia adelante sobre el grafo de flujo, con un bit por nombre:
+    a un bloque llega la intersección de lo que sale de sus predecesores. Un
+    cuerpo de función empieza solo con sus parámetros asignados.
+    """
+    bits = {}
+    for instruction in code:
+        if instruction.op in VALUE_OPS or instruction.op == FOR:
+            bits.setdefault(instruction.dst, 1 << len(bits))
+        elif instruction.op == FUNC:
+            for parametro in instruction.src1:
+                bits.setdefault(parametro, 1 << len(bits))
+
+    generados = []
+    for bloque in grafo.blocks:
+        mascara = 0
+        for instruction in grafo.instructions(bloque.index):
+            if instruction.op in VALUE_OPS or instruction.op == FOR:
+                mascara |= bits[instruction.dst]
+        generados.append(mascara)
+    entradas = {0: 0}
+    for entrada in grafo.entries[1:]:
+        parametros = code[grafo.blocks[entrada].start - 1].src1
+        entradas[entrada] = sum(bits[parametro] for parametro in set(parametros))
+
+    orden = grafo.reverse_postorder()
+    salida = {bloque: -1 for bloque in orden}  # -1: todos los bits, aún sin calcular
+    llegada = {}
+    cambio = True
+    while cambio:
+        cambio = False
+        for bloque in orden:
+            if bloque in entradas:
+                mascara = entradas[bloque]
+            else:
+                mascara = -1
+                for pred in grafo.blocks[bloque].preds:
+                    mascara &= salida.get(pred, -1)
+            llegada[bloque] = mascara
+            nueva = mascara | generados[bloque]
+            if nueva != salida[bloque]:
+                salida[bloque] = nueva
+                cambio = True
+
+    asignados = {}
+    for bloque in orden:
+        mascara = llegada[bloque]
+        for posicion in range(grafo.blocks[bloque].start, grafo.blocks[bloque].end):
+            instruction = code[posicion]
+            if instruction.op in VALUE_OPS:
+                asignados[posicion] = tuple(type(operando) is not str or bool(mascara & bits.get(operando, 0))
+                                            for operando in (instruction.src1, instruction.src2))
+            if instruction.op in VALUE_OPS or instruction.op == FOR:
+                mascara |= bits[instruction.dst]
+    return asignados
+
+
+def _result_kind(op, a, b, src2):
+    """Tipo del resultado de a op b; None si todavía no se sabe nada"""
+    if op == COPY:
+        return a
+    if a is None or b is None:
+        return None
+    divisor = src2.value if type(src2) is Const and type(src2.value) in (int, float) else 0
+    if op in ('+', '-', '*'):
+        # Mezclar int y float puede fallar con un int demasiado grande
+        return a if a == b and a in (_INT, _FLOAT) else _UNKNOWN
+    if op == '/' and a == _FLOAT and divisor:
+        return _FLOAT
+    if op == '%' and divisor and (a == _FLOAT or a == _INT and type(divisor) is int):
+        return a
+    if op == '**' and a == _INT and _int_const(src2) is not None and src2.value >= 0:
+        return _INT
+    if op == '<<' and a == _INT and _int_const(src2) is not None and 0 <= src2.value <= 64:
+        return _INT
+    if op == '&' and a == b == _INT:
+        return _INT
+    return _UNKNOWN
+
+
+def _operand_kind(operando, asignado, tipos):
+    if type(operando) is Const:
+        return {int: _INT, float: _FLOAT}.get(type(operando.value), _UNKNOWN)
+    return tipos.get(operando, _UNKNOWN) if asignado else _UNKNOWN
+
+
+def _numeric_kinds(code, grafo, asignados=None):
+    """Nombres que siempre guardan un int, un float o un número, {nombre: tipo}.
+
+    Iteración optimista sobre todas las asignaciones: el tipo de un nombre es
+    el encuentro de los tipos que le asigna cada instrucción. Un operando que
+    puede no estar asignado todavía cuenta como desconocido, ya que su uso
+    falla en lugar de dar un número. asignados es el
+    resultado de _definitely_assigned, si ya se calculó.
+    """
+    if asignados is None:
+        asignados = _definitely_assigned(code, grafo)
+    tipos = {}
+    for instruction in code:
+        if instruction.op == FOR:
+            tipos[instruction.dst] = _UNKNOWN
+        elif instruction.op == FUNC:
+            for parametro in instruction.src1:
+                tipos[parametro] = _UNKNOWN
+        elif instruction.op in VALUE_OPS:
+            tipos.setdefault(instruction.dst, None)
+
+    cambio = True
+    while cambio:
+        cambio = False
+        for posicion, instruction in enumerate(code):
+            op = instruction.op
+            if op not in VALUE_OPS or posicion not in asignados:
+                continue
+            if op == CALL:
+                resultado = _UNKNOWN
+            else:
+                asignado1, asignado2 = asignados[posicion]
+                resultado = _result_kind(op, _operand_kind(instruction.src1, asignado1, tipos),
+                                         _operand_kind(instruction.src2, asignado2, tipos), instruction.src2)
+                if resultado is None:
+                    continue
+            nuevo = _meet(tipos[instruction.dst], resultado)
+            if nuevo != tipos[instruction.dst]:
+                tipos[instruction.dst] = nuevo
+                cambio = True
+    return {nombre: tipo for nombre, tipo in tipos.items() if tipo not in (None, _UNKNOWN)}
+
+
+def _cannot_fail(instruction, tipos, asignados):
+    """Si la operación seguro no lanza un error: sus operandos ya tienen
+    valor (asignados, de _definitely_assigned) y son números con los que
+    siempre da un resultado"""
+    if asignados is None:
+        return False
+    if instruction.op == COPY:
+        return asignados[0]
+    a = _operand_kind(instruction.src1, asignados[0], tipos)
+    b = _operand_kind(instruction.src2, asignados[1], tipos)
+    if instruction.op in ('==', '!=', '<', '<=', '>', '>='):
+        return _UNKNOWN not in (a, b)
+    return _result_kind(instruction.op, a, b, instruction.src2) not in (None, _UNKNOWN)
+
+
+def _power_of_two(valor):
+    """Exponente k si valor es 2**k con k >= 1 (entero o float), o None"""
+    if type(valor) is int and valor > 1 and valor & (valor - 1) == 0:
+        return valor.bit_length() - 1
+    if type(valor) is float and valor > 1 and valor.is_integer():
+        return _power_of_two(int(valor))
+    return None
+
+
+def _simplify(instruction, tipos):
+    """Versión más barata de una operación, o None si no la hay"""
+    op, dst, a, b = instruction.op, instruction.dst, instruction.src1, instruction.src2
+    if op in ('+', '*') and _int_const(a) is not None and _int_const(b) is None:
+        a, b = b, a  # La constante a la derecha
+    tipo = tipos.get(a) if type(a) is str else None
+    if tipo is None:
+        return None
+    numerico = tipo in (_INT, _FLOAT, _NUMBER)
+    entero = _int_const(b)
+    if op == '+' and entero == 0 and tipo == _INT:  # Con floats, -0.0 + 0 es 0.0
+        return Instruction(COPY, dst, a)
+    if op == '-' and entero == 0 and numerico:
+        return Instruction(COPY, dst, a)
+    if op == '*':
+        if entero == 1 and numerico:
+            return Instruction(COPY, dst, a)
+        if entero == 0 and tipo == _INT:
+            return Instruction(COPY, dst, const(0))
+        if entero is not None and _power_of_two(entero) and tipo == _INT:
+            return Instruction('<<', dst, a, const(_power_of_two(entero)))
+    if op == '/' and tipo == _FLOAT and type(b) is Const:
+        if b.value == 1 and type(b.value) in (int, float):
+            return Instruction(COPY, dst, a)
+        exponente = _power_of_two(b.value)
+        if exponente:  # Dividir por 2**k y multiplicar por 2**-k dan el mismo float
+            return Instruction('*', dst, a, const(2.0 ** -exponente))
+    if op == '%' and tipo == _INT and entero is not None and entero > 0 and entero & (entero - 1) == 0:
+        return Instruction('&', dst, a, const(entero - 1))
+    if op == '**' and entero is not None:
+        if entero == 1 and numerico:
+            return Instruction(COPY, dst, a)
+        if entero == 0 and tipo in (_INT, _FLOAT):
+            return Instruction(COPY, dst, const(1 if tipo == _INT else 1.0))
+        if entero == 2 and tipo == _INT:
+            return Instruction('*', dst, a, a)
+    return None
+
+
+def simplify_algebra(code):
+    """Simplificación algebraica y reducción de fuerza de operaciones sueltas.
+
+    Reemplaza identidades (x + 0, x - 0, x * 1, x * 0, x ** 1, x ** 0) por
+    copias y operaciones caras por otras más baratas: x ** 2 por x * x, la
+    multiplicación por 2**k por un desplazamiento, el resto por 2**k por un
+    & y la división de un float por 2**k por una multiplicación. Solo se
+    aplica cuando el análisis de tipos asegura que x es un número del tipo
+    para el que la regla da exactamente el mismo resultado.
+    """
+    tipos = _numeric_kinds(code, ControlFlowGraph(code))
+    if not tipos:
+        return list(code)
+    simplificado = []
+    for instruction in code:
+        if instruction.op in OPERATORS:
+            instruction = _simplify(instruction, tipos) or instruction
+        simplificado.append(instruction)
+    return simplificado
+
+
+def _step(instruction):
+    """Paso c si instruction es i = i + c, i = c + i o i = i - c con c entero, o None"""
+    op, dst, a, b = instruction.op, instruction.dst, instruction.src1, instruction.src2
+    if op == '+' and a == dst and _int_const(b) is not None:
+        return b.value
+    if op == '+' and b == dst and _int_const(a) is not None:
+        return a.value
+    if op == '-' and a == dst and _int_const(b) is not None:
+        return -b.value
+    return None
+
+
+def reduce_induction_variables(code):
+    """Reemplaza en los ciclos las multiplicaciones de variables de inducción
+    por sumas.
+
+    Una variable de inducción de un ciclo es un int que dentro del ciclo solo
+    cambia con i = i + c o i = i - c, con c constante. Cada t = i * k con k
+    constante (o t = i << k) pasa a ser t = s, donde s es un temporal nuevo que vale i * k
+    en el preencabezado y suma c * k justo después de cada cambio de i.
+    """
+    grafo = ControlFlowGraph(code)
+    ciclos = sorted(grafo.natural_loops(), key=lambda ciclo: len(ciclo.body))
+    if not ciclos:
+        return list(code)
+    tipos = _numeric_kinds(code, grafo)
+    bloques = [grafo.block_of(posicion) for posicion in range(len(code))]
+    siguiente = 1 + max((int(nombre[1:]) for nombre in _uses_and_targets(code) if is_temp(nombre)), default=0)
+    reemplazos = {}  # posición -> instrucción que la reemplaza
+    agregadas = []   # (clave de orden, instrucción nueva)
+    for ciclo in ciclos:
+        cabecera = grafo.blocks[ciclo.header].start
+        inicio = min(grafo.blocks[bloque].start for bloque in ciclo.body)
+        fin = max(grafo.blocks[bloque].end for bloque in ciclo.body)
+        cambios = {}       # variable de inducción -> [(posición, paso)]
+        descartadas = set()
+        for posicion in range(inicio, fin):
+            instruction = code[posicion]
+            if instruction.op == FUNC:
+                descartadas.update(instruction.src1)
+            elif instruction.op in VALUE_OPS or instruction.op == FOR:
+                paso = _step(instruction)
+                if paso is None or bloques[posicion] not in ciclo.body:
+                    descartadas.add(instruction.dst)
+                else:
+                    cambios.setdefault(instruction.dst, []).append((posicion, paso))
+
+        reducidas = {}  # (variable, factor) -> temporal que vale variable * factor
+        for posicion in range(inicio, fin):
+            instruction = code[posicion]
+            if posicion in reemplazos or bloques[posicion] not in ciclo.body:
+                continue
+            if instruction.op == '*':
+                opciones = ((instruction.src1, _int_const(instruction.src2)),
+                            (instruction.src2, _int_const(instruction.src1)))
+            elif instruction.op == '<<' and _int_const(instruction.src2) is not None:
+                opciones = ((instruction.src1, 1 << instruction.src2.value),)  # Lo deja simplify_algebra
+            else:
+                continue
+            for variable, factor in opciones:
+                if (factor is not None and variable in cambios and variable not in descartadas
+                        and tipos.get(variable) == _INT):
+                    break
+            else:
+                continue
+            clave = (variable, factor)
+            if clave not in reducidas:
+                temporal = reducidas[clave] = name(f"t{siguiente}")
+                siguiente += 1
+                agregadas.append(((cabecera, -1, len(agregadas)), Instruction('*', temporal, variable, const(factor))))
+                for cambio, paso in cambios[variable]:
+                    agregadas.append(((cambio, 1, len(agregadas)),
+                                      Instruction('+', temporal, temporal, const(paso * factor))))
+            reemplazos[posicion] = Instruction(COPY, instruction.dst, reducidas[clave])
+
+    ordenadas = [((posicion, 0, 0), reemplazos.get(posicion, instruction)) for posicion, instruction in enumerate(code)]
+    ordenadas.extend(agregadas)
+    ordenadas.sort(key=lambda item: item[0])
+    return [instruction for _, instruction in ordenadas]
+
+
+def recycle_temps(code):
+    """Renombra los temporales locales para reutilizar los que ya murieron.
+
+    Cada temporal recibe el menor nombre tN libre en el momento en que se
+    asigna, y lo libera en la instrucción que lo lee por última vez. La
+    cantidad de temporales distintos pasa a ser la mayor cantidad de ellos
+    vivos a la vez, en lugar de uno por operación del programa.
+    """
+    locales = _local_temps(code)
+    ultimo_uso = {}
+    for posicion, instruction in enumerate(code):
+        for nombre in _reads(instruction):
+            if nombre in locales:
+                ultimo_uso[nombre] = posicion
+    # Los números de los temporales que no se renombran quedan reservados
+    reservados = {int(nombre[1:]) for nombre in _uses_and_targets(code)
+                  if is_temp(nombre) and nombre not in locales}
+    libres = []      # montículo de números liberados
+    siguiente = 1    # menor número nunca usado
+    nuevos = {}      # temporal local -> nombre asignado
+    reciclado = []
+    for posicion, instruction in enumerate(code):
+        op = instruction.op
+        if op in VALUE_OPS or op in _TESTS:
+            src1 = nuevos.get(instruction.src1, instruction.src1)
+            src2 = (tuple(nuevos.get(arg, arg) for arg in instruction.src2) if op == CALL
+                    else nuevos.get(instruction.src2, instruction.src2))
+            for nombre in _reads(instruction):
+                if ultimo_uso.get(nombre) == posicion:
+                    heapq.heappush(libres, int(nuevos[nombre][1:]))
+                    ultimo_uso[nombre] = None  # Un operando repetido se libera una sola vez
+            dst = instruction.dst
+            if dst in locales:
+                if libres:
+                    numero = heapq.heappop(libres)
+                else:
+                    while siguiente in reservados:
+                        siguiente += 1
+                    numero = siguiente
+                    siguiente += 1
+                dst = nuevos[instruction.dst] = name(f"t{numero}")
+                if instruction.dst not in ultimo_uso:  # Nunca se lee: queda libre enseguida
+                    heapq.heappush(libres, numero)
+            instruction = Instruction(op, dst, src1, src2)
+        reciclado.append(instruction)
+    return reciclado
+
+
+def _uses_and_targets(code):
+    for instruction in code:
+        yield from _reads(instruction)
+        if instruction.op in VALUE_OPS or instruction.op == FOR:
+            yield instruction.dst
+
+
+# Pases que aplica cada nivel de optimización, en orden
+LEVELS = {
+    0: (),
+    1: (fold_constants,),
+    2: (fold_constants, simplify_algebra, number_values),
+    3: (fold_constants, simplify_algebra, number_values, propagate_copies, eliminate_dead_code,
+        recycle_temps),
+    4: (fold_constants, simplify_algebra, number_values, hoist_loop_invariants, propagate_copies,
+        reduce_induction_variables, propagate_copies, eliminate_dead_code, recycle_temps),
+}
+DEFAULT_LEVEL = 1
+
+
+def optimize(code, level=DEFAULT_LEVEL):
+    """Aplica los pases del nivel pedido y devuelve el código optimizado junto
+    con las instrucciones que eliminó cada pase, {nombre del pase: cantidad}"""
+    eliminadas = {}
+    for optimization_pass in LEVELS[level]:
+        antes = len(code)
+        code = optimization_pass(code)
+        nombre = optimization_pass.__name__
+        eliminadas[nombre] = eliminadas.get(nombre, 0) + antes - len(code)
+    return code, eliminadas
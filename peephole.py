@@ -0,0 +1,171 @@
+from collections import Counter
+
+from ir import is_temp
+from machine import MachineCode, MachineInstruction
+
+# Optimización de mirilla sobre el código máquina de machine.py. Cada regla
+# mira una ventana de instrucciones seguidas que termina en una con cierto
+# op y devuelve con qué reemplazarla, o None si no se aplica. Entre dos
+# instrucciones de una ventana no puede entrar un salto, porque las
+# entradas son siempre etiquetas (LABEL) y ninguna regla las cruza.
+#
+# El recorrido es una pila: cada instrucción se agrega a la salida y se
+# prueban las reglas que terminan en su op; si una se aplica, la ventana
+# sale de la salida y su reemplazo vuelve a la entrada, junto con la
+# instrucción anterior, para que se pruebe otra vez con lo que tiene al
+# lado. Cada aplicación borra una instrucción o cambia un LOAD por un MOV,
+# así que una pasada es lineal. Borrar la última lectura de una ranura
+# puede dejar muerto un STORE que ya había pasado; por eso se repiten las
+# pasadas hasta que una no cambia nada (en la práctica, la segunda).
+
+_LOADS = frozenset(["LOAD", "LOAD_GLOBAL"])
+
+
+class _Context:
+    """Lo que las reglas necesitan del programa entero: cuántas veces se lee
+    cada ranura de memoria, {(marco, ranura): lecturas}"""
+
+    __slots__ = ("symbols", "reads")
+
+    def __init__(self, machine):
+        self.symbols = machine.symbols
+        self.reads = Counter(self.slot(instruction) for instruction in machine.instructions
+                             if instruction.op in _LOADS)
+
+    def slot(self, instruction):
+        """(marco, ranura) de la memoria que lee o escribe instruction"""
+        if instruction.op == "LOAD_GLOBAL":
+            return 0, instruction.src1
+        posicion = instruction.position
+        de_posicion = self.symbols.scope_of
+        marco = de_posicion[posicion] if posicion < len(de_posicion) else 0
+        return marco, instruction.src1 if instruction.op == "LOAD" else instruction.dst
+
+    def dead(self, clave):
+        """Si nadie lee la ranura: las variables de una función desaparecen
+        al volver de ella; del nivel superior solo se descartan los
+        temporales, porque el resto es el resultado"""
+        if self.reads[clave]:
+            return False
+        marco, ranura = clave
+        return marco or is_temp(self.symbols.scopes[0].names[ranura])
+
+
+def _store_load(ventana, contexto):
+    """STORE x, a; LOAD b, x: b ya puede copiarse de a"""
+    guardado, carga = ventana
+    if guardado.op != "STORE" or carga.op != "LOAD" or contexto.slot(guardado) != contexto.slot(carga):
+        return None
+    if carga.dst == guardado.src1:
+        return [guardado]
+    return [MachineInstruction("MOV", carga.dst, guardado.src1, position=carga.position), guardado]
+
+
+def _load_load(ventana, contexto):
+    """LOAD a, x; LOAD b, x: la segunda carga es una copia de a"""
+    primera, segunda = ventana
+    if primera.op != segunda.op or contexto.slot(primera) != contexto.slot(segunda):
+        return None
+    if primera.dst == segunda.dst:
+        return [primera]
+    return [primera, MachineInstruction("MOV", segunda.dst, primera.dst, position=segunda.position)]
+
+
+def _load_store(ventana, contexto):
+    """LOAD a, x; STORE x, a: x ya tiene ese valor"""
+    carga, guardado = ventana
+    if carga.op != "LOAD" or carga.dst != guardado.src1 or contexto.slot(carga) != contexto.slot(guardado):
+        return None
+    return [carga]
+
+
+def _store_store(ventana, contexto):
+    """STORE x, a; STORE x, b: el primer guardado nunca se lee"""
+    primero, segundo = ventana
+    if primero.op != "STORE" or contexto.slot(primero) != contexto.slot(segundo):
+        return None
+    return [segundo]
+
+
+def _mov_self(ventana, contexto):
+    """MOV a, a"""
+    mov, = ventana
+    return [] if mov.dst == mov.src1 else None
+
+
+def _jump_next(ventana, contexto):
+    """JUMP L; LABEL L"""
+    salto, etiqueta = ventana
+    return [etiqueta] if salto.op == "JUMP" and salto.dst == etiqueta.dst else None
+
+
+def _dead_store(ventana, contexto):
+    """STORE x, a cuando nadie vuelve a cargar x"""
+    guardado, = ventana
+    return [] if contexto.dead(contexto.slot(guardado)) else None
+
+
+# Reglas: nombre -> (tamaño de la ventana, op de su última instrucción, regla)
+RULES = {
+    "store_load": (2, "LOAD", _store_load),
+    "load_load": (2, "LOAD", _load_load),
+    "load_global_load": (2, "LOAD_GLOBAL", _load_load),
+    "load_store": (2, "STORE", _load_store),
+    "store_store": (2, "STORE", _store_store),
+    "dead_store": (1, "STORE", _dead_store),
+    "mov_self": (1, "MOV", _mov_self),
+    "jump_next": (2, "LABEL", _jump_next),
+}
+
+DEFAULT_RULES = tuple(RULES)
+
+
+def _pass(instrucciones, por_op, atras, contexto, aciertos):
+    """Una pasada de la mirilla; devuelve la lista nueva y si cambió algo"""
+    pendientes = instrucciones[::-1]
+    salida = []
+    lecturas = contexto.reads
+    cambio = False
+    while pendientes:
+        instruction = pendientes.pop()
+        salida.append(instruction)
+        for nombre, ventana, regla in por_op.get(instruction.op, ()):
+            if len(salida) < ventana:
+                continue
+            inicio = len(salida) - ventana
+            reemplazo = regla(salida[inicio:], contexto)
+            if reemplazo is None:
+                continue
+            for vieja in salida[inicio:]:
+                if vieja.op in _LOADS:
+                    lecturas[contexto.slot(vieja)] -= 1
+            for nueva in reemplazo:
+                if nueva.op in _LOADS:
+                    lecturas[contexto.slot(nueva)] += 1
+            del salida[inicio:]
+            pendientes.extend(reversed(reemplazo))
+            # La instrucción anterior se vuelve a probar con lo que le quede al lado
+            for _ in range(min(atras, len(salida))):
+                pendientes.append(salida.pop())
+            aciertos[nombre] += 1
+            cambio = True
+            break
+    return salida, cambio
+
+
+def peephole(machine, rules=DEFAULT_RULES):
+    """Aplica las reglas rules (nombres de RULES) al código máquina machine
+    hasta que ninguna cambia nada. Devuelve el MachineCode nuevo y cuántas
+    veces se aplicó cada regla, {nombre: aplicaciones}."""
+    por_op = {}
+    for nombre in rules:
+        ventana, op, regla = RULES[nombre]
+        por_op.setdefault(op, []).append((nombre, ventana, regla))
+    atras = max((RULES[nombre][0] for nombre in rules), default=1) - 1
+    contexto = _Context(machine)
+    aciertos = dict.fromkeys(rules, 0)
+    instrucciones = machine.instructions
+    cambio = bool(por_op)
+    while cambio:
+        instrucciones, cambio = _pass(instrucciones, por_op, atras, contexto, aciertos)
+    return MachineCode(instrucciones, machine.symbols, machine.registers, machine.constants, machine.ir), aciertos
@@ -0,0 +1,520 @@
+from cfg import ControlFlowGraph
+from ir import (CALL, COPY, ELSE, END_FUNC, END_FOR, END_WHILE, FOR, FUNC, IF, OPERATORS,
+                PHI, VALUE_OPS, WHILE, Instruction, is_temp, name)
+
+# Forma SSA del código intermedio: cada nombre se asigna en un solo lugar.
+# to_ssa da a cada definición un temporal nuevo, con la misma numeración tN
+# de CodeGenerator.new_temp, y pone funciones PHI en los bloques donde se
+# juntan caminos (después de END_IF, al volver a LOOP o a FOR). from_ssa
+# vuelve a código ejecutable: cada versión recupera su nombre original
+# salvo que esté viva a la vez que otra versión del mismo nombre, y cada PHI
+# se reemplaza por copias en los arcos que llegan a su bloque.
+#
+# Quedan fuera del renombrado las funciones, sus parámetros y todo nombre
+# que aparezca dentro de un FUNC: una llamada puede leerlos o cambiarlos.
+# Las variables que no son temporales se consideran leídas al terminar el
+# programa, porque su valor final es parte del resultado.
+
+# Marcadores que saltan siempre a su destino
+_JUMPS = frozenset([ELSE, END_WHILE, END_FOR])
+
+
+def _reads(instruction):
+    op = instruction.op
+    if op == CALL:
+        return (instruction.src1, *instruction.src2)
+    if op in OPERATORS:
+        return (instruction.src1, instruction.src2)
+    if op in (COPY, IF, WHILE, FOR):
+        return (instruction.src1,)
+    return ()
+
+
+def _rewrite(instruction, leer, escribir):
+    """Copia de instruction con cada nombre leído pasado por leer y el nombre
+    que define pasado por escribir (en ese orden, como al ejecutarse)"""
+    op = instruction.op
+    if op == CALL:
+        args = tuple(leer(arg) for arg in instruction.src2)
+        return Instruction(CALL, escribir(instruction.dst), leer(instruction.src1), args)
+    if op in OPERATORS:
+        src1, src2 = leer(instruction.src1), leer(instruction.src2)
+        return Instruction(op, escribir(instruction.dst), src1, src2)
+    if op in (COPY, FOR):
+        src1 = leer(instruction.src1)
+        return Instruction(op, escribir(instruction.dst), src1)
+    if op in (IF, WHILE):
+        return Instruction(op, instruction.dst, leer(instruction.src1), instruction.src2)
+    return instruction
+
+
+def _pinned_names(code):
+    """Nombres que no se renombran: funciones, parámetros y todo lo que se
+    lee o asigna dentro del cuerpo de una función"""
+    fijos = set()
+    profundidad = 0
+    for instruction in code:
+        if instruction.op == FUNC:
+            fijos.add(instruction.dst)
+            fijos.update(instruction.src1)
+            profundidad += 1
+        elif instruction.op == END_FUNC:
+            profundidad -= 1
+        elif profundidad:
+            fijos.update(operando for operando in _reads(instruction) if type(operando) is str)
+            if instruction.op in VALUE_OPS or instruction.op == FOR:
+                fijos.add(instruction.dst)
+    return fijos
+
+
+def _for_body(code, bloque):
+    """La instrucción FOR si bloque es la entrada del cuerpo de ese ciclo.
+
+    La variable de un FOR se asigna solo cuando hay otro elemento, así que
+    para la forma SSA su definición está al principio del cuerpo.
+    """
+    if bloque.start and code[bloque.start - 1].op == FOR:
+        return code[bloque.start - 1]
+    return None
+
+
+class SSAForm:
+    """Código intermedio en forma SSA.
+
+    code tiene las mismas posiciones que el código original y graph es su
+    grafo de flujo de control. Las PHI no están en code sino en phis,
+    {bloque: [Instruction(PHI, dst, operandos)]}, con un operando por cada
+    elemento de predecessors(bloque). origin da el nombre original de cada
+    versión y exits la versión de cada variable que llega al final del
+    programa. Un nombre leído antes de cualquier asignación conserva su
+    nombre original, que representa su valor al empezar.
+    """
+
+    def __init__(self, code, graph, phis, origin, exits):
+        self.code = code
+        self.graph = graph
+        self.phis = phis
+        self.origin = origin
+        self.exits = exits
+        self._entries = set(graph.entries)
+
+    def predecessors(self, block):
+        """Predecesores de block en el orden de los operandos de sus PHI; None
+        es la entrada del programa o de la función"""
+        preds = self.graph.blocks[block].preds
+        return [None, *preds] if block in self._entries else list(preds)
+
+    def definitions(self):
+        """{versión: (bloque, instrucción que la define)}"""
+        grafo = self.graph
+        definiciones = {}
+        for bloque, phis in self.phis.items():
+            for phi in phis:
+                definiciones[phi.dst] = (bloque, phi)
+        for posicion, instruction in enumerate(self.code):
+            if instruction.op in VALUE_OPS:
+                definiciones[instruction.dst] = (grafo.block_of(posicion), instruction)
+            elif instruction.op == FOR:
+                definiciones[instruction.dst] = (grafo.block_of(posicion + 1), instruction)
+        return definiciones
+
+    def uses(self):
+        """{nombre: [(bloque, instrucción que lo lee)]}; una PHI lee cada
+        operando al final del predecesor correspondiente"""
+        grafo = self.graph
+        usos = {}
+        for bloque, phis in self.phis.items():
+            for phi in phis:
+                for operando in phi.src1:
+                    usos.setdefault(operando, []).append((bloque, phi))
+        for indice, bloque in enumerate(grafo.blocks):
+            for instruction in self.code[bloque.start:bloque.end]:
+                for operando in _reads(instruction):
+                    if type(operando) is str:
+                        usos.setdefault(operando, []).append((indice, instruction))
+        return usos
+
+    def format(self):
+        """Texto de tres direcciones, con las PHI al principio de su bloque"""
+        lineas = []
+        for indice, bloque in enumerate(self.graph.blocks):
+            lineas.extend(str(phi) for phi in self.phis.get(indice, ()))
+            lineas.extend(str(instruction) for instruction in self.code[bloque.start:bloque.end])
+        return lineas
+
+
+def to_ssa(code):
+    """Forma SSA de code: pone las PHI en la frontera de dominancia iterada de
+    las definiciones (Cytron et al.) y renombra recorriendo el árbol de
+    dominadores. Las PHI de temporales se ponen solo si el temporal se lee
+    en otro bloque que el de su definición, y al final se descartan las PHI
+    cuyo valor nadie lee (SSA podada)."""
+    grafo = ControlFlowGraph(code)
+    fijos = _pinned_names(code)
+    idom = grafo.immediate_dominators()
+
+    # Bloques que definen cada nombre y nombres leídos en más de un bloque
+    bloques_definicion = {}
+    globales = set()
+    for indice, bloque in enumerate(grafo.blocks):
+        definidos = set()
+        ciclo = _for_body(code, bloque)
+        if ciclo is not None and ciclo.dst not in fijos:
+            definidos.add(ciclo.dst)
+        for instruction in code[bloque.start:bloque.end]:
+            for operando in _reads(instruction):
+                if type(operando) is str and operando not in definidos:
+                    globales.add(operando)
+            if instruction.op in VALUE_OPS and instruction.dst not in fijos:
+                definidos.add(instruction.dst)
+        for nombre in definidos:
+            bloques_definicion.setdefault(nombre, []).append(indice)
+            if not is_temp(nombre):
+                globales.add(nombre)
+
+    # Frontera de dominancia; las entradas cuentan con un predecesor más
+    frontera = {bloque: [] for bloque in idom}
+    entradas = set(grafo.entries)
+    for bloque in idom:
+        preds = [pred for pred in grafo.blocks[bloque].preds if pred in idom]
+        if len(preds) + (bloque in entradas) < 2:
+            continue
+        tope = None if bloque in entradas else idom[bloque]
+        for pred in preds:
+            corredor = pred
+            while corredor != tope:
+                if bloque not in frontera[corredor]:
+                    frontera[corredor].append(bloque)
+                if corredor == idom[corredor]:
+                    break
+                corredor = idom[corredor]
+
+    phis = {}
+    origen_phi = {}  # id de la PHI -> nombre original
+    for nombre, bloques in bloques_definicion.items():
+        if nombre not in globales:
+            continue
+        con_phi = set()
+        pendientes = [bloque for bloque in bloques if bloque in idom]
+        while pendientes:
+            for destino in frontera[pendientes.pop()]:
+                if destino in con_phi:
+                    continue
+                con_phi.add(destino)
+                phi = Instruction(PHI, nombre, [nombre] * (len(grafo.blocks[destino].preds)
+                                                          + (destino in entradas)))
+                phis.setdefault(destino, []).append(phi)
+                origen_phi[id(phi)] = nombre
+                pendientes.append(destino)
+
+    # Renombrado en preorden del árbol de dominadores
+    hijos = {}
+    for bloque, padre in idom.items():
+        if bloque != padre:
+            hijos.setdefault(padre, []).append(bloque)
+    pilas = {nombre: [] for nombre in bloques_definicion}
+    origin = {}
+    contador = max((int(operando[1:]) for instruction in code for operando in
+                    (*_reads(instruction), instruction.dst) if is_temp(operando)), default=0)
+
+    def leer(nombre):
+        pila = pilas.get(nombre) if type(nombre) is str else None
+        return pila[-1] if pila else nombre
+
+    def escribir(nombre):
+        nonlocal contador
+        pila = pilas.get(nombre)
+        if pila is None:
+            return nombre
+        contador += 1
+        version = name(f"t{contador}")
+        origin[version] = nombre
+        pila.append(version)
+        apiladas.append(nombre)
+        return version
+
+    nuevo = list(code)
+    salida = grafo.exit_block()
+    exits = {}
+    for entrada in grafo.entries:
+        trabajo = [(entrada, None)]
+        while trabajo:
+            indice, apiladas_padre = trabajo.pop()
+            if apiladas_padre is not None:  # Fin del subárbol: se deshace lo apilado
+                for nombre in apiladas_padre:
+                    pilas[nombre].pop()
+                continue
+            apiladas = []
+            bloque = grafo.blocks[indice]
+            for phi in phis.get(indice, ()):
+                phi.dst = escribir(origen_phi[id(phi)])
+            ciclo = _for_body(code, bloque)
+            if ciclo is not None:
+                nuevo[bloque.start - 1].dst = escribir(ciclo.dst)
+            for posicion in range(bloque.start, bloque.end):
+                instruction = code[posicion]
+                nuevo[posicion] = _rewrite(instruction, leer,
+                                           (lambda nombre: nombre) if instruction.op == FOR else escribir)
+            for sucesor in bloque.succs:
+                j = grafo.blocks[sucesor].preds.index(indice) + (sucesor in entradas)
+                for phi in phis.get(sucesor, ()):
+                    phi.src1[j] = leer(origen_phi[id(phi)])
+            if indice == salida:
+                exits = {nombre: leer(nombre) for nombre in pilas if not is_temp(nombre)}
+            trabajo.append((indice, apiladas))
+            trabajo.extend((hijo, None) for hijo in hijos.get(indice, ()))
+
+    # Se descartan las PHI cuyo valor no llega a ninguna instrucción ni al
+    # final del programa; si no, su operando inicial mantendría vivo el
+    # nombre original desde el principio del programa hasta el ciclo
+    por_destino = {phi.dst: phi for lista in phis.values() for phi in lista}
+    pendientes = [operando for instruction in nuevo for operando in _reads(instruction)]
+    pendientes.extend(exits.values())
+    usadas = set()
+    while pendientes:
+        phi = por_destino.get(pendientes.pop())
+        if phi is not None and id(phi) not in usadas:
+            usadas.add(id(phi))
+            pendientes.extend(phi.src1)
+    podadas = {}
+    for bloque, lista in phis.items():
+        lista = [phi for phi in lista if id(phi) in usadas]
+        for phi in lista:
+            phi.src1 = tuple(phi.src1)
+        if lista:
+            podadas[bloque] = lista
+    return SSAForm(nuevo, grafo, podadas, origin, exits)
+
+
+def _liveness(ssa, seguidos, reales):
+    """Versiones de seguidos vivas al entrar y al salir de cada bloque
+    alcanzable, recorriendo hacia atrás desde cada uso hasta la definición"""
+    grafo = ssa.graph
+    code = ssa.code
+    bloque_definicion = {}
+    for indice in reales:
+        bloque = grafo.blocks[indice]
+        for phi in ssa.phis.get(indice, ()):
+            bloque_definicion[phi.dst] = indice
+        ciclo = _for_body(code, bloque)
+        if ciclo is not None:
+            bloque_definicion[ciclo.dst] = indice
+        for instruction in code[bloque.start:bloque.end]:
+            if instruction.op in VALUE_OPS:
+                bloque_definicion[instruction.dst] = indice
+
+    entrada = {indice: set() for indice in reales}
+    salida = {indice: set() for indice in reales}
+
+    def vivo_al_entrar(indice, nombre):
+        pendientes = [indice]
+        entrada[indice].add(nombre)
+        while pendientes:
+            for pred in grafo.blocks[pendientes.pop()].preds:
+                if pred not in reales or nombre in salida[pred]:
+                    continue
+                salida[pred].add(nombre)
+                if bloque_definicion.get(nombre) != pred and nombre not in entrada[pred]:
+                    entrada[pred].add(nombre)
+                    pendientes.append(pred)
+
+    def vivo_al_salir(indice, nombre):
+        salida[indice].add(nombre)
+        if bloque_definicion.get(nombre) != indice and nombre not in entrada[indice]:
+            vivo_al_entrar(indice, nombre)
+
+    for indice in reales:
+        bloque = grafo.blocks[indice]
+        definidos = {phi.dst for phi in ssa.phis.get(indice, ())}
+        ciclo = _for_body(code, bloque)
+        if ciclo is not None:
+            definidos.add(ciclo.dst)
+        for instruction in code[bloque.start:bloque.end]:
+            for operando in _reads(instruction):
+                if operando in seguidos and operando not in definidos and operando not in entrada[indice]:
+                    vivo_al_entrar(indice, operando)
+            if instruction.op in VALUE_OPS:
+                definidos.add(instruction.dst)
+        for phi in ssa.phis.get(indice, ()):
+            for pred, operando in zip(ssa.predecessors(indice), phi.src1):
+                if pred in reales and operando in seguidos:
+                    vivo_al_salir(pred, operando)
+    fin = grafo.exit_block()
+    if fin in reales:
+        for version in ssa.exits.values():
+            if version in seguidos:
+                vivo_al_salir(fin, version)
+    return entrada, salida
+
+
+def _interference(ssa, reales):
+    """{versión: versiones del mismo nombre original vivas a la vez que ella}"""
+    grupo = dict(ssa.origin)
+    grupo.update((nombre, nombre) for nombre in set(grupo.values()))
+    _, salida = _liveness(ssa, grupo, reales)
+
+    conflictos = {}
+
+    def chocan(a, b):
+        conflictos.setdefault(a, set()).add(b)
+        conflictos.setdefault(b, set()).add(a)
+
+    code = ssa.code
+    for indice in reales:
+        bloque = ssa.graph.blocks[indice]
+        vivos = {}  # nombre original -> versiones vivas
+        for version in salida[indice]:
+            vivos.setdefault(grupo[version], set()).add(version)
+
+        def definir(version):
+            nombre = grupo.get(version)
+            if nombre is None:
+                return
+            otras = vivos.get(nombre, set())
+            otras.discard(version)
+            for otra in otras:
+                chocan(version, otra)
+
+        for instruction in reversed(code[bloque.start:bloque.end]):
+            if instruction.op in VALUE_OPS:
+                definir(instruction.dst)
+            for operando in _reads(instruction):
+                if operando in grupo:
+                    vivos.setdefault(grupo[operando], set()).add(operando)
+        ciclo = _for_body(code, bloque)
+        if ciclo is not None:
+            definir(ciclo.dst)
+        # Las PHI se asignan todas a la vez al entrar al bloque
+        destinos = [phi.dst for phi in ssa.phis.get(indice, ()) if phi.dst in grupo]
+        for destino in destinos:
+            vivos.get(grupo[destino], set()).discard(destino)
+        for posicion, destino in enumerate(destinos):
+            for otra in vivos.get(grupo[destino], ()):
+                chocan(destino, otra)
+            for otra in destinos[posicion + 1:]:
+                if grupo[otra] == grupo[destino]:
+                    chocan(destino, otra)
+    return conflictos
+
+
+def _storage_names(ssa, conflictos):
+    """Nombre con que queda cada versión al salir de SSA: el original, salvo
+    las que chocan con una versión que ya lo usa"""
+    versiones = {}
+    for version, nombre in ssa.origin.items():
+        versiones.setdefault(nombre, []).append(version)
+    nombres = {}
+    for nombre, lista in versiones.items():
+        if not any(version in conflictos for version in lista) and nombre not in conflictos:
+            nombres.update((version, nombre) for version in lista)
+            continue
+        clase = {nombre}
+        for version in sorted(lista, key=lambda version: int(version[1:])):
+            if conflictos.get(version, set()).isdisjoint(clase):
+                clase.add(version)
+                nombres[version] = nombre
+            else:
+                nombres[version] = version
+    return nombres
+
+
+def _edge_slot(grafo, pred, bloque):
+    """Dónde poner en el código las copias del arco pred -> bloque para que se
+    ejecuten solo al pasar por ese arco: (posición, orden). Orden 0 va antes
+    de la instrucción en esa posición, 1 antes del salto con que termina
+    pred y 2 en una rama ELSE nueva antes de END_IF."""
+    code = grafo.code
+    inicio = grafo.blocks[bloque].start
+    if pred is None:
+        return inicio, 0
+    ultima = grafo.blocks[pred].end - 1
+    op = code[ultima].op
+    if op in _JUMPS:
+        return ultima, 1
+    if op == IF and inicio != ultima + 1:
+        return inicio, 2
+    return inicio, 0
+
+
+def _sequence(copias, nuevo_temporal):
+    """Copias simultáneas {destino: origen} como una secuencia de COPY; un
+    ciclo de copias se rompe con un temporal"""
+    pendientes = dict(copias)
+    secuencia = []
+    while pendientes:
+        leidos = set(pendientes.values())
+        listos = [destino for destino in pendientes if destino not in leidos]
+        if listos:
+            for destino in listos:
+                secuencia.append(Instruction(COPY, destino, pendientes.pop(destino)))
+            continue
+        destino = next(iter(pendientes))
+        temporal = nuevo_temporal()
+        secuencia.append(Instruction(COPY, temporal, destino))
+        pendientes = {d: temporal if origen == destino else origen for d, origen in pendientes.items()}
+    return secuencia
+
+
+def from_ssa(ssa):
+    """Código ejecutable equivalente a ssa.
+
+    Cada versión vuelve a su nombre original si no está viva a la vez que
+    otra versión que ya lo tomó, y las PHI entre versiones con el mismo
+    nombre desaparecen; si el código salió de to_ssa sin cambios, el
+    resultado es el código original. Las demás versiones conservan su
+    nombre, cada PHI se convierte en copias en los arcos que llegan a su
+    bloque y al final del programa se copia a cada variable su última
+    versión.
+    """
+    grafo = ssa.graph
+    code = ssa.code
+    reales = set(grafo.immediate_dominators())
+    nombres = _storage_names(ssa, _interference(ssa, reales))
+    origin = ssa.origin
+
+    def renombrar(nombre):
+        return nombres.get(nombre, nombre) if type(nombre) is str else nombre
+
+    contador = max((int(version[1:]) for version in origin), default=0)
+    for instruction in code:
+        for operando in (*_reads(instruction), instruction.dst):
+            if is_temp(operando):
+                contador = max(contador, int(operando[1:]))
+
+    def nuevo_temporal():
+        nonlocal contador
+        contador += 1
+        return name(f"t{contador}")
+
+    agregadas = {}  # posición -> [(orden, instrucciones)]
+    for indice, phis in ssa.phis.items():
+        if indice not in reales:
+            continue
+        for j, pred in enumerate(ssa.predecessors(indice)):
+            if pred is not None and pred not in reales:
+                continue
+            copias = {}
+            for phi in phis:
+                destino, origen = renombrar(phi.dst), renombrar(phi.src1[j])
+                if destino != origen:
+                    copias[destino] = origen
+            if not copias:
+                continue
+            posicion, orden = _edge_slot(grafo, pred, indice)
+            secuencia = _sequence(copias, nuevo_temporal)
+            if orden == 2:
+                secuencia.insert(0, Instruction(ELSE))
+            agregadas.setdefault(posicion, []).append((orden, secuencia))
+
+    finales = {nombre: renombrar(version) for nombre, version in ssa.exits.items()
+               if renombrar(version) != nombre}
+    if finales:
+        agregadas.setdefault(len(code), []).append((0, _sequence(finales, nuevo_temporal)))
+
+    resultado = []
+    for posicion in range(len(code) + 1):
+        for _, secuencia in sorted(agregadas.get(posicion, ()), key=lambda item: item[0]):
+            resultado.extend(secuencia)
+        if posicion < len(code):
+            resultado.append(_rewrite(code[posicion], renombrar, renombrar))
+    return resultado
@@ -0,0 +1,195 @@
+import builtins
+
+from ir import CALL, COPY, END_FUNC, FOR, FUNC, IF, OPERATORS, VALUE_OPS, WHILE, const
+
+# Tabla de símbolos del código intermedio. Cada nombre tiene una ranura
+# entera en el marco de la función que lo usa (o del nivel superior), y
+# cada constante una ranura que el marco ya trae cargada; los intérpretes
+# guardan el estado en marcos que son listas y solo SymbolTable.store arma
+# otra vez el diccionario de nombres, para mostrarlo.
+
+
+class _Unbound:
+    """Valor de una ranura cuyo nombre todavía no se asignó. Usarlo en una
+    operación, una condición, una iteración o como función falla; quien
+    ejecuta informa ese error como un NameError con el nombre
+    (SymbolTable.unbound_name)."""
+
+    __slots__ = ()
+
+    def fail(self, *args):
+        raise NameError("nombre sin valor")
+
+    __bool__ = __iter__ = __call__ = __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = fail
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return "<sin valor>"
+
+
+for _nombre in ("add", "sub", "mul", "truediv", "mod", "pow", "lshift", "and"):
+    setattr(_Unbound, f"__{_nombre}__", _Unbound.fail)
+    setattr(_Unbound, f"__r{_nombre}__", _Unbound.fail)
+
+UNBOUND = _Unbound()
+
+
+def operands(instruction):
+    """Operandos que lee una instrucción, nombres o constantes"""
+    op = instruction.op
+    if op == CALL:
+        return (instruction.src1, *instruction.src2)
+    if op in OPERATORS:
+        return (instruction.src1, instruction.src2)
+    if op in (COPY, IF, WHILE, FOR):
+        return (instruction.src1,)
+    return ()
+
+
+class Scope:
+    """Marco del nivel superior o de una función.
+
+    names son los nombres de sus ranuras de variables: primero los que el
+    código asigna (assigned, con los params parámetros al principio) y luego
+    los que solo lee (hasta variables); quien ejecuta puede agregar después
+    ranuras propias (hidden_slot). Las ranuras siguientes son las de
+    constants. start es la posición donde empieza el cuerpo de la función
+    en el programa que la ejecuta.
+    """
+
+    __slots__ = ("name", "names", "params", "assigned", "variables", "constants", "start", "template",
+                 "_slots", "_constant_slots")
+
+    def __init__(self, name, params):
+        self.name = name
+        self.names = list(params)
+        self.params = len(params)
+        self.assigned = self.variables = 0
+        self.constants = []
+        self.start = 0
+        self.template = None
+        self._slots = {nombre: ranura for ranura, nombre in enumerate(self.names)}
+        self._constant_slots = {}
+
+    def __contains__(self, nombre):
+        return nombre in self._slots
+
+    def slot(self, nombre):
+        """Ranura de un nombre; la agrega si todavía no la tiene"""
+        ranura = self._slots.get(nombre)
+        if ranura is None:
+            ranura = self._slots[nombre] = len(self.names)
+            self.names.append(nombre)
+        return ranura
+
+    def hidden_slot(self, nombre):
+        """Ranura nueva que no corresponde a ningún nombre del programa"""
+        self.names.append(nombre)
+        return len(self.names) - 1
+
+    def constant_slot(self, valor):
+        """Ranura de una constante; se agregan después de todos los nombres"""
+        clave = const(valor)
+        ranura = self._constant_slots.get(clave)
+        if ranura is None:
+            ranura = self._constant_slots[clave] = len(self.names) + len(self.constants)
+            self.constants.append(valor)
+        return ranura
+
+    def frame(self):
+        """Marco nuevo: variables sin valor y constantes ya cargadas"""
+        return self.template[:]
+
+    def operand_text(self, ranura):
+        if ranura < len(self.names):
+            return self.names[ranura]
+        return repr(self.constants[ranura - len(self.names)])
+
+
+class SymbolTable:
+    """Ranuras de todos los nombres de code. scopes[0] es el nivel superior
+    y hay un Scope más por cada FUNC; scope_of da el índice del marco de
+    cada posición de code.
+
+    Lo que una función lee sin asignarlo es global: tiene una ranura en el
+    nivel superior y otra en la función, donde quien ejecuta puede copiarlo.
+    Las constantes se agregan con Scope.constant_slot y finish arma las
+    plantillas de los marcos.
+    """
+
+    __slots__ = ("scopes", "scope_of")
+
+    def __init__(self, code):
+        self.scopes = marcos = [Scope(None, ())]
+        self.scope_of = de_posicion = []
+        abiertos = [0]
+        for instruction in code:
+            op = instruction.op
+            de_posicion.append(abiertos[-1])
+            if op == FUNC:
+                marcos[abiertos[-1]].slot(instruction.dst)
+                abiertos.append(len(marcos))
+                marcos.append(Scope(instruction.dst, instruction.src1))
+            elif op == END_FUNC:
+                if len(abiertos) > 1:
+                    abiertos.pop()
+            elif op in VALUE_OPS or op == FOR:
+                marcos[abiertos[-1]].slot(instruction.dst)
+        for marco in marcos:
+            marco.assigned = len(marco.names)
+
+        superior = marcos[0]
+        for posicion, instruction in enumerate(code):
+            marco = marcos[de_posicion[posicion]]
+            for operando in operands(instruction):
+                if type(operando) is str and operando not in marco:
+                    marco.slot(operando)
+                    superior.slot(operando)
+        for marco in marcos:
+            marco.variables = len(marco.names)
+
+    def finish(self):
+        for marco in self.scopes:
+            marco.template = [UNBOUND] * len(marco.names) + marco.constants
+
+    def lookup(self, indice, nombre):
+        """(es_global, ranura) de nombre en el marco indice"""
+        marco = self.scopes[indice]
+        ranura = marco.slot(nombre)
+        if indice and ranura >= marco.assigned:
+            return True, self.scopes[0].slot(nombre)
+        return False, ranura
+
+    def unbound_name(self, instruction, indice, variables, globals):
+        """NameError si uno de los nombres que lee instruction, en el marco
+        indice, todavía no tiene valor; si no, None"""
+        for operando in operands(instruction):
+            if type(operando) is not str:
+                continue
+            es_global, ranura = self.lookup(indice, operando)
+            if (globals if es_global else variables)[ranura] is UNBOUND:
+                return NameError(f"name '{operando}' is not defined")
+        return None
+
+    def load(self, variables):
+        """Marco del nivel superior con los valores de variables; los nombres
+        que no están allí pero sí en builtins empiezan con ese valor"""
+        superior = self.scopes[0]
+        marco = superior.frame()
+        for ranura, nombre in enumerate(superior.names[:superior.variables]):
+            if nombre in variables:
+                marco[ranura] = variables[nombre]
+            elif hasattr(builtins, nombre):
+                marco[ranura] = getattr(builtins, nombre)
+        return marco
+
+    def store(self, marco, variables):
+        """Vuelve a guardar en variables, por nombre, lo que el programa
+        asignó en el marco del nivel superior"""
+        superior = self.scopes[0]
+        for ranura, nombre in enumerate(superior.names[:superior.assigned]):
+            valor = marco[ranura]
+            # Una función incorporada que nunca se reemplazó no es una variable
+            if valor is UNBOUND or nombre not in variables and valor is getattr(builtins, nombre, UNBOUND):
+                continue
+            variables[nombre] = valor
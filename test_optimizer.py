@@ -0,0 +1,46 @@
+import ast
+
+import pytest
+
+from codegen import CodeGenerator
+from interpreter import EvaluationError, Interpreter
+from ir import is_temp
+from optimizer import LEVELS, eliminate_dead_code, optimize
+
+
+def generar(fuente):
+    generador = CodeGenerator()
+    generador.generate_code(ast.parse(fuente))
+    return generador.code, generador.variables
+
+
+def ejecutar(code, variables):
+    """Error que detuvo la ejecución (su tipo, o None) y variables del
+    programa (sin temporales) en ese momento"""
+    variables = dict(variables)
+    try:
+        Interpreter(code).run(variables)
+        error = None
+    except EvaluationError as e:
+        error = type(e.error)
+    return error, {nombre: repr(valor) for nombre, valor in variables.items() if not is_temp(nombre)}
+
+
+@pytest.mark.parametrize("nivel", sorted(LEVELS))
+@pytest.mark.parametrize("fuente", [
+    # El guardado b = 0 no está muerto: la operación siguiente falla antes de reasignar b
+    "b = 2\nb = 0\ni = 0\nb = (1 % i) ** 0\n",
+    "a = 1\nb = 0\nx = a / b\nx = 5\n",
+    "x = q + 1\nx = 2\n",
+])
+def test_un_error_conserva_las_asignaciones_anteriores(fuente, nivel):
+    code, variables = generar(fuente)
+    optimizado, _ = optimize(code, nivel)
+    assert ejecutar(optimizado, variables) == ejecutar(code, variables)
+
+
+def test_guardado_muerto_sin_errores_se_elimina():
+    code, variables = generar("b = 2\nb = 0\ni = 1\nb = (1 % i) ** 0\n")
+    optimizado = eliminate_dead_code(code)
+    assert len(optimizado) < len(code)
+    assert ejecutar(optimizado, variables) == ejecutar(code, variables)
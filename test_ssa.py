@@ -0,0 +1,191 @@
+import ast
+
+import pytest
+
+from codegen import CodeGenerator
+from ir import COPY, FOR, VALUE_OPS, is_temp
+from interpreter import Interpreter
+from ssa import _rewrite, from_ssa, to_ssa
+
+PROGRAMAS = {
+    "lineal": """
+a = 1
+b = a + 2
+a = b * 3
+c = a - b
+""",
+    "if_else": """
+x = 5
+if x > 3:
+    y = x + 1
+else:
+    y = x - 1
+z = y * 2
+""",
+    "while": """
+s = 0
+i = 0
+while i < 10:
+    s = s + i
+    i = i + 1
+""",
+    "for_anidado": """
+total = 0
+for i in range(4):
+    for j in range(3):
+        if (i + j) % 2 == 0:
+            total = total + i * j
+        else:
+            total = total - 1
+""",
+    "funcion": """
+k = 3
+def f(a):
+    print(a + k)
+r = 0
+for i in range(5):
+    f(i)
+    r = r + i
+""",
+    "intercambio": """
+a = 1
+b = 2
+i = 0
+while i < 3:
+    t = a
+    a = b
+    b = t
+    i = i + 1
+""",
+    "copia_perdida": """
+x = 1
+y = 0
+i = 0
+while i < 4:
+    y = x
+    x = x + 1
+    i = i + 1
+z = y
+""",
+}
+
+
+def generar(fuente):
+    generador = CodeGenerator()
+    generador.generate_code(ast.parse(fuente))
+    return generador.code, generador.variables
+
+
+def ejecutar(code, variables):
+    """Variables del programa (sin temporales) al terminar de ejecutar code"""
+    variables = dict(variables)
+    Interpreter(code).run(variables)
+    return {nombre: repr(valor) for nombre, valor in variables.items() if not is_temp(nombre)}
+
+
+def propagar_copias(forma):
+    """Reemplaza cada lectura de una versión copiada por la versión original,
+    también en las PHI y en exits. Es válido en SSA, pero deja vivas a la
+    vez versiones del mismo nombre, así que from_ssa ya no puede devolverles
+    su nombre original."""
+    fuente = {instruction.dst: instruction.src1 for instruction in forma.code
+              if instruction.op == COPY and type(instruction.src1) is str}
+
+    def leer(nombre):
+        while type(nombre) is str and nombre in fuente:
+            nombre = fuente[nombre]
+        return nombre
+
+    forma.code = [_rewrite(instruction, leer, lambda nombre: nombre) for instruction in forma.code]
+    for phis in forma.phis.values():
+        for phi in phis:
+            phi.src1 = tuple(leer(operando) for operando in phi.src1)
+    forma.exits = {nombre: leer(version) for nombre, version in forma.exits.items()}
+
+
+def frontera_de_dominancia(grafo, bloque):
+    """Bloques b con un predecesor dominado por bloque y que bloque no domina
+    estrictamente, por definición"""
+    alcanzables = grafo.immediate_dominators()
+    return {b for b in alcanzables
+            if any(pred in alcanzables and grafo.dominates(bloque, pred) for pred in grafo.blocks[b].preds)
+            and not (b != bloque and grafo.dominates(bloque, b))}
+
+
+@pytest.mark.parametrize("nombre", sorted(PROGRAMAS))
+def test_ida_y_vuelta_devuelve_el_codigo(nombre):
+    code, _ = generar(PROGRAMAS[nombre])
+    assert from_ssa(to_ssa(code)) == code
+
+
+@pytest.mark.parametrize("nombre", sorted(PROGRAMAS))
+def test_ida_y_vuelta_conserva_el_comportamiento(nombre):
+    code, variables = generar(PROGRAMAS[nombre])
+    assert ejecutar(from_ssa(to_ssa(code)), variables) == ejecutar(code, variables)
+
+
+@pytest.mark.parametrize("nombre", sorted(PROGRAMAS))
+def test_una_sola_definicion_por_version(nombre):
+    forma = to_ssa(generar(PROGRAMAS[nombre])[0])
+    definidas = [instruction.dst for instruction in forma.code
+                 if instruction.op in VALUE_OPS or instruction.op == FOR]
+    definidas += [phi.dst for phis in forma.phis.values() for phi in phis]
+    versiones = [nombre for nombre in definidas if nombre in forma.origin]
+    assert len(versiones) == len(set(versiones))
+
+
+@pytest.mark.parametrize("nombre", sorted(PROGRAMAS))
+def test_phi_en_la_frontera_de_dominancia(nombre):
+    code, _ = generar(PROGRAMAS[nombre])
+    forma = to_ssa(code)
+    grafo = forma.graph
+    for bloque, phis in forma.phis.items():
+        for phi in phis:
+            assert len(phi.src1) == len(forma.predecessors(bloque))
+            # Frontera de dominancia iterada de los bloques que asignan el nombre
+            original = forma.origin[phi.dst]
+            definiciones = {grafo.block_of(posicion) for posicion, instruction in enumerate(code)
+                            if instruction.op in VALUE_OPS and instruction.dst == original}
+            definiciones |= {grafo.block_of(posicion + 1) for posicion, instruction in enumerate(code)
+                             if instruction.op == FOR and instruction.dst == original}
+            iterada, pendientes = set(), list(definiciones)
+            while pendientes:
+                for destino in frontera_de_dominancia(grafo, pendientes.pop()) - iterada:
+                    iterada.add(destino)
+                    pendientes.append(destino)
+            assert bloque in iterada, (original, bloque, iterada)
+
+
+def test_phi_donde_se_juntan_las_ramas():
+    code, _ = generar(PROGRAMAS["if_else"])
+    forma = to_ssa(code)
+    grafo = forma.graph
+    [(bloque, [phi])] = [(bloque, phis) for bloque, phis in forma.phis.items()
+                         if any(forma.origin[phi.dst] == "y" for phi in phis)]
+    ramas = [grafo.block_of(posicion) for posicion, instruction in enumerate(code)
+             if instruction.op in VALUE_OPS and instruction.dst == "y"]
+    assert len(ramas) == 2
+    for rama in ramas:
+        assert bloque in frontera_de_dominancia(grafo, rama)
+    assert {forma.origin[operando] for operando in phi.src1} == {"y"}
+    assert len(set(phi.src1)) == 2
+
+
+@pytest.mark.parametrize("nombre", ["while", "intercambio", "copia_perdida", "for_anidado"])
+def test_destruccion_despues_de_propagar_copias(nombre):
+    code, variables = generar(PROGRAMAS[nombre])
+    forma = to_ssa(code)
+    propagar_copias(forma)
+    assert ejecutar(from_ssa(forma), variables) == ejecutar(code, variables)
+
+
+def test_intercambio_necesita_un_temporal():
+    code, variables = generar(PROGRAMAS["intercambio"])
+    forma = to_ssa(code)
+    propagar_copias(forma)
+    resultado = from_ssa(forma)
+    # El ciclo de copias a = b, b = a de las PHI se rompe con un temporal nuevo
+    originales = {instruction.dst for instruction in code}
+    assert any(instruction.op == COPY and instruction.dst in ("a", "b") and is_temp(instruction.src1)
+               and instruction.src1 not in originales for instruction in resultado)
+    assert ejecutar(resultado, variables) == ejecutar(code, variables)